@@ -0,0 +1,113 @@
+import threading
+import time
+from alarm_queue import AlarmQueue
+
+
+class AlarmEngine:
+    """
+    Fires each scheduled alarm exactly once, at its ring_at time.
+
+    Alarms are kept in an indexed min-heap keyed on ring_at and a single
+    thread sleeps until the earliest deadline instead of polling. Any change
+    to the schedule wakes the thread early so it can re-arm for the new
+    earliest alarm.
+
+    on_ring(alarm_id, payload) is called from the engine thread; keep it short
+    (hand slow work such as sound or notifications off to another thread).
+    """
+
+    def __init__(self, on_ring):
+        self._on_ring = on_ring
+        self._queue = AlarmQueue()  # alarm_id -> payload, keyed on ring_at timestamp
+        self._fired = {}            # alarm_id -> ring_at timestamp it already fired for
+        self._wakeup = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    # ----- Schedule changes -----
+    def schedule(self, alarm_id, ring_at, payload=None):
+        """
+        Add or move an alarm. ring_at is an aware datetime; one in the past
+        fires immediately. Re-scheduling an alarm that already fired for the
+        same ring_at is a no-op, so repeated syncs never ring twice.
+        """
+        when = ring_at.timestamp()
+        with self._wakeup:
+            if self._fired.get(alarm_id) == when:
+                return
+            earliest = self._queue.peek()
+            self._queue.push(alarm_id, when, payload)
+            if earliest is None or earliest[1] == alarm_id or when < earliest[0]:
+                self._wakeup.notify()
+
+    def cancel(self, alarm_id):
+        with self._wakeup:
+            if alarm_id in self._queue:
+                self._queue.remove(alarm_id)
+                self._wakeup.notify()
+
+    def replace_all(self, alarms):
+        """
+        Make the schedule exactly `alarms` ({alarm_id: (ring_at, payload)}),
+        e.g. after a calendar sync: missing alarms are cancelled, moved ones
+        re-armed, and unchanged ones left alone.
+        """
+        with self._wakeup:
+            for alarm_id in self._queue:
+                if alarm_id not in alarms:
+                    self._queue.remove(alarm_id)
+            for alarm_id, (ring_at, payload) in alarms.items():
+                self.schedule(alarm_id, ring_at, payload)
+            self._fired = {alarm_id: when for alarm_id, when in self._fired.items() if alarm_id in alarms}
+            self._wakeup.notify()
+
+    def pending(self):
+        """Number of alarms still waiting to ring."""
+        with self._wakeup:
+            return len(self._queue)
+
+    # ----- Engine thread -----
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="alarm-engine", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+        if self._thread:
+            self._thread.join()
+
+    def join(self):
+        # Join in slices so Ctrl+C still reaches the main thread on Windows
+        while self._thread.is_alive():
+            self._thread.join(1)
+
+    def _next_due(self):
+        """Pop and return the next alarm that is due, or wait for one. Called with the lock held."""
+        while not self._stopped:
+            earliest = self._queue.peek()
+            if earliest is None:
+                self._wakeup.wait()
+                continue
+            when, alarm_id, payload = earliest
+            delay = when - time.time()
+            if delay > 0:
+                self._wakeup.wait(delay)
+                continue
+            self._queue.remove(alarm_id)
+            self._fired[alarm_id] = when
+            return alarm_id, payload
+        return None
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                due = self._next_due()
+            if due is None:
+                return
+            try:
+                self._on_ring(*due)
+            except Exception as e:
+                print(f"Error ringing alarm {due[0]}: {e}")
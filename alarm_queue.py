@@ -0,0 +1,111 @@
+class AlarmQueue:
+    """
+    Indexed binary min-heap of alarms, keyed by alarm id.
+
+    Keeps a position index next to the heap so an alarm can be found and moved
+    in place: peek is O(1), push/pop/update (snooze)/remove (cancel) are
+    O(log n). Ties on key are broken by insertion order.
+    """
+
+    def __init__(self):
+        self._heap = []      # [key, sequence, alarm_id, item]
+        self._index = {}     # alarm_id -> position in _heap
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, alarm_id):
+        return alarm_id in self._index
+
+    def __iter__(self):
+        """Alarm ids in no particular order."""
+        return iter(list(self._index))
+
+    def get(self, alarm_id):
+        """Return (key, item) for an alarm, or None."""
+        position = self._index.get(alarm_id)
+        if position is None:
+            return None
+        key, _, _, item = self._heap[position]
+        return key, item
+
+    def peek(self):
+        """Return (key, alarm_id, item) of the earliest alarm, or None if empty."""
+        if not self._heap:
+            return None
+        key, _, alarm_id, item = self._heap[0]
+        return key, alarm_id, item
+
+    def push(self, alarm_id, key, item=None):
+        """Add an alarm, or move it if it is already queued."""
+        if alarm_id in self._index:
+            self.update(alarm_id, key, item)
+            return
+        self._sequence += 1
+        self._heap.append([key, self._sequence, alarm_id, item])
+        self._index[alarm_id] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def update(self, alarm_id, key, item=None):
+        """Change an alarm's key (earlier or later) and optionally its item."""
+        position = self._index[alarm_id]
+        entry = self._heap[position]
+        old_key = entry[0]
+        entry[0] = key
+        if item is not None:
+            entry[3] = item
+        if key < old_key:
+            self._sift_up(position)
+        else:
+            self._sift_down(position)
+
+    def remove(self, alarm_id):
+        """Drop an alarm and return its item (None if it was not queued)."""
+        position = self._index.pop(alarm_id, None)
+        if position is None:
+            return None
+        removed = self._heap[position]
+        last = self._heap.pop()
+        if position < len(self._heap):
+            self._heap[position] = last
+            self._index[last[2]] = position
+            self._sift_up(position)
+            self._sift_down(self._index[last[2]])
+        return removed[3]
+
+    def pop(self):
+        """Remove and return (key, alarm_id, item) of the earliest alarm."""
+        key, alarm_id, item = self.peek()
+        self.remove(alarm_id)
+        return key, alarm_id, item
+
+    # ----- Heap maintenance -----
+    def _less(self, i, j):
+        return self._heap[i][:2] < self._heap[j][:2]
+
+    def _swap(self, i, j):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._index[heap[i][2]] = i
+        self._index[heap[j][2]] = j
+
+    def _sift_up(self, position):
+        while position > 0:
+            parent = (position - 1) // 2
+            if not self._less(position, parent):
+                break
+            self._swap(position, parent)
+            position = parent
+
+    def _sift_down(self, position):
+        size = len(self._heap)
+        while True:
+            smallest = position
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < size and self._less(child, smallest):
+                    smallest = child
+            if smallest == position:
+                break
+            self._swap(position, smallest)
+            position = smallest
@@ -1,28 +1,36 @@
-import time
 from datetime import datetime, timedelta, timezone
-import winsound  # For sound notification
+from alarm_engine import AlarmEngine
+from ring_player import RingPlayer, Sound
+from meeting_identity import MeetingIndex
 
 # Function to check and alert for upcoming meetings
 def check_and_alert(meetings_per_account):
     print('Called check_and_alert, meetings_per_account:', meetings_per_account)
     alert_threshold = timedelta(minutes=5)  # Alert 5 minutes before meeting
-    
-    while True:
-        now = datetime.now(timezone.utc)
 
-        for account, meetings in meetings_per_account.items():
-            for meeting in meetings:
-                start_time = meeting['start']
-                time_to_meeting = start_time - now
+    # Optional: Play a sound notification
+    duration = 1000  # milliseconds
+    freq = 1000  # Hz
+    player = RingPlayer(Sound.tone(freq, duration))  # Tone rendered once, played off-thread
 
-                if timedelta(0) <= time_to_meeting <= alert_threshold:
-                    print(f"\n🚨 Alert: Upcoming meeting for {account}!")
-                    print(f"Subject: {meeting['subject']}")
-                    print(f"Starts at: {start_time.strftime('%Y-%m-%d %H:%M:%S %Z')}\n")
-                    
-                    # Optional: Play a sound notification
-                    duration = 1000  # milliseconds
-                    freq = 1000  # Hz
-                    winsound.Beep(freq, duration)
+    def alert(alarm_id, meeting):
+        accounts, start_time = ", ".join(meeting['accounts']), meeting['start']
+        print(f"\n🚨 Alert: Upcoming meeting for {accounts}!")
+        print(f"Subject: {meeting['subject']}")
+        print(f"Starts at: {start_time.strftime('%Y-%m-%d %H:%M:%S %Z')}\n")
+        player.ring()
 
-        time.sleep(60)  # Check every 60 seconds
+    # The same invite in several accounts rings once
+    now = datetime.now(timezone.utc)
+    upcoming = MeetingIndex()
+    for account, meetings in meetings_per_account.items():
+        for meeting in meetings:
+            if meeting['start'] >= now:
+                upcoming.add(dict(meeting, account=account))
+
+    # Each meeting rings once, at start - alert_threshold, instead of every minute
+    engine = AlarmEngine(on_ring=alert)
+    for meeting in upcoming:
+        engine.schedule(meeting['id'], meeting['start'] - alert_threshold, meeting)
+
+    engine.start().join()  # Runs until the program is stopped
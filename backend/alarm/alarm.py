@@ -1,15 +1,231 @@
 # alarm/alarm.py
-import win32com.client
-import heapq
-from meetings_ahead import meetings_ahead
-
-def get_meeting_to_ring(days_ahead=30, ring_before=5):
-    outlook = win32com.client.Dispatch("Outlook.Application")
-    namespace = outlook.GetNamespace("MAPI")
-    meetings = meetings_ahead(namespace, days_ahead, ring_before)
-    if not meetings:
-        return None
-    heap = [(item["ring_at"] + item["snoozed"], item) for item in meetings]
-    heapq.heapify(heap)
-    _, meeting = heapq.heappop(heap)
-    return meeting
\ No newline at end of file
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta
+from alarm.meeting_ahead import meetings_ahead, next_meetings
+from alarm.snapshot import ScheduleSnapshot
+from alarm_queue import AlarmQueue
+from interval_index import IntervalIndex
+from calendar_source import open_source
+from metrics import histogram
+
+DAYS_AHEAD = 30  # Days of meetings to keep alarms for
+RING_BEFORE = 5  # Minutes before the meeting to ring
+REFRESH_TTL = 60  # Seconds between background refreshes from Outlook
+# "outlook", or .ics file(s) separated by os.pathsep to run without Outlook (e.g. on Linux)
+CALENDAR_SOURCE = os.environ.get("CALENDAR_SOURCE", "outlook")
+# Saved after every change and restored at startup, so alarms are live
+# before the first fetch finishes
+SCHEDULE_FILE = os.environ.get("ALARM_SCHEDULE_FILE", "alarm_schedule.json")
+DATETIME_FIELDS = ("start", "end", "ring_at")
+
+refresh_seconds = histogram("schedule_refresh_seconds", "Time to re-fetch meetings and sync the alarm queue")
+next_meeting_seconds = histogram("next_meeting_seconds", "Time to answer a next-meeting query", ["source"])
+
+# Alarms are kept between requests, keyed by meeting id, so snoozes and
+# cancellations survive re-fetching the calendar
+alarms = AlarmQueue()
+cancelled = set()
+# Every fetched meeting's [start, end), cancelled ones included (they still
+# take up the time), for overlap, conflict and free-slot queries
+meeting_index = IntervalIndex()
+alarms_lock = threading.Lock()  # Flask serves requests from several threads
+save_lock = threading.Lock()
+
+def ring_key(meeting):
+    # "snoozed" is the number of minutes the alarm was pushed back
+    return meeting["ring_at"] + timedelta(minutes=meeting["snoozed"])
+
+def sync_alarms(meetings):
+    """
+    Add newly fetched meetings to the queue, apply edits to known ones and drop
+    the ones that disappeared. Returns True if the schedule changed.
+    """
+    global cancelled
+    changed = False
+    current = set()
+    for item in meetings:
+        current.add(item["id"])
+        meeting_index.add(item["id"], item["start"], item["end"], item)  # O(log n), and only if it moved
+        if item["id"] in cancelled:
+            continue
+        entry = alarms.get(item["id"])
+        if entry is None:
+            alarms.push(item["id"], ring_key(item), item)
+            changed = True
+            continue
+        # Ids are stable across edits, so a known meeting may have been renamed or moved
+        _, known = entry
+        if known["start"] != item["start"]:
+            alarms.update(item["id"], ring_key(item), item)  # Rescheduled: the old snooze no longer applies
+            changed = True
+        elif (known["subject"], known["end"], known["accounts"]) != (item["subject"], item["end"], item["accounts"]):
+            known.update(subject=item["subject"], end=item["end"], accounts=item["accounts"])
+            changed = True
+    for meeting_id in alarms:
+        if meeting_id not in current:
+            alarms.remove(meeting_id)
+            changed = True
+    for meeting_id in meeting_index:
+        if meeting_id not in current:
+            meeting_index.remove(meeting_id)
+    cancelled &= current
+    return changed
+
+# Nothing is opened until the first fetch; an Outlook source sets up COM on
+# each thread that uses it (refreshes and requests run on their own threads)
+source = open_source(CALENDAR_SOURCE)
+
+def fetch_meetings(days_ahead=DAYS_AHEAD, ring_before=RING_BEFORE):
+    return meetings_ahead(source, days_ahead, ring_before)
+
+def fetch_next_meeting(days_ahead=DAYS_AHEAD, ring_before=RING_BEFORE):
+    # Reads only the head of each account's window, not the whole schedule
+    upcoming = next_meetings(source, 1, days_ahead, ring_before)
+    return upcoming[0] if upcoming else None
+
+def refresh_alarms():
+    with refresh_seconds.time():
+        meetings = fetch_meetings()
+        with alarms_lock:
+            changed = sync_alarms(meetings)
+    if changed:
+        save_schedule()
+    return changed
+
+def save_schedule(path=None):
+    """Write the alarm queue, with snoozes and cancellations, to disk (atomically)."""
+    path = path or SCHEDULE_FILE
+    with alarms_lock:
+        meetings = [dict(alarms.get(meeting_id)[1]) for meeting_id in alarms]
+        cancelled_ids = sorted(cancelled)
+    for meeting in meetings:
+        for field in DATETIME_FIELDS:
+            meeting[field] = meeting[field].isoformat()
+    state = {"saved_at": time.time(), "cancelled": cancelled_ids, "meetings": meetings}
+    try:
+        with save_lock:
+            with open(path + ".tmp", "w") as file:
+                json.dump(state, file)
+            os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"Error saving schedule: {e}")
+
+def save_in_background():
+    threading.Thread(target=save_schedule, name="schedule-save", daemon=True).start()
+
+def restore_schedule(path=None):
+    """
+    Load the schedule saved by the previous run, unless one was fetched
+    already. Returns the number of alarms restored; the next refresh brings
+    them up to date.
+    """
+    path = path or SCHEDULE_FILE
+    try:
+        with open(path) as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return 0
+    now = datetime.now()
+    with alarms_lock:
+        if snapshot.loaded or len(alarms):
+            return 0
+        for meeting in state["meetings"]:
+            for field in DATETIME_FIELDS:
+                meeting[field] = datetime.fromisoformat(meeting[field])
+            if meeting["start"] > now:
+                alarms.push(meeting["id"], ring_key(meeting), meeting)
+                meeting_index.add(meeting["id"], meeting["start"], meeting["end"], meeting)
+        cancelled.update(state["cancelled"])
+        restored = len(alarms)
+    snapshot.restored(state["saved_at"])
+    return restored
+
+# Requests are answered from this in-memory schedule; Outlook is only
+# queried by the background refresh
+snapshot = ScheduleSnapshot(refresh_alarms, ttl=REFRESH_TTL)
+
+def next_meeting_snapshot():
+    """Return (meeting or None, version, last_modified) without touching Outlook."""
+    if not snapshot.loaded and restore_schedule():
+        snapshot.refresh_in_background()  # Bring the schedule saved by the last run up to date
+    if not snapshot.loaded:
+        # Cold start with nothing saved: answer from the earliest meeting while the full schedule loads
+        snapshot.refresh_in_background()
+        with next_meeting_seconds.time(source="cold"):
+            meeting = fetch_next_meeting()
+        if not snapshot.loaded:
+            return meeting, snapshot.version, snapshot.last_modified
+    with next_meeting_seconds.time(source="snapshot"), alarms_lock:
+        earliest = alarms.peek()
+        return (earliest[2] if earliest else None), snapshot.version, snapshot.last_modified
+
+def get_meeting_to_ring():
+    meeting, _, _ = next_meeting_snapshot()
+    return meeting
+
+def snooze_meeting(meeting_id, minutes=5):
+    """Push a meeting's alarm back by `minutes`; returns the meeting or None if unknown."""
+    with alarms_lock:
+        entry = alarms.get(meeting_id)
+        if entry is None:
+            return None
+        _, meeting = entry
+        meeting["snoozed"] += minutes
+        alarms.update(meeting_id, ring_key(meeting), meeting)
+        snapshot.touch()
+    save_in_background()
+    return meeting
+
+def cancel_meeting(meeting_id):
+    """Stop ringing for a meeting; returns the meeting or None if unknown."""
+    with alarms_lock:
+        meeting = alarms.remove(meeting_id)
+        if meeting is None:
+            return None
+        cancelled.add(meeting_id)
+        snapshot.touch()
+    save_in_background()
+    return meeting
+
+# ----- Schedule queries, answered from meeting_index -----
+def ensure_schedule():
+    """Block until a whole schedule is in memory (the saved one, or the first fetch)."""
+    if not snapshot.loaded and restore_schedule():
+        snapshot.refresh_in_background()
+    snapshot.ensure_loaded()
+
+def meetings_overlapping(start, end=None):
+    """The meetings that overlap [start, end), or that are in progress at `start` if no end is given."""
+    ensure_schedule()
+    with alarms_lock:
+        return [meeting for _, _, meeting in meeting_index.overlapping(start, end)]
+
+def meeting_conflicts(start, end, cross_account=False):
+    """
+    Pairs of meetings that overlap each other, among those overlapping
+    [start, end). With cross_account, only pairs booked in different
+    accounts (no account in common).
+    """
+    ensure_schedule()
+    with alarms_lock:
+        pairs = meeting_index.conflicts(start, end)
+    conflicts = []
+    for (_, _, first), (_, _, second) in pairs:
+        across = set(first["accounts"]).isdisjoint(second["accounts"])
+        if across or not cross_account:
+            conflicts.append({"meetings": [first, second], "cross_account": across})
+    return conflicts
+
+def next_free_slot(minutes=30, after=None, until=None):
+    """(start, end) of the first free stretch of `minutes` after `after` (default now), or None."""
+    ensure_schedule()
+    after = after or datetime.now()
+    # Past the fetched window nothing is known, so nothing is free
+    until = until or datetime.now() + timedelta(days=DAYS_AHEAD)
+    duration = timedelta(minutes=minutes)
+    with alarms_lock:
+        start = meeting_index.free_slot(after, duration, until)
+    return (start, start + duration) if start is not None else None
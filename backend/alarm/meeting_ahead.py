@@ -1,12 +1,18 @@
-import win32com.client
-import hashlib
+import heapq
+import itertools
 from datetime import datetime, timedelta, timezone
+from calendar_provider import fetch_accounts, stream_accounts, AccountGuard, FETCH_WORKERS
+from calendar_source import as_source, OutlookSource
+from meeting_identity import meeting_id, meeting_id_from, MeetingIndex, dedupe
 
 days_ahead = 8  # Number of days to look ahead for meetings
 
-# Initialize Outlook COM object
-outlook = win32com.client.Dispatch("Outlook.Application")
-namespace = outlook.GetNamespace("MAPI")
+# The only properties a full fetch reads, in bulk (see CalendarSource.columns)
+MEETING_COLUMNS = ("Subject", "Start", "End", "GlobalAppointmentID", "IsRecurring")
+
+# Deadlines and back-off per account, and each account's last good meetings
+# for when it is slow or down (see calendar_provider.AccountGuard)
+account_guard = AccountGuard()
 
 def remove_timezone(dt):
     # Remove the timezone information, making it naive if it is aware
@@ -14,62 +20,114 @@ def remove_timezone(dt):
         return dt.replace(tzinfo=None)
     return dt
 
-def meetings_ahead(namespace, days_ahead, ring_before=0):
+def _to_meeting(item, smtp_address, ring_before):
+    # Turn a calendar item into a meeting dict, or None if it has no start time
+    start = remove_timezone(item.Start)
+    end = remove_timezone(item.End)
+    if start is None:
+        return None
+    return {
+        "subject": item.Subject,
+        "start": start,
+        "end": end,
+        "account": smtp_address,
+        "ring_at": start - timedelta(minutes=ring_before),
+        "snoozed": 0,
+        "id": meeting_id(item)  # Same in every account that got the invite
+    }
+
+def _batch_to_meetings(batch, smtp_address, ring_before, now, end_time):
+    # The meetings of a ColumnBatch of MEETING_COLUMNS that start in [now, end_time]
+    meetings = []
+    for subject, start, end, gid, is_recurring in batch.rows():
+        try:
+            if start is None:
+                continue
+            start = remove_timezone(start)
+            if not now <= start <= end_time:
+                continue
+            meetings.append({
+                "subject": subject,
+                "start": start,
+                "end": remove_timezone(end),
+                "account": smtp_address,
+                "ring_at": start - timedelta(minutes=ring_before),
+                "snoozed": 0,
+                "id": meeting_id_from(gid, is_recurring, subject, start, end)
+            })
+        except Exception as e:
+            print(f"Error processing item: {e}")
+    return meetings
+
+def meetings_ahead(source, days_ahead, ring_before=0, max_workers=FETCH_WORKERS, guard=account_guard):
+    # source: a CalendarSource, or an Outlook MAPI namespace
+    source = as_source(source)
+
     # Time range
     now = datetime.now()
     end_time = now + timedelta(days=days_ahead)
 
-    # Get all accounts
-    accounts = namespace.Accounts
-    
-    meetings = []
+    def fetch(worker_source, account):
+        display_name, smtp_address = account
+        # print(f"\nAccount: {smtp_address}")
 
-    for account in accounts:
-        try:
-            # print(f"\nAccount: {account.SmtpAddress}")
-            
-            # Access root folder and Calendar folder
-            root_folder = namespace.Folders(account.DisplayName)
-            calendar_folder = root_folder.Folders("Calendar")
-
-            # Get calendar items and configure view
-            items = calendar_folder.Items
-            items.Sort("[Start]")
-            items.IncludeRecurrences = True
-
-            for item in items:
-                try:
-                    start = remove_timezone(item.Start)
-                    end = remove_timezone(item.End)
-                    
-                    # Skip items without start time
-                    if start is None:
-                        continue
-
-                    # Filter by time range
-                    if now <= start <= end_time:
-                        st = item.Subject + str(start) + str(end) + account.SmtpAddress
-                        meetings.append({
-                            "subject": item.Subject,
-                            "start": start,
-                            "end": end,
-                            "account": account.SmtpAddress,
-                            "ring_at": start - timedelta(minutes=ring_before),
-                            "snoozed": 0,
-                            "id": hashlib.sha256(st.encode()).hexdigest()
-                        })
-                        # print(f"Meeting: {item.Subject}, Start: {start}, End: {end}")
-                except Exception as e:
-                    print(f"Error processing item: {e}")
+        # Only the needed columns of the items inside the window, read in
+        # bulk; recurring series are expanded locally. Errors are left to
+        # fetch_accounts(), which falls back to the account's last good meetings
+        batch = worker_source.columns(account, now, end_time, MEETING_COLUMNS)
+        return _batch_to_meetings(batch, smtp_address, ring_before, now, end_time)
 
+    # Get all accounts as plain (display name, address) pairs
+    accounts = source.accounts()
 
-        except Exception as e:
-            print(f"Error accessing account {account.DisplayName}: {e}")
+    # Accounts are fetched concurrently, at most max_workers at a time, and
+    # for no longer than the guard's deadline
+    results = fetch_accounts(source, accounts, fetch, max_workers, guard=guard)
+    # An invite received by several accounts is kept once, with all of them in "accounts"
+    return dedupe(meeting for account_meetings in results.values() for meeting in account_meetings)
 
-    return meetings
+def iter_meetings(source, days_ahead, ring_before=0, guard=account_guard):
+    """
+    Yield meetings from all accounts lazily, in start order.
+
+    Each account's window is already sorted by start, so the accounts are
+    k-way merged and only read a little ahead of what the caller consumes:
+    stopping after the first few meetings costs the same however full the
+    calendars are. Copies of an invite seen in several accounts are yielded
+    once. With a `guard`, accounts it has backed off or that are still hung
+    are skipped, and one that gives no answer within its deadline is left
+    out, so a hung account can't hold up the result.
+    """
+    source = as_source(source)
+    now = datetime.now()
+    end_time = now + timedelta(days=days_ahead)
+
+    def account_meetings(worker_source, account):
+        # Runs on the account's own reader thread (see calendar_provider.stream_accounts)
+        display_name, smtp_address = account
+        for item in worker_source.window(account, now, end_time):
+            try:
+                meeting = _to_meeting(item, smtp_address, ring_before)
+            except Exception as e:
+                print(f"Error processing item: {e}")
+                continue
+            if meeting is not None and now <= meeting["start"] <= end_time:
+                yield meeting
+
+    streams = stream_accounts(source, source.accounts(), account_meetings, guard=guard)
+    index = MeetingIndex()
+    for meeting in heapq.merge(*streams, key=lambda meeting: meeting["start"]):
+        if index.add(meeting):
+            yield meeting
+
+def next_meetings(source, count, days_ahead, ring_before=0, guard=account_guard):
+    """The first `count` meetings across all accounts, without fetching the rest of the window."""
+    return list(itertools.islice(iter_meetings(source, days_ahead, ring_before, guard), count))
 
-meet = meetings_ahead(namespace, days_ahead)
-# print(meet)
-# for meetings in meet:
-#     print(f"Subject: {meetings['subject']}, Start: {meetings['start']}, End: {meetings['end']}, Account: {meetings['account']}, Ring at: {meetings['ring_at']}")
-# print(meet)
\ No newline at end of file
+if __name__ == "__main__":
+    # Outlook is only dispatched when this file is run directly, so importing it works on any OS
+    meet = meetings_ahead(OutlookSource(), days_ahead)
+    # print(meet)
+    # for meetings in meet:
+    #     print(f"Subject: {meetings['subject']}, Start: {meetings['start']}, End: {meetings['end']}, Account: {meetings['account']}, Ring at: {meetings['ring_at']}")
+    # print(meet)
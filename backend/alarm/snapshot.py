@@ -0,0 +1,102 @@
+# alarm/snapshot.py
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+
+class ScheduleSnapshot:
+    """
+    Keeps the alarm schedule fresh in the background so requests never wait
+    on Outlook.
+
+    refresh_fn() does the expensive fetch and returns True if the schedule
+    changed. It runs on a background thread every `ttl` seconds and at most
+    once at a time: callers that ask for a refresh while one is in flight wait
+    for that one instead of starting another (single flight).
+
+    `version` and `last_modified` change only when the schedule does, so they
+    can be used as ETag (see etag()) / Last-Modified for conditional GETs,
+    and any number of threads can block in wait_for_change() to be woken
+    when it does.
+    """
+
+    def __init__(self, refresh_fn, ttl=60):
+        self.refresh_fn = refresh_fn
+        self.ttl = ttl
+        self.version = 0
+        # Versions restart at 0 with the process; tags carry this so one
+        # from a previous run never matches the current schedule
+        self.boot = uuid.uuid4().hex[:12]
+        self.last_modified = datetime.now(timezone.utc)
+        self.refreshed_at = None   # time.time() of the last successful refresh
+        self._refresh_lock = threading.Lock()
+        self._version_lock = threading.Lock()
+        self._changed = threading.Condition(self._version_lock)
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def loaded(self):
+        return self.refreshed_at is not None
+
+    def etag(self, version):
+        """An ETag (or SSE event id) for `version`, unique across restarts."""
+        return f"{self.boot}-{version}"
+
+    def touch(self):
+        """Record a change to the schedule (sync, snooze, cancel)."""
+        with self._changed:
+            self.version += 1
+            self.last_modified = datetime.now(timezone.utc)
+            self._changed.notify_all()
+
+    def restored(self, saved_at):
+        """Mark a schedule loaded from disk (saved at `saved_at`, a time.time()) as the current one."""
+        self.refreshed_at = saved_at
+        self.touch()
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the version differs from `version` (or timeout); returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def refresh(self):
+        """Run refresh_fn, or wait for the refresh already in flight."""
+        if not self._refresh_lock.acquire(blocking=False):
+            # Someone else is fetching; their result is as fresh as ours would be
+            with self._refresh_lock:
+                return
+        try:
+            if self.refresh_fn():
+                self.touch()
+            self.refreshed_at = time.time()
+        except Exception as e:
+            print(f"Error refreshing schedule: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_in_background(self):
+        """Start a one-off refresh on a daemon thread, unless one is already running."""
+        if self._refresh_lock.locked():
+            return
+        threading.Thread(target=self.refresh, name="schedule-refresh-once", daemon=True).start()
+
+    def ensure_loaded(self):
+        """Block only for the very first load; later reads are served from memory."""
+        if not self.loaded:
+            self.refresh()
+
+    def start(self):
+        """Refresh every `ttl` seconds on a daemon thread (once; later calls do nothing)."""
+        def loop():
+            while True:
+                self.refresh()
+                time.sleep(self.ttl)
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=loop, name="schedule-refresh", daemon=True)
+                self._thread.start()
+        return self
@@ -0,0 +1,231 @@
+# alarm/tenants.py
+import time
+import zlib
+import queue
+import threading
+import multiprocessing
+from timing_wheel import TimingWheel
+
+TICK = 0.1  # Seconds; alarms fire at most this late (plus scheduling delay)
+
+
+def shard_of(user_id, shards):
+    # Stable across processes and runs, unlike hash() on str
+    return zlib.crc32(str(user_id).encode()) % shards
+
+def _epoch(ring_at):
+    # Meeting dicts carry naive local datetimes; the wheel runs on time.time()
+    return ring_at.timestamp() if hasattr(ring_at, "timestamp") else float(ring_at)
+
+
+class TenantAlarms:
+    """
+    Alarms for many users in one timing wheel, keyed by (user_id, meeting_id).
+
+    The same rules as the single-user queue in alarm.py: a snooze pushes an
+    alarm back until its meeting is rescheduled, and a cancelled meeting is
+    not re-added by the next sync, nor is one that already rang for the same
+    ring time. One instance is one shard; every method is safe to call from
+    several threads.
+    """
+
+    def __init__(self, tick=TICK, now=None):
+        self.wheel = TimingWheel(tick, time.time() if now is None else now)
+        self.users = {}      # user_id -> {meeting_id: ring time before snoozes}
+        self.cancelled = {}  # user_id -> {meeting_id}
+        self.fired = {}      # user_id -> {meeting_id: ring time (before snoozes) it already rang for}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.wheel)
+
+    def schedule(self, user_id, meeting_id, ring_at, meeting=None):
+        with self.lock:
+            ring_at = _epoch(ring_at)
+            self.users.setdefault(user_id, {})[meeting_id] = ring_at
+            self.cancelled.get(user_id, set()).discard(meeting_id)
+            self.fired.get(user_id, {}).pop(meeting_id, None)
+            self.wheel.schedule((user_id, meeting_id), ring_at, meeting)
+
+    def snooze(self, user_id, meeting_id, minutes=5):
+        """Push a pending alarm back by `minutes`; returns the meeting or None if not pending."""
+        with self.lock:
+            entry = self.wheel.get((user_id, meeting_id))
+            if entry is None:
+                return None
+            when, meeting = entry
+            self.wheel.schedule((user_id, meeting_id), when + minutes * 60, meeting)
+            return meeting
+
+    def cancel(self, user_id, meeting_id):
+        """Stop ringing for a meeting; returns the meeting or None if not pending."""
+        with self.lock:
+            meeting = self.wheel.cancel((user_id, meeting_id))
+            meetings = self.users.get(user_id)
+            if meetings is not None and meetings.pop(meeting_id, None) is not None:
+                self.cancelled.setdefault(user_id, set()).add(meeting_id)
+                if not meetings:
+                    del self.users[user_id]
+            return meeting
+
+    def sync_user(self, user_id, alarms):
+        """
+        Replace a user's schedule with `alarms`, [(meeting_id, ring_at, meeting)]
+        from a fresh fetch. Returns True if anything changed.
+        """
+        with self.lock:
+            return self._sync(user_id, alarms)
+
+    def sync_users(self, schedules):
+        """sync_user for {user_id: alarms} under one lock acquisition."""
+        with self.lock:
+            return {user_id: self._sync(user_id, alarms) for user_id, alarms in schedules.items()}
+
+    def remove_user(self, user_id):
+        with self.lock:
+            for meeting_id in self.users.pop(user_id, {}):
+                self.wheel.cancel((user_id, meeting_id))
+            self.cancelled.pop(user_id, None)
+            self.fired.pop(user_id, None)
+
+    def next_alarm(self, user_id):
+        """Return (ring time, meeting_id, meeting) of a user's earliest pending alarm, or None."""
+        with self.lock:
+            earliest = None
+            for meeting_id in self.users.get(user_id, ()):
+                entry = self.wheel.get((user_id, meeting_id))
+                if entry is not None and (earliest is None or entry[0] < earliest[0]):
+                    earliest = (entry[0], meeting_id, entry[1])
+            return earliest
+
+    def fire_due(self, now=None):
+        """Return [(user_id, meeting_id, meeting)] for every alarm that is due, in ring order."""
+        with self.lock:
+            fired = []
+            for (user_id, meeting_id), meeting in self.wheel.advance(time.time() if now is None else now):
+                meetings = self.users[user_id]
+                self.fired.setdefault(user_id, {})[meeting_id] = meetings.pop(meeting_id)
+                if not meetings:
+                    del self.users[user_id]
+                fired.append((user_id, meeting_id, meeting))
+            return fired
+
+    def _sync(self, user_id, alarms):
+        known = self.users.setdefault(user_id, {})
+        cancelled = self.cancelled.get(user_id, set())
+        fired = self.fired.get(user_id, {})
+        changed = False
+        current = set()
+        for meeting_id, ring_at, meeting in alarms:
+            current.add(meeting_id)
+            if meeting_id in cancelled:
+                continue
+            ring_at = _epoch(ring_at)
+            if fired.get(meeting_id) == ring_at:
+                continue  # Already rang; only a new ring time re-arms it
+            key = (user_id, meeting_id)
+            if known.get(meeting_id) != ring_at or key not in self.wheel:
+                # New or rescheduled: the old snooze no longer applies
+                known[meeting_id] = ring_at
+                self.wheel.schedule(key, ring_at, meeting)
+                changed = True
+            else:
+                self.wheel.replace(key, meeting)  # Keeps any snooze
+        for meeting_id in [meeting_id for meeting_id in known if meeting_id not in current]:
+            del known[meeting_id]
+            self.wheel.cancel((user_id, meeting_id))
+            changed = True
+        if not known:
+            del self.users[user_id]
+        if cancelled:
+            cancelled &= current
+            if not cancelled:
+                del self.cancelled[user_id]
+        if fired:
+            # Forget a fired meeting only once it has left the calendar
+            for meeting_id in [meeting_id for meeting_id in fired if meeting_id not in current]:
+                del fired[meeting_id]
+            if not fired:
+                del self.fired[user_id]
+        return changed
+
+
+def run_shard(commands, fired, tick=TICK):
+    """
+    Body of a shard process: apply commands ("method", args) from the
+    `commands` queue to a TenantAlarms and put each tick's due alarms on
+    `fired` as one list. None stops the shard.
+    """
+    alarms = TenantAlarms(tick)
+    while True:
+        command = ()
+        timeout = max(0.0, alarms.wheel.next_tick_at() - time.time())
+        try:
+            command = commands.get(timeout=timeout)
+            while command is not None:
+                method, args = command
+                getattr(alarms, method)(*args)
+                command = commands.get_nowait()
+        except queue.Empty:
+            pass
+        if command is None:
+            return
+        due = alarms.fire_due()
+        if due:
+            fired.put(due)
+
+
+class AlarmCluster:
+    """
+    TenantAlarms sharded across worker processes by user id.
+
+    Calls are routed to the user's shard and applied asynchronously (they
+    return nothing); alarms that fire arrive in batches on `fired`.
+    """
+
+    def __init__(self, shards=None, tick=TICK):
+        self.shards = shards or multiprocessing.cpu_count()
+        self.fired = multiprocessing.Queue()
+        self._commands = [multiprocessing.Queue() for _ in range(self.shards)]
+        self._workers = [
+            multiprocessing.Process(target=run_shard, args=(commands, self.fired, tick),
+                                    name=f"alarm-shard-{index}", daemon=True)
+            for index, commands in enumerate(self._commands)
+        ]
+
+    def start(self):
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self):
+        for commands in self._commands:
+            commands.put(None)
+        for worker in self._workers:
+            worker.join()
+
+    def _send(self, user_id, method, *args):
+        self._commands[shard_of(user_id, self.shards)].put((method, args))
+
+    def schedule(self, user_id, meeting_id, ring_at, meeting=None):
+        self._send(user_id, "schedule", user_id, meeting_id, _epoch(ring_at), meeting)
+
+    def snooze(self, user_id, meeting_id, minutes=5):
+        self._send(user_id, "snooze", user_id, meeting_id, minutes)
+
+    def cancel(self, user_id, meeting_id):
+        self._send(user_id, "cancel", user_id, meeting_id)
+
+    def sync_user(self, user_id, alarms):
+        self._send(user_id, "sync_user", user_id, list(alarms))
+
+    def sync_users(self, schedules):
+        """Sync many users with one message per shard."""
+        batches = [{} for _ in range(self.shards)]
+        for user_id, alarms in schedules.items():
+            batches[shard_of(user_id, self.shards)][user_id] = list(alarms)
+        for commands, batch in zip(self._commands, batches):
+            if batch:
+                commands.put(("sync_users", (batch,)))
+
+    def remove_user(self, user_id):
+        self._send(user_id, "remove_user", user_id)
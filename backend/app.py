@@ -1,19 +1,169 @@
 # app.py
-from flask import Flask, jsonify
-from alarm.alarm import get_meeting_to_ring
+import os
+import threading
+from datetime import datetime, timedelta
+from flask import Flask, Response, jsonify, request
+from alarm.alarm import (next_meeting_snapshot, snooze_meeting, cancel_meeting, snapshot, restore_schedule,
+                         meetings_overlapping, meeting_conflicts, next_free_slot)
+from metrics import render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = Flask(__name__)
 
+# Set once start() has run in this process
+started = threading.Event()
+_start_lock = threading.Lock()
+
+def start():
+    """
+    Load the last run's schedule and keep it fresh in the background, once
+    per process (later calls do nothing).
+    """
+    with _start_lock:
+        if started.is_set():
+            return
+        started.set()
+        restore_schedule()  # Alarms are live from the last run's schedule right away
+        snapshot.start()
+
+@app.before_request
+def start_on_first_request():
+    # Under `flask run` or a WSGI server nothing runs __main__: the process
+    # serving requests starts the refresher itself
+    if not started.is_set():
+        start()
+
+KEEPALIVE = 15  # Seconds between SSE comments on an idle stream, so dead clients are noticed
+MAX_WAIT = 60   # Longest a long-poll request may be held open
+
+def alarm_state(meeting):
+    # What a client shows: a change to any of these is pushed
+    if meeting is None:
+        return None
+    return (meeting["id"], meeting["subject"], meeting["start"], meeting["ring_at"], meeting["snoozed"])
+
 @app.route('/get_next_meeting', methods=['GET'])
 def get_next_meeting():
     try:
-        meeting = get_meeting_to_ring()
-        if meeting:
-            return jsonify({"status": "success", "meeting": meeting})
+        meeting, version, last_modified = next_meeting_snapshot()
+        # Long-poll: ?wait=N holds a request for the version the client already has
+        wait = min(request.args.get("wait", default=0, type=float), MAX_WAIT)
+        if wait > 0 and request.if_none_match.contains(snapshot.etag(version)):
+            if snapshot.wait_for_change(version, timeout=wait) != version:
+                meeting, version, last_modified = next_meeting_snapshot()
+        # Polling clients that already have this version get an empty 304
+        etag = snapshot.etag(version)
+        if request.if_none_match.contains(etag) or (
+                not request.if_none_match and request.if_modified_since
+                and request.if_modified_since >= last_modified.replace(microsecond=0)):
+            response = app.response_class(status=304)
+        elif meeting:
+            response = jsonify({"status": "success", "meeting": meeting})
         else:
-            return jsonify({"status": "success", "message": "No meetings found"})
+            response = jsonify({"status": "success", "message": "No meetings found"})
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True  # Always revalidate, never serve stale
+        return response
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/stream/next_meeting', methods=['GET'])
+def stream_next_meeting():
+    """
+    Server-Sent Events: one "next_meeting" event now and another whenever the
+    next alarm, its ring time or its snooze changes. All streams wait on the
+    same in-memory schedule; nothing is fetched per client.
+    """
+    last_event_id = request.headers.get("Last-Event-ID")
+
+    def events():
+        sent = object()
+        version = None
+        if last_event_id:
+            # Reconnecting client: skip the first event if it already has this version
+            meeting, version, _ = next_meeting_snapshot()
+            if snapshot.etag(version) == last_event_id:
+                sent = alarm_state(meeting)
+        while True:
+            meeting, version, _ = next_meeting_snapshot()
+            state = alarm_state(meeting)
+            if state != sent:
+                data = app.json.dumps({"status": "success", "meeting": meeting})
+                yield f"id: {snapshot.etag(version)}\nevent: next_meeting\ndata: {data}\n\n"
+                sent = state
+            if snapshot.wait_for_change(version, timeout=KEEPALIVE) == version:
+                yield ": keep-alive\n\n"
+
+    response = app.response_class(events(), mimetype="text/event-stream")
+    response.cache_control.no_cache = True
+    response.headers["X-Accel-Buffering"] = "no"  # Don't let a reverse proxy hold events back
+    return response
+
+def time_arg(name):
+    # An ISO 8601 query parameter as a naive local datetime, like the meetings' times; None if absent
+    value = request.args.get(name)
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    return moment.astimezone().replace(tzinfo=None) if moment.tzinfo else moment
+
+@app.route('/meetings/overlapping', methods=['GET'])
+def overlapping():
+    """?at=T: meetings in progress at T (default now); ?start=A&end=B: meetings overlapping [A, B)."""
+    try:
+        start = time_arg("start") or time_arg("at") or datetime.now()
+        end = time_arg("end") if request.args.get("start") else None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return jsonify({"status": "success", "meetings": meetings_overlapping(start, end)})
+
+@app.route('/meetings/conflicts', methods=['GET'])
+def conflicts():
+    """Double-booked meetings overlapping [start, end) (default: the next day); ?cross_account=1 for across accounts only."""
+    try:
+        start = time_arg("start") or datetime.now()
+        end = time_arg("end") or start + timedelta(days=1)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    cross_account = request.args.get("cross_account", default=0, type=int) == 1
+    return jsonify({"status": "success", "conflicts": meeting_conflicts(start, end, cross_account)})
+
+@app.route('/meetings/free_slot', methods=['GET'])
+def free_slot():
+    """The first free stretch of ?minutes= (default 30) after ?after= (default now), before ?until=."""
+    minutes = request.args.get("minutes", default=30, type=int)
+    try:
+        after, until = time_arg("after"), time_arg("until")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    slot = next_free_slot(minutes, after, until)
+    if slot:
+        return jsonify({"status": "success", "start": slot[0], "end": slot[1]})
+    return jsonify({"status": "success", "message": "No free slot found"})
+
+@app.route('/snooze_meeting/<meeting_id>', methods=['POST'])
+def snooze(meeting_id):
+    minutes = request.args.get("minutes", default=5, type=int)
+    meeting = snooze_meeting(meeting_id, minutes)
+    if meeting:
+        return jsonify({"status": "success", "meeting": meeting})
+    return jsonify({"status": "error", "message": "Meeting not found"}), 404
+
+@app.route('/cancel_meeting/<meeting_id>', methods=['POST'])
+def cancel(meeting_id):
+    meeting = cancel_meeting(meeting_id)
+    if meeting:
+        return jsonify({"status": "success", "meeting": meeting})
+    return jsonify({"status": "error", "message": "Meeting not found"}), 404
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    use_reloader = True  # Restart the server when the code changes
+    # The reloader runs this file in two processes; only the one serving requests fetches
+    if not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start()
+    # Every open event stream holds a worker thread
+    app.run(debug=True, threaded=True, use_reloader=use_reloader)
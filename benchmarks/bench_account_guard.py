@@ -0,0 +1,78 @@
+"""
+One bad account in a sync of ACCOUNTS: a calendar store that hangs for
+HANG seconds, and one that is offline for a run of syncs. Unguarded
+fetch_accounts() against one with an AccountGuard (DEADLINE seconds,
+breaker after BREAKER_FAILURES failures).
+
+Reported per sync: how long it took and how many meetings it returned
+(the hung account's come from its last good fetch), and for the offline
+account how many times it was asked over SYNCS syncs.
+
+    python benchmarks/bench_account_guard.py
+"""
+import os
+import sys
+import time
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from calendar_provider import AccountGuard
+from fake_outlook import FakeNamespace
+from synthetic_calendar import generate_calendars
+from alarm.meeting_ahead import meetings_ahead
+
+ACCOUNTS = 4
+ITEMS = 1000  # Per account
+DAYS_AHEAD = 8
+HANG = 5.0
+DEADLINE = 1.0
+BREAKER_FAILURES = 3
+SYNCS = 20
+
+def sync(namespace, guard):
+    t0 = time.perf_counter()
+    meetings = meetings_ahead(namespace, DAYS_AHEAD, guard=guard)
+    return time.perf_counter() - t0, len(meetings)
+
+def hung_account(guard):
+    namespace = FakeNamespace(generate_calendars(ACCOUNTS, ITEMS, days=DAYS_AHEAD))
+    address = namespace.Accounts[0].SmtpAddress
+    healthy = sync(namespace, guard)
+    namespace.hang(address)
+    release = threading.Timer(HANG, namespace.release, args=(address,))
+    release.start()
+    hung = sync(namespace, guard)
+    release.join()
+    return healthy, hung
+
+def offline_account(guard):
+    namespace = FakeNamespace(generate_calendars(ACCOUNTS, ITEMS // 10, days=DAYS_AHEAD))
+    address = namespace.Accounts[0].SmtpAddress
+    calendar = namespace.calendar(address)
+    asked = []
+    access = calendar._access
+    calendar._access = lambda: asked.append(1) or access()
+    sync(namespace, guard)
+    namespace.set_offline(address)
+    asked.clear()
+    t0 = time.perf_counter()
+    for _ in range(SYNCS):
+        sync(namespace, guard)
+    return len(asked), time.perf_counter() - t0
+
+if __name__ == "__main__":
+    print(f"{ACCOUNTS} accounts x {ITEMS} items; one account hangs for {HANG}s\n")
+    with open(os.devnull, "w") as quiet:
+        stdout, sys.stdout = sys.stdout, quiet  # Fetch errors are expected here
+        try:
+            runs = [(name, hung_account(guard), offline_account(guard)) for name, guard in (
+                ("unguarded", None),
+                (f"guarded ({DEADLINE}s)", AccountGuard(deadline=DEADLINE, failures=BREAKER_FAILURES)),
+            )]
+        finally:
+            sys.stdout = stdout
+    for name, ((healthy_s, healthy_n), (hung_s, hung_n)), (asked, offline_s) in runs:
+        print(f"{name:<16} healthy sync {healthy_s * 1000:6.0f} ms ({healthy_n} meetings), "
+              f"sync with a hung account {hung_s * 1000:6.0f} ms ({hung_n} meetings)")
+        print(f"{'':<16} offline account asked {asked} times in {SYNCS} syncs ({offline_s * 1000:.0f} ms)")
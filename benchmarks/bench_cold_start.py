@@ -0,0 +1,133 @@
+"""
+Cold-start cost: how long importing each module takes (and that none of
+them starts Outlook), and how soon each app answers after a restart, with
+and without the schedule saved by the previous run. Outlook is the fake
+calendar, with every account taking LATENCY seconds to answer.
+
+Every measurement runs in a fresh Python process.
+
+    python benchmarks/bench_cold_start.py
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+ACCOUNTS = 4
+ITEMS = 2000     # Per account
+LATENCY = 0.5    # Seconds per account fetch
+DAYS_AHEAD = 8
+
+MODULES = {
+    "meetings_ahead": ("meetings_ahead", ROOT),
+    "outlook_accs": ("outlook_accs", ROOT),
+    "backend alarm.meeting_ahead": ("alarm.meeting_ahead", os.path.join(ROOT, "backend")),
+    "backend alarm.alarm": ("alarm.alarm", os.path.join(ROOT, "backend")),
+    "backend app": ("app", os.path.join(ROOT, "backend")),
+    "feature_funcs meetings_ahead": ("meetings_ahead", os.path.join(ROOT, "dev_app", "feature_funcs")),
+    "feature_funcs alarm": ("alarm", os.path.join(ROOT, "dev_app", "feature_funcs")),
+    "dev_app app": ("app", os.path.join(ROOT, "dev_app")),
+}
+
+def fake_environment():
+    # Fake Outlook that counts how often it is started, and a silent win10toast
+    from fake_outlook import FakeNamespace
+    from synthetic_calendar import generate_calendars
+    from load_next_meeting import fake_outlook
+    from bench_suite import fake_toasts
+    calendars = generate_calendars(ACCOUNTS, ITEMS, days=DAYS_AHEAD)
+    fake_outlook(FakeNamespace(calendars, latency={address: LATENCY for address in calendars}))
+    fake_toasts()
+    client = sys.modules["win32com.client"]
+    dispatch = client.Dispatch
+    calls = []
+    client.Dispatch = lambda name: calls.append(name) or dispatch(name)
+    return calls
+
+def child_import(name):
+    module, path = MODULES[name]
+    sys.path.insert(0, path)
+    calls = fake_environment()
+    t0 = time.perf_counter()
+    __import__(module)
+    return {"seconds": time.perf_counter() - t0, "dispatches": len(calls)}
+
+def child_backend():
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    fake_environment()
+    t0 = time.perf_counter()
+    import app
+    from alarm import alarm
+    restored = alarm.restore_schedule()
+    restored_at = alarm.snapshot.refreshed_at
+    alarm.snapshot.start()
+    started = time.perf_counter() - t0
+    with app.app.test_client() as client:
+        meeting = client.get("/get_next_meeting").get_json()["meeting"]
+    first_answer = time.perf_counter() - t0
+    while alarm.snapshot.refreshed_at == restored_at:
+        time.sleep(0.01)  # Until the first real fetch has replaced what was restored
+    alarm.save_schedule()
+    return {"started": started, "first answer": first_answer, "restored": restored, "answered": meeting is not None,
+            "first fetch done": time.perf_counter() - t0}
+
+def child_dev_app():
+    sys.path.insert(0, os.path.join(ROOT, "dev_app"))
+    fake_environment()
+    t0 = time.perf_counter()
+    import app
+    synced = threading.Event()
+    sync = app.update_meetings_from_outlook
+
+    def first_sync():
+        sync()
+        synced.set()
+    app.update_meetings_from_outlook = first_sync
+    app.start()
+    started = time.perf_counter() - t0
+    with app.app.test_client() as client:
+        page = client.get("/").data.decode()
+    first_page = time.perf_counter() - t0
+    armed = app.scheduler.get_job("alert-dispatcher") is not None
+    stored = app.store.count()
+    synced.wait()
+    synced = time.perf_counter() - t0
+    app.scheduler.shutdown(wait=True)
+    return {"started": started, "first page": first_page, "alarms armed at first page": armed, "meetings at first page": stored,
+            "first sync done": synced, "rows on page": page.count("<tr>") - 1}
+
+def run_child(*args, workdir):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", *args],
+                            capture_output=True, text=True, check=True, cwd=workdir,
+                            env=dict(os.environ, ALARM_SCHEDULE_FILE=os.path.join(workdir, "alarm_schedule.json")))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    print(f"{ACCOUNTS} accounts x {ITEMS} items, {LATENCY}s per account fetch\n")
+    print(f"{'import':<32} {'ms':>8} {'Outlook started':>16}")
+    for name in MODULES:
+        result = run_child("import", name, workdir=tempfile.mkdtemp(prefix="bench-cold-"))
+        print(f"{name:<32} {result['seconds'] * 1000:8.1f} {result['dispatches']:>16}")
+
+    for app_name in ("backend", "dev_app"):
+        workdir = tempfile.mkdtemp(prefix="bench-cold-")
+        print(f"\n{app_name}")
+        for run in ("cold (nothing saved)", "warm (previous run's schedule)"):
+            result = run_child(app_name, workdir=workdir)
+            details = ", ".join(f"{key} {value * 1000:.0f} ms" if isinstance(value, float) else f"{key} {value}"
+                                for key, value in result.items())
+            print(f"  {run:<32} {details}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+        child = {"import": child_import, "backend": child_backend, "dev_app": child_dev_app}[sys.argv[2]]
+        print(json.dumps(child(*sys.argv[3:])))
+    else:
+        main()
@@ -0,0 +1,101 @@
+"""
+The memory-mapped ICS source on a large export: initial index, window
+queries, and re-reads after the file changes (only changed blocks are
+parsed again).
+
+    python benchmarks/bench_ics_source.py [events]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ics_source
+from ics_source import IcsCalendar
+
+EVENTS = 200000
+YEARS = 5          # Events are spread over this many years around now
+DAYS_AHEAD = 8
+SERIES_EVERY = 50  # One event in this many is a weekly series
+
+def write_ics(path, events, seed=0):
+    rng = random.Random(seed)
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    first = now - timedelta(days=365 * YEARS // 2)
+    with open(path, "w", newline="\r\n") as file:
+        file.write("BEGIN:VCALENDAR\nVERSION:2.0\nPRODID:-//bench//EN\n")
+        for i in range(events):
+            start = first + timedelta(days=rng.randrange(365 * YEARS), hours=rng.randrange(8, 18))
+            file.write(
+                "BEGIN:VEVENT\n"
+                f"UID:bench-{i}@example.com\n"
+                f"DTSTAMP:{now:%Y%m%dT%H%M%S}Z\n"
+                f"DTSTART:{start:%Y%m%dT%H%M%S}\n"
+                f"DTEND:{start + timedelta(minutes=30):%Y%m%dT%H%M%S}\n"
+                f"SUMMARY:Meeting {i} about a topic long enough to look like a real subject line\n"
+                f"DESCRIPTION:Agenda for meeting {i}\\n- item one\\n- item two\\n\n"
+                "LOCATION:Room 4.01\n"
+                + ("RRULE:FREQ=WEEKLY;BYDAY=TU,TH\n" if i % SERIES_EVERY == 0 else "")
+                + "END:VEVENT\n"
+            )
+        file.write("END:VCALENDAR\n")
+
+def count_parses():
+    # Wrap IcsEvent so we can tell how many blocks a step actually parsed
+    original = ics_source.IcsEvent
+    counter = {"parsed": 0}
+
+    class Counting(original):
+        __slots__ = ()
+
+        def __init__(self, data, offset, zones=None):
+            counter["parsed"] += 1
+            super().__init__(data, offset, zones)
+
+    ics_source.IcsEvent = Counting
+    return counter
+
+def step(name, counter, fn):
+    counter["parsed"] = 0
+    t0 = time.perf_counter()
+    result = fn()
+    print(f"{name:<34} {(time.perf_counter() - t0) * 1000:10.1f} ms   {counter['parsed']:7} events parsed")
+    return result
+
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else EVENTS
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-ics-"), "export.ics")
+    write_ics(path, events)
+    print(f"{events} events, {os.path.getsize(path) / 2**20:.1f} MiB\n")
+
+    counter = count_parses()
+    calendar = IcsCalendar(path)
+    now = datetime.now()
+    window = lambda: list(calendar.window(now, now + timedelta(days=DAYS_AHEAD)))
+
+    step("initial index", counter, calendar.refresh)
+    meetings = step("window query (first)", counter, window)
+    step("window query (again)", counter, window)
+    step("re-read, file unchanged", counter, calendar.refresh)
+
+    with open(path, "r+b") as file:
+        data = file.read()
+        position = data.find(b"SUMMARY:Meeting 1234 ")
+        file.seek(position + len(b"SUMMARY:"))
+        file.write(b"Edited!")  # Same length, so only this block's CRC changes
+    step("re-read, one event edited", counter, calendar.refresh)
+    step("window query after edit", counter, window)
+
+    # Measured separately: tracing allocations slows indexing down many times over
+    tracemalloc.start()
+    IcsCalendar(path).refresh()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"\n{len(meetings)} meetings in the next {DAYS_AHEAD} days;"
+          f" peak Python memory while indexing {peak / 2**20:.1f} MiB"
+          " (the file itself is only mapped, not read into memory)")
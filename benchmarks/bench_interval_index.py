@@ -0,0 +1,113 @@
+"""
+Overlap, conflict and free-slot queries over a schedule: linear scans of
+the meeting list against interval_index.IntervalIndex, plus what keeping
+the index up to date costs on a sync where 1% of the meetings moved.
+
+Meetings are 15 min - 2 h long, over DAYS_AHEAD days and ACCOUNTS accounts,
+so a working day is mostly booked and double bookings are common.
+
+    python benchmarks/bench_interval_index.py [meetings ...]
+"""
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from interval_index import IntervalIndex
+
+SIZES = (1000, 10000, 50000)
+DAYS_AHEAD = 30
+ACCOUNTS = 4
+QUERIES = 200
+FREE_MINUTES = 30
+
+def make_meetings(count, rng):
+    now = datetime.now().replace(second=0, microsecond=0)
+    meetings = []
+    for i in range(count):
+        start = now + timedelta(minutes=15 * rng.randrange(DAYS_AHEAD * 96))
+        meetings.append({"id": f"m{i}", "start": start, "end": start + timedelta(minutes=rng.choice((15, 30, 60, 120))),
+                         "accounts": [f"user{rng.randrange(ACCOUNTS)}@example.com"]})
+    return now, meetings
+
+# ----- Linear scans: what answering from the meetings_ahead() list costs -----
+def scan_overlapping(meetings, start, end):
+    return [m for m in meetings if m["start"] < end and m["end"] > start]
+
+def scan_conflicts(meetings, start, end):
+    window = scan_overlapping(meetings, start, end)
+    return [(a, b) for i, a in enumerate(window) for b in window[i + 1:]
+            if a["start"] < b["end"] and b["start"] < a["end"]]
+
+def scan_free_slot(meetings, after, duration):
+    cursor = after
+    for m in sorted(meetings, key=lambda m: m["start"]):
+        if m["end"] <= cursor:
+            continue
+        if m["start"] - cursor >= duration:
+            return cursor
+        cursor = max(cursor, m["end"])
+    return cursor
+
+def timed(fn, args_list):
+    t0 = time.perf_counter()
+    results = [fn(*args) for args in args_list]
+    return (time.perf_counter() - t0) / len(args_list), results
+
+def run(count):
+    rng = random.Random(count)
+    now, meetings = make_meetings(count, rng)
+    t0 = time.perf_counter()
+    index = IntervalIndex()
+    for m in meetings:
+        index.add(m["id"], m["start"], m["end"], m)
+    build = time.perf_counter() - t0
+
+    moments = [now + timedelta(minutes=rng.randrange(DAYS_AHEAD * 1440)) for _ in range(QUERIES)]
+    hour = timedelta(hours=1)
+    day = timedelta(days=1)
+    duration = timedelta(minutes=FREE_MINUTES)
+    rows = []
+
+    scan, expected = timed(lambda t: scan_overlapping(meetings, t, t + hour), [(t,) for t in moments])
+    tree, found = timed(lambda t: index.overlapping(t, t + hour), [(t,) for t in moments])
+    assert [len(r) for r in expected] == [len(r) for r in found]
+    rows.append(("overlapping [t, t+1h)", scan, tree))
+
+    days = [(t,) for t in moments[:20]]
+    scan, expected = timed(lambda t: scan_conflicts(meetings, t, t + day), days)
+    tree, found = timed(lambda t: index.conflicts(t, t + day), days)
+    assert [len(r) for r in expected] == [len(r) for r in found]
+    rows.append(("conflicts in [t, t+1d)", scan, tree))
+
+    scan, expected = timed(lambda t: scan_free_slot(meetings, t, duration), days)
+    tree, found = timed(lambda t: index.free_slot(t, duration), days)
+    assert expected == found
+    rows.append((f"next free {FREE_MINUTES} min", scan, tree))
+
+    # A sync where 1% of the meetings were rescheduled: update in place vs rebuild
+    moved = rng.sample(meetings, max(1, count // 100))
+    for m in moved:
+        m["start"] += hour
+        m["end"] += hour
+    t0 = time.perf_counter()
+    for m in meetings:
+        index.add(m["id"], m["start"], m["end"], m)
+    incremental = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    rebuilt = IntervalIndex()
+    for m in meetings:
+        rebuilt.add(m["id"], m["start"], m["end"], m)
+    rows.append(("sync, 1% moved (rebuild vs update)", time.perf_counter() - t0, incremental))
+    return build, rows
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    for count in sizes:
+        build, rows = run(count)
+        print(f"\n{count} meetings (index built in {build * 1000:.0f} ms)")
+        print(f"  {'query':<36} {'scan ms':>10} {'index ms':>10} {'speedup':>8}")
+        for name, scan, tree in rows:
+            print(f"  {name:<36} {scan * 1000:10.3f} {tree * 1000:10.3f} {scan / tree:7.1f}x")
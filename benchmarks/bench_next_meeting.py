@@ -0,0 +1,62 @@
+"""
+"Next meeting" from the full merged list (meetings_ahead, then min) vs. the
+lazily k-way merged stream (next_meetings), as the window fills up.
+
+Prints latency and peak memory per query. The streamed query only converts
+the meetings it returns; what it still pays for grows with the fake
+provider's Restrict, which filters eagerly where Outlook enumerates lazily.
+
+    python benchmarks/bench_next_meeting.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "backend"))
+from fake_outlook import FakeAppointment, FakeNamespace
+from load_next_meeting import fake_outlook
+
+ACCOUNTS = 4
+DAYS_AHEAD = 30
+REPEAT = 5
+
+def build_namespace(per_account):
+    now = datetime.now()
+    step = timedelta(days=DAYS_AHEAD) / (per_account + 1)
+    calendars = {
+        f"user{a}@example.com": [
+            FakeAppointment(f"Meeting {a}-{i}", now + step * (i + 1), now + step * (i + 1) + timedelta(minutes=30))
+            for i in range(per_account)
+        ]
+        for a in range(ACCOUNTS)
+    }
+    return FakeNamespace(calendars)
+
+def measure(query):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        result = query()
+    elapsed = (time.perf_counter() - t0) / REPEAT
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+if __name__ == "__main__":
+    fake_outlook(build_namespace(1))
+    from alarm.meeting_ahead import meetings_ahead, next_meetings
+
+    print(f"{'meetings':>9}  {'full list':>20}  {'streamed':>20}")
+    for per_account in (100, 1000, 10000):
+        namespace = build_namespace(per_account)
+        full, full_time, full_peak = measure(
+            lambda: min(meetings_ahead(namespace, DAYS_AHEAD), key=lambda m: m["start"]))
+        streamed, streamed_time, streamed_peak = measure(
+            lambda: next_meetings(namespace, 1, DAYS_AHEAD)[0])
+        assert full["id"] == streamed["id"]
+        print(f"{per_account * ACCOUNTS:>9}  {full_time * 1000:8.2f} ms {full_peak / 1024:7.0f} KiB"
+              f"  {streamed_time * 1000:8.2f} ms {streamed_peak / 1024:7.0f} KiB")
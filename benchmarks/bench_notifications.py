@@ -0,0 +1,112 @@
+"""
+A burst of meeting alerts (several meetings starting at the top of the
+hour, across accounts): a toast thread per alert, as dev_app used to do,
+against notifications.NotificationDispatcher.
+
+Toasts are a fake that stays up for TOAST_SECONDS like win10toast does; the
+dispatcher also posts to a local webhook stub. Reported: toasts shown, the
+most shown at once, peak thread count, and how long the burst took to
+reach each channel.
+
+    python benchmarks/bench_notifications.py [alerts]
+"""
+import os
+import sys
+import time
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from notifications import NotificationDispatcher, Channel, ToastSink, WebhookSink, WebhookStub
+
+ALERTS = 10
+TOAST_SECONDS = 0.5
+SPREAD = 0.5      # Seconds over which the burst's alerts are raised
+NOTIFY_CALLS = 100000
+
+
+class FakeToaster:
+    """Same call as win10toast.ToastNotifier; counts toasts and how many are up at once."""
+
+    def __init__(self):
+        self.shown = 0
+        self.up = 0
+        self.most_up = 0
+        self._lock = threading.Lock()
+
+    def show_toast(self, title, message, duration=5, threaded=False):
+        if threaded:
+            threading.Thread(target=self.show_toast, args=(title, message, duration)).start()
+            return
+        with self._lock:
+            self.shown += 1
+            self.up += 1
+            self.most_up = max(self.most_up, self.up)
+        time.sleep(duration)
+        with self._lock:
+            self.up -= 1
+
+
+def peak_threads(stop):
+    peak = [threading.active_count()]
+
+    def watch():
+        while not stop.is_set():
+            peak[0] = max(peak[0], threading.active_count())
+            time.sleep(0.005)
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    return peak
+
+def raise_burst(alert, alerts):
+    for i in range(alerts):
+        alert(f"Meeting {i} starting at 10:00")
+        time.sleep(SPREAD / alerts)
+
+def thread_per_alert(alerts):
+    toaster = FakeToaster()
+    stop = threading.Event()
+    peak = peak_threads(stop)
+    t0 = time.perf_counter()
+    raise_burst(lambda msg: toaster.show_toast("Meeting Alert", msg, duration=TOAST_SECONDS, threaded=True), alerts)
+    while toaster.shown < alerts or toaster.up:
+        time.sleep(0.005)
+    stop.set()
+    return {"toasts shown": toaster.shown, "most toasts up at once": toaster.most_up,
+            "peak threads": peak[0], "all delivered after": time.perf_counter() - t0}
+
+def dispatcher(alerts):
+    toaster = FakeToaster()
+    with WebhookStub() as stub:
+        notifications = NotificationDispatcher([
+            Channel("toast", ToastSink(toaster, duration=TOAST_SECONDS), min_interval=0.1),
+            Channel("webhook", WebhookSink(stub.url)),
+        ], window=SPREAD + 0.5, workers=2)
+        stop = threading.Event()
+        peak = peak_threads(stop)
+        t0 = time.perf_counter()
+        raise_burst(lambda msg: notifications.notify("Meeting Alert", msg), alerts)
+        posts = stub.wait(1)
+        webhook = time.perf_counter() - t0
+        notifications.stop()
+        stop.set()
+    return {"toasts shown": toaster.shown, "most toasts up at once": toaster.most_up,
+            "peak threads": peak[0], "all delivered after": time.perf_counter() - t0,
+            "webhook after": webhook, "alerts in the webhook post": len(posts[0]["alerts"])}
+
+def notify_cost():
+    notifications = NotificationDispatcher([], window=60, max_pending=NOTIFY_CALLS)
+    t0 = time.perf_counter()
+    for i in range(NOTIFY_CALLS):
+        notifications.notify("Meeting Alert", "message")
+    return (time.perf_counter() - t0) / NOTIFY_CALLS
+
+if __name__ == "__main__":
+    alerts = int(sys.argv[1]) if len(sys.argv) > 1 else ALERTS
+    print(f"{alerts} alerts within {SPREAD}s, toasts stay up {TOAST_SECONDS}s\n")
+    for name, run in (("thread per alert", thread_per_alert), ("dispatcher", dispatcher)):
+        result = run(alerts)
+        details = ", ".join(f"{key} {value * 1000:.0f} ms" if isinstance(value, float) else f"{key} {value}"
+                            for key, value in result.items())
+        print(f"{name:<18} {details}")
+    print(f"\nnotify() {notify_cost() * 1e6:.1f} us per call")
@@ -0,0 +1,45 @@
+"""
+Sequential vs. concurrent per-account fetching against a fake calendar whose
+accounts have injected latency (one slow shared mailbox, several fast ones).
+
+    python benchmarks/bench_parallel_fetch.py
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calendar_provider import fetch_accounts, restrict_to_window
+from fake_outlook import FakeAppointment, FakeNamespace
+
+LATENCY = {
+    "me@example.com": 0.10,
+    "team@example.com": 0.15,
+    "shared@example.com": 0.40,
+    "other@example.com": 0.10,
+    "old@example.com": 0.20,
+}
+
+def build_namespace():
+    now = datetime.now()
+    calendars = {
+        address: [FakeAppointment(f"{address} {i}", now + timedelta(hours=i), now + timedelta(hours=i, minutes=30))
+                  for i in range(200)]
+        for address in LATENCY
+    }
+    return FakeNamespace(calendars, latency=LATENCY)
+
+def fetch(namespace, account):
+    now = datetime.now()
+    calendar_folder = namespace.Folders(account).Folders("Calendar")
+    return list(restrict_to_window(calendar_folder.Items, now, now + timedelta(days=8)))
+
+if __name__ == "__main__":
+    namespace = build_namespace()
+    print(f"sum of latencies: {sum(LATENCY.values()):.2f}s, slowest account: {max(LATENCY.values()):.2f}s")
+    for workers in (1, 2, len(LATENCY)):
+        t0 = time.perf_counter()
+        results = fetch_accounts(namespace, list(LATENCY), fetch, max_workers=workers)
+        elapsed = time.perf_counter() - t0
+        print(f"max_workers={workers}: {elapsed:.2f}s, {sum(len(r) for r in results.values())} meetings")
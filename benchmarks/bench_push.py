@@ -0,0 +1,74 @@
+"""
+Push latency of /stream/next_meeting: SUBSCRIBERS clients hold an event
+stream open against a real (threaded) server, the next meeting is snoozed
+SNOOZES times, and we measure how long each change takes to reach every
+client, and how many requests that took compared with polling.
+
+    python benchmarks/bench_push.py
+"""
+import os
+import sys
+import json
+import time
+import threading
+import http.client
+from werkzeug.serving import make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "backend"))
+from load_next_meeting import fake_outlook, build_namespace, percentile
+
+SUBSCRIBERS = 50
+SNOOZES = 20
+POLL_INTERVAL = 5  # Seconds, what a polling client would use instead
+
+def subscribe(port, received, ready):
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    connection.request("GET", "/stream/next_meeting")
+    response = connection.getresponse()
+    ready.release()
+    for line in response:
+        if line.startswith(b"data: "):
+            meeting = json.loads(line[6:])["meeting"]
+            received.append(time.perf_counter())
+
+if __name__ == "__main__":
+    fake_outlook(build_namespace())
+    import app as backend_app
+    from alarm import alarm
+
+    alarm.snapshot.ensure_loaded()
+    server = make_server("127.0.0.1", 0, backend_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_port
+
+    ready = threading.Semaphore(0)
+    inboxes = [[] for _ in range(SUBSCRIBERS)]
+    for inbox in inboxes:
+        threading.Thread(target=subscribe, args=(port, inbox, ready), daemon=True).start()
+    for _ in inboxes:
+        ready.acquire()
+    while any(not inbox for inbox in inboxes):
+        time.sleep(0.01)  # Initial event
+
+    latencies = []
+    for _ in range(SNOOZES):
+        seen = [len(inbox) for inbox in inboxes]
+        t0 = time.perf_counter()
+        # Snoozing the next alarm always changes what the stream shows
+        alarm.snooze_meeting(alarm.get_meeting_to_ring()["id"], minutes=1)
+        deadline = t0 + 5
+        while time.perf_counter() < deadline and any(
+                len(inbox) == count for inbox, count in zip(inboxes, seen)):
+            time.sleep(0.001)
+        latencies.extend(inbox[count] - t0 for inbox, count in zip(inboxes, seen) if len(inbox) > count)
+        time.sleep(0.05)
+
+    print(f"{SUBSCRIBERS} subscribers, {SNOOZES} changes, {len(latencies)} events delivered")
+    print(f"push latency      p50 {percentile(latencies, 50) * 1000:7.2f} ms"
+          f"  p95 {percentile(latencies, 95) * 1000:7.2f} ms  p99 {percentile(latencies, 99) * 1000:7.2f} ms")
+    print(f"requests          {SUBSCRIBERS} (one stream per client)")
+    print(f"polling every {POLL_INTERVAL}s would average {POLL_INTERVAL / 2 * 1000:.0f} ms latency"
+          f" and {SUBSCRIBERS / POLL_INTERVAL:.0f} requests/s")
+    server.shutdown()
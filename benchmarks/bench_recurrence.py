@@ -0,0 +1,62 @@
+"""
+Provider-side recurrence expansion (IncludeRecurrences on every sync) vs.
+reading each series once and expanding it locally from the cache.
+
+"provider items" counts what crosses the provider boundary per sync: every
+expanded occurrence in the first case, one master per series (plus one-off
+items) in the second.
+
+    python benchmarks/bench_recurrence.py
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calendar_provider import iter_window, restrict_to_window
+from fake_outlook import FakeAppointment, FakeNamespace, FakeRecurrencePattern
+from recurrence import OL_RECURS_DAILY, OL_RECURS_WEEKLY, SeriesCache
+
+DAYS_AHEAD = 30
+SYNCS = 10
+WEEKDAYS = 2 | 4 | 8 | 16 | 32
+
+def build_folder(series_count=60, one_offs=200):
+    start = datetime.now().replace(second=0, microsecond=0) - timedelta(days=365)
+    items = []
+    for i in range(series_count):
+        first = start + timedelta(days=i % 7, hours=9 + i % 8)
+        if i % 2:
+            pattern = FakeRecurrencePattern(OL_RECURS_DAILY, 1)
+        else:
+            pattern = FakeRecurrencePattern(OL_RECURS_WEEKLY, 1, day_of_week_mask=WEEKDAYS)
+        items.append(FakeAppointment(f"Series {i}", first, first + timedelta(minutes=30), pattern=pattern))
+    for i in range(one_offs):
+        first = start + timedelta(days=365 + i % DAYS_AHEAD, hours=8 + i % 9)
+        items.append(FakeAppointment(f"Meeting {i}", first, first + timedelta(minutes=30)))
+    return FakeNamespace({"me@example.com": items}).Folders("me@example.com").Folders("Calendar")
+
+def provider_expansion(folder, now):
+    items = list(restrict_to_window(folder.Items, now, now + timedelta(days=DAYS_AHEAD)))
+    return items, len(items)
+
+def local_expansion(folder, now, cache):
+    items = list(iter_window(folder, now, now + timedelta(days=DAYS_AHEAD), cache=cache))
+    singles = sum(1 for item in items if isinstance(item, FakeAppointment))
+    masters = folder.Items.Restrict("[IsRecurring] = True").Count
+    return items, singles + masters
+
+if __name__ == "__main__":
+    folder = build_folder()
+    cache = SeriesCache()
+    for name, sync in (("provider expansion", provider_expansion),
+                       ("local expansion + cache", lambda f, now: local_expansion(f, now, cache))):
+        total = 0.0
+        for i in range(SYNCS):
+            now = datetime.now() + timedelta(minutes=10 * i)  # One sync every 10 minutes
+            t0 = time.perf_counter()
+            items, crossed = sync(folder, now)
+            total += time.perf_counter() - t0
+        print(f"{name:<25} {total / SYNCS * 1000:8.2f} ms/sync  {len(items):5} meetings"
+              f"  {crossed:5} provider items/sync")
@@ -0,0 +1,102 @@
+"""
+Concurrent snoozes on dev_app's meeting store: every thread writing for
+itself (read the meeting, then update it, one commit per write, as the
+routes used to) against one StoreWriter applying commands in order with
+group commit.
+
+Each snooze pushes one meeting's alert back a minute, from THREADS threads
+at once, so the right final alert is exactly THREADS * SNOOZES minutes
+later; anything less is snoozes lost to a read-modify-write race.
+
+    python benchmarks/bench_store_writer.py
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "dev_app"))
+from meeting_store import MeetingStore
+from store_writer import StoreWriter
+
+THREADS = 8
+SNOOZES = 50  # Per thread
+MEETINGS = 1000
+
+
+class CountingStore(MeetingStore):
+    """Counts commits (outermost transactions and writes outside any)."""
+
+    commits = 0
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            outermost = not self._depth
+            with super().transaction():
+                yield self
+            if outermost:
+                self.commits += 1
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            if not self._depth:
+                self.commits += 1
+            return super()._execute(sql, params)
+
+
+def open_store(workdir, name):
+    store = CountingStore(os.path.join(workdir, name), timezone.utc)
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    with store.transaction():
+        ids = [store.add({"subject": f"Meeting {i}", "start_time": start + timedelta(minutes=i), "account": "a@x.com",
+                          "uid": f"uid{i}", "alert_time": start}) for i in range(MEETINGS)]
+    store.commits = 0
+    return store, ids[MEETINGS // 2], start
+
+def push_back(store, meeting_id):
+    # Store command: read and write in one step
+    meeting = store.get(meeting_id)
+    store.update(meeting_id, alert_time=meeting["alert_time"] + timedelta(minutes=1))
+
+def hammer(snooze):
+    threads = [threading.Thread(target=lambda: [snooze() for _ in range(SNOOZES)]) for _ in range(THREADS)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - t0
+
+def each_thread_writes(workdir):
+    store, meeting_id, start = open_store(workdir, "direct.db")
+
+    def snooze():
+        meeting = store.get(meeting_id)
+        time.sleep(0)  # Request threads get switched out between the read and the write
+        store.update(meeting_id, alert_time=meeting["alert_time"] + timedelta(minutes=1))
+    seconds = hammer(snooze)
+    return seconds, store.commits, store.get(meeting_id)["alert_time"] - start
+
+def single_writer(workdir):
+    store, meeting_id, start = open_store(workdir, "writer.db")
+    writer = StoreWriter(store)
+    seconds = hammer(lambda: writer.apply(push_back, meeting_id))
+    writer.stop()
+    return seconds, store.commits, store.get(meeting_id)["alert_time"] - start
+
+if __name__ == "__main__":
+    workdir = tempfile.mkdtemp(prefix="bench-writer-")
+    total = THREADS * SNOOZES
+    print(f"{THREADS} threads x {SNOOZES} snoozes of one meeting ({MEETINGS} stored), expected +{total} min\n")
+    print(f"{'':<22} {'ms':>8} {'us/snooze':>10} {'commits':>8} {'alert moved':>12} {'lost':>6}")
+    for name, run in (("each thread writes", each_thread_writes), ("single writer", single_writer)):
+        seconds, commits, moved = run(workdir)
+        minutes = int(moved.total_seconds() // 60)
+        print(f"{name:<22} {seconds * 1000:8.0f} {seconds / total * 1e6:10.0f} {commits:8} "
+              f"{f'+{minutes} min':>12} {total - minutes:6}")
@@ -0,0 +1,292 @@
+"""
+Benchmark suite for the fetch, alarm, sync, storage and HTTP hot paths,
+run on synthetic calendars (see synthetic_calendar.py) of 100, 10k and 100k
+meetings.
+
+Each size runs in its own process, so module-level state (alarm queues,
+schedule snapshot, series cache, scheduler) never leaks between sizes.
+Results are written as JSON, by default to benchmarks/results/<commit>.json,
+and can be compared with an earlier run:
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --sizes 100 10000 --compare benchmarks/results/abc1234.json
+"""
+import os
+import sys
+import json
+import time
+import types
+import random
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+import subprocess
+import contextlib
+import importlib.util
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+from fake_outlook import FakeNamespace, FakeAppointment, CountingAppointment, provider_calls
+from calendar_source import OutlookSource
+from synthetic_calendar import generate_calendars
+from load_next_meeting import fake_outlook
+from meeting_table import local_epochs
+
+SIZES = (100, 10000, 100000)
+ACCOUNTS = 4
+DAYS_AHEAD = 8  # dev_app's window; every generated meeting falls inside it
+SNOOZES = 1000
+REQUESTS = 200
+
+def repeats(size):
+    return 5 if size <= 10000 else 2
+
+def timed(fn, repeat):
+    """Median seconds per call of fn() over `repeat` calls, and the last result."""
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples), result
+
+def load(name, path):
+    # The backend and dev_app both have an "app" module; load each under its own name
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def fake_toasts():
+    # Stand-in for win10toast so dev_app imports on any OS
+    toast = types.ModuleType("win10toast")
+    toast.ToastNotifier = lambda: types.SimpleNamespace(show_toast=lambda *args, **kwargs: None)
+    sys.modules["win10toast"] = toast
+
+def run_size(size):
+    """Run every case on a calendar of `size` meetings; returns {case: {"seconds": s, "ops": n}}."""
+    results = {}
+
+    def record(case, seconds, ops=1):
+        results[case] = {"seconds": seconds, "ops": ops}
+
+    calendars = generate_calendars(ACCOUNTS, size // ACCOUNTS, days=DAYS_AHEAD)
+    namespace = FakeNamespace(calendars)
+    fake_outlook(namespace)
+    fake_toasts()
+    repeat = repeats(size)
+    quiet = contextlib.redirect_stdout(open(os.devnull, "w"))
+
+    # ----- Fetch (backend) -----
+    sys.path.insert(0, os.path.join(ROOT, "backend"))
+    with quiet:
+        from alarm import meeting_ahead, alarm
+    seconds, meetings = timed(lambda: meeting_ahead.meetings_ahead(namespace, DAYS_AHEAD), repeat)
+    record("meetings_ahead", seconds)
+    results["meetings"] = len(meetings)
+    record("next_meetings(1)", timed(lambda: meeting_ahead.next_meetings(namespace, 1, DAYS_AHEAD), repeat)[0])
+
+    # ----- Provider calls: per-item property reads vs columnar (Table) reads -----
+    # Items count their property reads while this runs: Outlook answers each
+    # one with a cross-process call
+    for items in calendars.values():
+        for item in items:
+            item.__class__ = CountingAppointment
+    source = OutlookSource(namespace)
+    now = datetime.now()
+    end = now + timedelta(days=DAYS_AHEAD)
+
+    def per_item():
+        for account in source.accounts():
+            for item in source.window(account, now, end):
+                meeting_ahead._to_meeting(item, account[1], 0)
+
+    def columnar():
+        for account in source.accounts():
+            batch = source.columns(account, now, end, meeting_ahead.MEETING_COLUMNS)
+            meeting_ahead._batch_to_meetings(batch, account[1], 0, now, end)
+    columnar()  # Series cache warm, as in every sync after the first
+    for case, fetch in (("per item", per_item), ("columnar", columnar)):
+        provider_calls.clear()
+        fetch()
+        results[f"provider_calls ({case})"] = sum(provider_calls.values())
+        record(f"fetch all accounts ({case})", timed(fetch, repeat)[0])
+    for items in calendars.values():
+        for item in items:
+            item.__class__ = FakeAppointment
+
+    # ----- Alarm queue (feature_funcs) -----
+    sys.path.insert(0, os.path.join(ROOT, "dev_app", "feature_funcs"))
+    with quiet:
+        feature = load("feature_alarm", os.path.join(ROOT, "dev_app", "feature_funcs", "alarm.py"))
+    from alarm_queue import AlarmQueue
+
+    def ring_time():
+        feature.alarms = AlarmQueue()
+        return feature.ring_time(meetings)
+    record("ring_time", timed(ring_time, repeat)[0])
+    rng = random.Random(0)
+    picked = [rng.choice(meetings) for _ in range(SNOOZES)]
+
+    def snooze_all():
+        for meeting in picked:
+            meeting["snoozed"] += 5
+            feature.snooze(meeting)
+    record("snooze", timed(snooze_all, 1)[0], SNOOZES)
+
+    # ----- Sync and storage (dev_app) -----
+    workdir = tempfile.mkdtemp(prefix="bench-suite-")
+    os.chdir(workdir)
+    sys.path.insert(0, os.path.join(ROOT, "dev_app"))
+    with quiet:
+        t0 = time.perf_counter()
+        dev_app = load("dev_app_app", os.path.join(ROOT, "dev_app", "app.py"))
+        record("dev_app import", time.perf_counter() - t0)
+        dev_app.started.set()  # No start() here or on a request: the sync is timed here, not in the background
+        dev_app.scheduler.start()
+        record("update_meetings_from_outlook (initial)", timed(dev_app.update_meetings_from_outlook, 1)[0])
+        record("update_meetings_from_outlook (no changes)",
+               timed(dev_app.update_meetings_from_outlook, repeat)[0])
+        for items in calendars.values():
+            for item in items[::100]:
+                item.Subject += " (edited)"
+                item.LastModificationTime = datetime.now()
+        record("update_meetings_from_outlook (1% edited)", timed(dev_app.update_meetings_from_outlook, 1)[0])
+        # Restart: alerts are re-armed from the store, still as one scheduler job
+        record("alert dispatcher reconcile (restart)", timed(dev_app.dispatcher.reconcile, repeat)[0])
+    results["scheduler_jobs"] = len(dev_app.scheduler.get_jobs())
+    dev_app.scheduler.shutdown(wait=False)
+
+    from meeting_store import MeetingStore
+    rows = [{"subject": m["subject"], "start_time": m["start"].astimezone().isoformat(), "account": m["account"]}
+            for m in meetings]
+    with open("bulk.json", "w") as file:
+        json.dump(rows, file)
+
+    def bulk_import():
+        if os.path.exists("bulk.db"):
+            os.remove("bulk.db")
+        store = MeetingStore("bulk.db", dev_app.local_tz)
+        store.import_json("bulk.json")
+        return store
+    seconds, store = timed(bulk_import, repeat)
+    record("store import (bulk write)", seconds, len(rows))
+    now = datetime.now(dev_app.local_tz)
+    record("store in_window (full read)",
+           timed(lambda: store.in_window(now, now + timedelta(days=DAYS_AHEAD)), repeat)[0])
+    record("store window_table (full read)",
+           timed(lambda: store.window_table(now, now + timedelta(days=DAYS_AHEAD)), repeat)[0])
+
+    # Memory per meeting: dicts of aware datetimes vs the columnar MeetingTable
+    for case, read in (("dicts", store.in_window), ("table", store.window_table)):
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        held = read(now, now + timedelta(days=DAYS_AHEAD))
+        after, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[f"bytes_per_meeting ({case})"] = round((after - before) / max(1, len(held)))
+        del held
+
+    # Outlook's wall-clock times to epoch seconds: per item vs in bulk
+    wall_clock = [m["start"] for m in meetings]
+    record("to epoch, per item", timed(lambda: [int(dt.replace(tzinfo=dev_app.local_tz).timestamp())
+                                                for dt in wall_clock], repeat)[0], len(wall_clock))
+    record("to epoch, local_epochs (bulk)",
+           timed(lambda: local_epochs(wall_clock, dev_app.local_tz), repeat)[0], len(wall_clock))
+
+    ids = [rng.randrange(1, len(rows) + 1) for _ in range(SNOOZES)]
+    record("store get", timed(lambda: [store.get(i) for i in ids], 1)[0], SNOOZES)
+
+    # ----- HTTP routes -----
+    def requests(client, path, count=REQUESTS, headers=None, uncached=False):
+        def run():
+            for _ in range(count):
+                if uncached:
+                    dev_app.pages.clear()
+                client.get(path, headers=headers)
+        return timed(run, 1)[0]
+
+    with quiet:
+        backend = load("backend_app", os.path.join(ROOT, "backend", "app.py"))
+        backend.started.set()  # No background refresher competing with the timed requests
+        alarm.snapshot.ensure_loaded()
+        with backend.app.test_client() as client:
+            record("GET /get_next_meeting", requests(client, "/get_next_meeting"), REQUESTS)
+        with dev_app.app.test_client() as client:
+            record("GET / (dev_app)", requests(client, "/", 5, uncached=True), 5)
+            etag = client.get("/").headers["ETag"]
+            record("GET / (dev_app, cached)", requests(client, "/"), REQUESTS)
+            record("GET / (dev_app, If-None-Match)", requests(client, "/", headers={"If-None-Match": etag}), REQUESTS)
+            record("GET /api/meetings (dev_app)", requests(client, "/api/meetings", uncached=True), REQUESTS)
+            record("GET /api/meetings (dev_app, cached)", requests(client, "/api/meetings"), REQUESTS)
+            meeting_id = dev_app.store.in_window(now, now + timedelta(days=DAYS_AHEAD))[-1]["id"]
+            record("GET /snooze/<id> (dev_app)", requests(client, f"/snooze/{meeting_id}"), REQUESTS)
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare(current, baseline):
+    print(f"\n{'size':>7}  {'case':<44} {'before':>10} {'after':>10} {'ratio':>7}")
+    for size, cases in current["sizes"].items():
+        before = baseline["sizes"].get(size, {})
+        for case, result in cases.items():
+            if not isinstance(result, dict) or case not in before:
+                continue  # Counts, not timings
+            ratio = result["seconds"] / before[case]["seconds"] if before[case]["seconds"] else float("inf")
+            print(f"{size:>7}  {case:<44} {before[case]['seconds'] * 1000:8.2f}ms"
+                  f" {result['seconds'] * 1000:8.2f}ms {ratio:6.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--out", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Child process: one size, JSON on the last line of stdout
+        results = run_size(args.worker)
+        print(json.dumps(results))
+        return
+
+    revision = git_revision()
+    report = {"revision": revision, "date": datetime.now().isoformat(timespec="seconds"),
+              "python": sys.version.split()[0], "sizes": {}}
+    for size in args.sizes:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", str(size)],
+                                capture_output=True, text=True, check=True).stdout
+        results = json.loads(output.strip().splitlines()[-1])
+        report["sizes"][str(size)] = results
+        print(f"\n{size} items ({results['meetings']} meetings after recurrence expansion and dedupe,"
+              f" {results.get('scheduler_jobs', '?')} scheduler jobs, provider calls per fetch:"
+              f" {results.get('provider_calls (per item)', '?')} per item,"
+              f" {results.get('provider_calls (columnar)', '?')} columnar; bytes per stored meeting read:"
+              f" {results.get('bytes_per_meeting (dicts)', '?')} as dicts,"
+              f" {results.get('bytes_per_meeting (table)', '?')} as a table)")
+        for case, result in results.items():
+            if not isinstance(result, dict):
+                continue
+            per_op = result["seconds"] / result["ops"]
+            print(f"  {case:<44} {result['seconds'] * 1000:10.2f} ms  ({per_op * 1e6:10.1f} us/op)")
+
+    out = args.out or os.path.join(ROOT, "benchmarks", "results", f"{revision}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {out}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(report, json.load(file))
+
+if __name__ == "__main__":
+    main()
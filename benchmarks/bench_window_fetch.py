@@ -0,0 +1,53 @@
+"""
+Compare walking the whole calendar against the window-restricted fetch.
+
+Runs on any OS using the fake in-memory calendar:
+    python benchmarks/bench_window_fetch.py
+"""
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calendar_provider import restrict_to_window
+from fake_outlook import FakeAppointment, FakeNamespace
+
+DAYS_AHEAD = 30
+
+def build_namespace(total_items, seed=42):
+    # Spread items over ~5 years of history plus the next 30 days
+    rng = random.Random(seed)
+    now = datetime.now()
+    items = []
+    for i in range(total_items):
+        start = now - timedelta(minutes=rng.randint(-DAYS_AHEAD * 24 * 60, 5 * 365 * 24 * 60))
+        items.append(FakeAppointment(f"Meeting {i}", start, start + timedelta(minutes=30)))
+    return FakeNamespace({"user@example.com": items})
+
+def full_walk(namespace, now, end_time):
+    items = namespace.Folders("user@example.com").Folders("Calendar").Items
+    items.Sort("[Start]")
+    items.IncludeRecurrences = True
+    return [item for item in items if now <= item.Start <= end_time]
+
+def restricted(namespace, now, end_time):
+    items = restrict_to_window(namespace.Folders("user@example.com").Folders("Calendar").Items, now, end_time)
+    return [item for item in items if now <= item.Start <= end_time]
+
+def timed(fetch, namespace, repeat=5):
+    now = datetime.now()
+    end_time = now + timedelta(days=DAYS_AHEAD)
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fetch(namespace, now, end_time)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+if __name__ == "__main__":
+    for total in (300, 50_000):
+        namespace = build_namespace(total)
+        print(f"{total:>6} items | full walk: {timed(full_walk, namespace) * 1000:8.2f} ms"
+              f" | restricted: {timed(restricted, namespace) * 1000:8.2f} ms")
@@ -0,0 +1,371 @@
+"""
+In-memory stand-ins for the parts of the Outlook COM API that
+calendar_provider uses, so the fetch code runs (and is benchmarked)
+without Outlook: a FakeNamespace of accounts, each with a Calendar folder
+of FakeAppointment items.
+
+provider_calls counts the calls Outlook would answer across the process
+boundary.
+"""
+import os
+import re
+import sys
+import time
+import bisect
+import itertools
+import threading
+import collections
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from calendar_provider import RESTRICT_DATE_FORMAT, TABLE_COLUMN_NAMES
+from recurrence import Series
+
+
+_CONDITION = re.compile(r"\[(\w+)\]\s*(>=|<=|<>|=|>|<)\s*'?([^']*?)'?\s*$")
+
+_OPERATORS = {
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+    "=": lambda a, b: a == b,
+    "<>": lambda a, b: a != b,
+}
+
+def _parse_value(value):
+    if value in ("True", "False"):
+        return value == "True"
+    try:
+        return datetime.strptime(value, RESTRICT_DATE_FORMAT)
+    except ValueError:
+        return value
+
+def _parse_filter(query):
+    conditions = []
+    for part in re.split(r"\s+AND\s+", query.strip()):
+        match = _CONDITION.match(part.strip())
+        if not match:
+            raise ValueError(f"Unsupported filter: {part}")
+        prop, op, value = match.groups()
+        conditions.append((prop, _OPERATORS[op], _parse_value(value)))
+    return conditions
+
+
+_entry_ids = itertools.count(1)
+
+# Calls the fakes answer that Outlook would answer across the process
+# boundary, by name. Collection and Table calls are always counted; item
+# property reads only on CountingAppointment items.
+provider_calls = collections.Counter()
+
+# How the fakes read an item's properties themselves (uncounted: Outlook
+# evaluates filters and fills tables inside its own process)
+_inside = object.__getattribute__
+
+class FakeAppointment:
+    """
+    A calendar item with the same property names as an Outlook AppointmentItem.
+    Pass a FakeRecurrencePattern to make it the master of a recurring series
+    (Start/End are then those of the first occurrence). Give the same
+    global_id to items in several calendars to model one invite received by
+    several accounts.
+    """
+
+    def __init__(self, subject, start, end, entry_id=None, last_modified=None, pattern=None, global_id=None):
+        self.Subject = subject
+        self.Start = start
+        self.End = end
+        self.EntryID = entry_id or f"fake-{next(_entry_ids):08x}"
+        self.GlobalAppointmentID = global_id or f"040000008200E00074C5B7101A82E008{next(_entry_ids):016X}"
+        self.LastModificationTime = last_modified or datetime.now()
+        self.IsRecurring = pattern is not None
+        self._pattern = pattern
+        if pattern is not None:
+            pattern.PatternStartDate = start
+            pattern.StartTime = start
+            pattern.Duration = int((end - start).total_seconds() // 60)
+
+    def GetRecurrencePattern(self):
+        return self._pattern
+
+
+class CountingAppointment(FakeAppointment):
+    """A FakeAppointment that counts every property read and method call in provider_calls."""
+
+    def __getattribute__(self, name):
+        if name[:1].isupper():
+            provider_calls[name] += 1
+        return object.__getattribute__(self, name)
+
+
+class FakeRecurrencePattern:
+    """Same property names as an Outlook RecurrencePattern; see recurrence.OL_RECURS_*."""
+
+    def __init__(self, recurrence_type, interval=1, day_of_week_mask=0, day_of_month=0, month_of_year=0,
+                 instance=0, pattern_end=None, exceptions=()):
+        self.RecurrenceType = recurrence_type
+        self.Interval = interval
+        self.DayOfWeekMask = day_of_week_mask
+        self.DayOfMonth = day_of_month
+        self.MonthOfYear = month_of_year
+        self.Instance = instance
+        self.NoEndDate = pattern_end is None
+        self.PatternEndDate = pattern_end or datetime(4500, 8, 31)  # What Outlook reports for "no end"
+        self.Exceptions = list(exceptions)
+
+
+class FakeException:
+    """A deleted (appointment=None) or modified occurrence of a recurring series."""
+
+    def __init__(self, original_date, appointment=None):
+        self.OriginalDate = original_date
+        self.Deleted = appointment is None
+        self._appointment = appointment
+
+    @property
+    def AppointmentItem(self):
+        if self.Deleted:
+            raise ValueError("The occurrence was deleted")
+        return self._appointment
+
+
+class FakeItems:
+    """
+    In-memory stand-in for Outlook's Items collection.
+
+    Items are kept in start order (like the store's own index), so Sort is
+    free and Start conditions in Restrict are answered with a binary search.
+    With IncludeRecurrences, Restrict expands recurring series over the
+    Start range, like Outlook does.
+    """
+
+    def __init__(self, items, starts=None, masters=None):
+        self._items = items
+        self._starts = starts
+        self._masters = masters if masters is not None else [item for item in items if _inside(item, "IsRecurring")]
+        self.IncludeRecurrences = False
+
+    def Sort(self, prop):
+        if prop != "[Start]":
+            raise ValueError(f"Unsupported sort: {prop}")
+
+    def Restrict(self, query):
+        provider_calls["Restrict"] += 1
+        return self._restrict(query)
+
+    def _restrict(self, query):
+        conditions = _parse_filter(query)
+        if self._starts is None:
+            self._starts = [item.Start for item in self._items]
+        lo, hi = 0, len(self._items)
+        for prop, op, value in conditions:
+            if prop != "Start":
+                continue
+            if op is _OPERATORS[">="]:
+                lo = max(lo, bisect.bisect_left(self._starts, value))
+            elif op is _OPERATORS[">"]:
+                lo = max(lo, bisect.bisect_right(self._starts, value))
+            elif op is _OPERATORS["<"]:
+                hi = min(hi, bisect.bisect_left(self._starts, value))
+            elif op is _OPERATORS["<="]:
+                hi = min(hi, bisect.bisect_right(self._starts, value))
+        candidates = self._items[lo:hi]
+        if self.IncludeRecurrences:
+            candidates = [item for item in candidates if not _inside(item, "IsRecurring")] + self._expand(conditions)
+            candidates.sort(key=lambda item: _inside(item, "Start"))
+        matched = FakeItems([
+            item for item in candidates
+            if all(op(_inside(item, prop), value) for prop, op, value in conditions)
+        ])
+        matched.IncludeRecurrences = self.IncludeRecurrences
+        return matched
+
+    def _expand(self, conditions):
+        bounds = [value for prop, _, value in conditions if prop == "Start"]
+        if len(bounds) < 2 or not self._masters:
+            return []
+        occurrences = []
+        for master in self._masters:
+            for start, end, subject in Series.from_item(master).occurrences(min(bounds), max(bounds)):
+                occurrence = FakeAppointment(subject, start, end, master.EntryID, master.LastModificationTime,
+                                             global_id=master.GlobalAppointmentID)
+                occurrence.IsRecurring = True
+                occurrences.append(occurrence)
+        return occurrences
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+
+class FakeColumns:
+    def __init__(self):
+        self.names = []
+
+    def RemoveAll(self):
+        provider_calls["Columns.RemoveAll"] += 1
+        self.names = []
+
+    def Add(self, name):
+        provider_calls["Columns.Add"] += 1
+        # Schema names are answered like the property they stand for
+        self.names.append(_TABLE_PROPERTIES.get(name, name))
+
+
+class FakeTable:
+    """
+    Stand-in for an Outlook Table: the items matching a filter, read as rows
+    of the chosen columns with GetArray. Like Outlook's, it does not expand
+    recurrences. The global ID column is returned as bytes, as Outlook does.
+    """
+
+    def __init__(self, items):
+        self._items = items
+        self._position = 0
+        self.Columns = FakeColumns()
+
+    @property
+    def EndOfTable(self):
+        return self._position >= len(self._items)
+
+    def GetRowCount(self):
+        provider_calls["GetRowCount"] += 1
+        return len(self._items)
+
+    def Sort(self, prop, descending=False):
+        provider_calls["Table.Sort"] += 1
+        if prop != "[Start]" or descending:
+            raise ValueError(f"Unsupported sort: {prop}")
+
+    def GetArray(self, max_rows):
+        provider_calls["GetArray"] += 1
+        rows = self._items[self._position:self._position + max_rows]
+        self._position += len(rows)
+        names = self.Columns.names
+        return tuple(
+            tuple(_table_cell(_inside(item, name), name) for name in names)
+            for item in rows
+        )
+
+
+_TABLE_PROPERTIES = {schema: name for name, schema in TABLE_COLUMN_NAMES.items()}
+
+def _table_cell(value, name):
+    if name == "GlobalAppointmentID" and isinstance(value, str):
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            pass  # Not a hex ID (hand-made fakes); returned as it is
+    return value
+
+
+class FakeFolder:
+    def __init__(self, name, folders=None, items=None, latency=0):
+        self.Name = name
+        self.Folders = FakeFolders(folders or [])
+        self._items = sorted(items or [], key=lambda item: item.Start)
+        self._starts = [item.Start for item in self._items]
+        self._masters = [item for item in self._items if item.IsRecurring]
+        self.latency = latency  # Seconds each Items access takes, to simulate a slow store
+        self.stall = None       # threading.Event every access waits for: a hung store (see FakeNamespace.hang)
+        self.offline = False    # Every access fails, like a mailbox that can't be opened
+
+    def _access(self):
+        if self.offline:
+            raise OSError(f"The store holding '{self.Name}' is not available")
+        if self.latency:
+            time.sleep(self.latency)
+        if self.stall is not None:
+            self.stall.wait()
+
+    @property
+    def Items(self):
+        provider_calls["Items"] += 1
+        self._access()
+        # Outlook hands out a fresh collection on every access
+        return FakeItems(self._items, self._starts, self._masters)
+
+    def GetTable(self, query="", table_contents=0):
+        provider_calls["GetTable"] += 1
+        self._access()
+        items = FakeItems(self._items, self._starts, self._masters)
+        return FakeTable(list(items._restrict(query)) if query else list(self._items))
+
+    def add(self, item):
+        """Insert (or, after changing its Start, re-insert) an item, keeping start order."""
+        index = bisect.bisect_right(self._starts, item.Start)
+        self._items.insert(index, item)
+        self._starts.insert(index, item.Start)
+        if item.IsRecurring:
+            self._masters.append(item)
+
+    def remove(self, entry_id):
+        """Delete every item (all occurrences) with the given EntryID."""
+        self._items = [item for item in self._items if item.EntryID != entry_id]
+        self._starts = [item.Start for item in self._items]
+        self._masters = [item for item in self._masters if item.EntryID != entry_id]
+
+
+class FakeFolders:
+    """Supports the three ways the code reaches folders: call, index and iterate."""
+
+    def __init__(self, folders):
+        self._folders = {folder.Name: folder for folder in folders}
+
+    def __call__(self, name):
+        return self._folders[name]
+
+    def __getitem__(self, name):
+        return self._folders[name]
+
+    def __iter__(self):
+        return iter(self._folders.values())
+
+
+class FakeAccount:
+    def __init__(self, smtp_address, display_name=None):
+        self.SmtpAddress = smtp_address
+        self.DisplayName = display_name or smtp_address
+
+
+class FakeNamespace:
+    """
+    Minimal MAPI namespace backed by in-memory calendars so the fetch code can
+    run (and be benchmarked) without Outlook.
+
+    calendars: dict mapping account SMTP address to a list of FakeAppointment.
+    latency: optional dict mapping account SMTP address to the seconds every
+             access to its calendar items should take.
+    """
+
+    def __init__(self, calendars, latency=None):
+        latency = latency or {}
+        self.Accounts = [FakeAccount(address) for address in calendars]
+        self.Folders = FakeFolders([
+            FakeFolder(address, folders=[
+                FakeFolder("Calendar", items=items, latency=latency.get(address, 0))
+            ])
+            for address, items in calendars.items()
+        ])
+
+    def calendar(self, address):
+        return self.Folders(address).Folders("Calendar")
+
+    def hang(self, address):
+        """From now on every access to the account's calendar blocks, until release()."""
+        self.calendar(address).stall = threading.Event()
+
+    def release(self, address):
+        """Let a hung account's pending and future accesses through."""
+        folder = self.calendar(address)
+        stall, folder.stall = folder.stall, None
+        if stall is not None:
+            stall.set()
+
+    def set_offline(self, address, offline=True):
+        """Make every access to the account's calendar fail (or work again)."""
+        self.calendar(address).offline = offline
@@ -0,0 +1,145 @@
+"""
+Load test for the multi-tenant alarm service (backend/alarm/tenants.py).
+
+1. One shard, simulated clock: registers USERS x MEETINGS alarms spread over
+   DAYS days, then times snooze / cancel, measures the memory each pending
+   alarm costs, and drains the whole schedule tick by tick.
+2. Sharded across worker processes, real clock: the same background load
+   plus RINGING alarms due in the next few seconds, and how late each of
+   those actually fired.
+
+    python benchmarks/load_alarm_service.py [users] [meetings per user] [shards]
+"""
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "backend"))
+from alarm.tenants import TenantAlarms, AlarmCluster, shard_of
+from load_next_meeting import percentile
+
+USERS = 5000
+MEETINGS = 400        # Upcoming meetings per user
+DAYS = 30
+MEMORY_USERS = 500    # Users in the (slower) traced pass that measures memory
+OPERATIONS = 100000   # Snoozes and cancels timed in part 1
+RINGING = 2000        # Alarms due during part 2
+RINGING_WITHIN = 10   # ... within this many seconds
+
+def schedules(users, meetings, now, seed=0):
+    rng = random.Random(seed)
+    meeting_ids = [f"meeting-{j}" for j in range(meetings)]
+    return {
+        f"user-{u}": [(meeting_id, now + 60 + rng.random() * DAYS * 86400, None) for meeting_id in meeting_ids]
+        for u in range(users)
+    }
+
+def rate(count, seconds):
+    return f"{count / seconds:12,.0f}/s"
+
+def single_shard(users, meetings):
+    now = 1_700_000_000.0
+    alarms = TenantAlarms(now=now)
+    load = schedules(users, meetings, now)
+    t0 = time.perf_counter()
+    alarms.sync_users(load)
+    elapsed = time.perf_counter() - t0
+    total = len(alarms)
+    print(f"register {total:,} alarms         {elapsed:8.2f} s {rate(total, elapsed)}")
+
+    rng = random.Random(1)
+    keys = [(f"user-{rng.randrange(users)}", f"meeting-{rng.randrange(meetings)}") for _ in range(OPERATIONS)]
+    t0 = time.perf_counter()
+    for user_id, meeting_id in keys:
+        alarms.snooze(user_id, meeting_id, 5)
+    elapsed = time.perf_counter() - t0
+    print(f"snooze                      {elapsed:8.2f} s {rate(len(keys), elapsed)}")
+    t0 = time.perf_counter()
+    for user_id, meeting_id in keys:
+        alarms.cancel(user_id, meeting_id)
+    elapsed = time.perf_counter() - t0
+    print(f"cancel                      {elapsed:8.2f} s {rate(len(keys), elapsed)}")
+
+    t0 = time.perf_counter()
+    user_id = f"user-{users // 2}"
+    for _ in range(1000):
+        alarms.next_alarm(user_id)
+    print(f"next alarm of one user      {(time.perf_counter() - t0):8.4f} ms each")
+
+    pending = len(alarms)
+    fired = batches = largest = 0
+    t0 = time.perf_counter()
+    clock = now
+    while clock < now + (DAYS + 1) * 86400:
+        clock += 60  # Advance a minute of simulated time per call
+        due = alarms.fire_due(clock)
+        if due:
+            fired += len(due)
+            batches += 1
+            largest = max(largest, len(due))
+    elapsed = time.perf_counter() - t0
+    print(f"drain {DAYS + 1} days, {fired:,} fired  {elapsed:8.2f} s {rate(fired, elapsed)}"
+          f"   (largest minute {largest:,}, {len(alarms)} left of {pending:,})")
+
+def memory_per_alarm(meetings):
+    now = 1_700_000_000.0
+    load = schedules(MEMORY_USERS, meetings, now)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    alarms = TenantAlarms(now=now)
+    alarms.sync_users(load)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"memory per pending alarm    {(after - before) / len(alarms):8.0f} bytes"
+          " (bookkeeping only; the meeting payload is the caller's)")
+
+def sharded(users, meetings, shards):
+    cluster = AlarmCluster(shards)
+    cluster.start()
+    now = time.time()
+    t0 = time.perf_counter()
+    cluster.sync_users(schedules(users, meetings, now))
+    # An alarm that is already due on every shard: once all have fired, the
+    # shards have taken in the background load
+    markers = {}
+    for u in range(users):
+        markers.setdefault(shard_of(f"user-{u}", shards), f"user-{u}")
+    for user_id in markers.values():
+        cluster.schedule(user_id, "marker", time.time())
+    waiting = len(markers)
+    while waiting:
+        waiting -= sum(1 for _, meeting_id, _ in cluster.fired.get() if meeting_id == "marker")
+    print(f"{users * meetings:,} alarms over {shards} shard processes,"
+          f" taken in after {time.perf_counter() - t0:.2f} s")
+
+    # The alarms we time, each carrying its ring time
+    rng = random.Random(2)
+    start = time.time() + 1
+    for i in range(RINGING):
+        ring_at = start + rng.random() * RINGING_WITHIN
+        cluster.schedule(f"user-{rng.randrange(users)}", f"ringing-{i}", ring_at, ring_at)
+
+    lateness = []
+    deadline = time.time() + RINGING_WITHIN + 30
+    while len(lateness) < RINGING and time.time() < deadline:
+        batch = cluster.fired.get(timeout=RINGING_WITHIN + 30)
+        received = time.time()
+        lateness.extend(received - ring_at for _, _, ring_at in batch if ring_at is not None)
+    cluster.stop()
+    print(f"fired {len(lateness)} of {RINGING};"
+          f" late by p50 {percentile(lateness, 50) * 1000:.0f} ms, p99 {percentile(lateness, 99) * 1000:.0f} ms,"
+          f" max {max(lateness) * 1000:.0f} ms, early {sum(1 for late in lateness if late < 0)}")
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else USERS
+    meetings = int(sys.argv[2]) if len(sys.argv) > 2 else MEETINGS
+    shards = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+    print("-- one shard, simulated clock --")
+    single_shard(users, meetings)
+    memory_per_alarm(meetings)
+    print("\n-- sharded, real clock --")
+    sharded(users, meetings, shards)
@@ -0,0 +1,102 @@
+"""
+Load test for the backend's /get_next_meeting.
+
+Compares fetching from the calendar on every request (the old behaviour)
+with serving from the in-memory snapshot, with and without conditional GETs,
+and prints latency percentiles. Outlook is replaced by the fake calendar
+(each account takes FETCH_LATENCY seconds to answer).
+
+    python benchmarks/load_next_meeting.py
+"""
+import os
+import sys
+import time
+import types
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "backend"))
+from fake_outlook import FakeAppointment, FakeNamespace
+
+# Every run starts cold, and the backend's saved schedule stays out of the working tree
+os.environ.setdefault("ALARM_SCHEDULE_FILE", os.path.join(tempfile.mkdtemp(prefix="bench-"), "alarm_schedule.json"))
+
+CLIENTS = 8
+REQUESTS_PER_CLIENT = 25
+FETCH_LATENCY = 0.05
+
+def fake_outlook(namespace):
+    # Stand-in for the win32com / pythoncom modules so the backend imports on any OS
+    client = types.ModuleType("win32com.client")
+    client.Dispatch = lambda name: types.SimpleNamespace(GetNamespace=lambda name: namespace)
+    win32com = types.ModuleType("win32com")
+    win32com.client = client
+    pythoncom = types.ModuleType("pythoncom")
+    pythoncom.CoInitialize = lambda: None
+    sys.modules.update({"win32com": win32com, "win32com.client": client, "pythoncom": pythoncom})
+
+def build_namespace():
+    now = datetime.now()
+    calendars = {
+        f"user{a}@example.com": [
+            FakeAppointment(f"Meeting {a}-{i}", now + timedelta(hours=i + 1), now + timedelta(hours=i + 1, minutes=30))
+            for i in range(300)
+        ]
+        for a in range(3)
+    }
+    return FakeNamespace(calendars, latency={address: FETCH_LATENCY for address in calendars})
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def run(app, conditional):
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        etag = None
+        with app.test_client() as c:
+            for _ in range(REQUESTS_PER_CLIENT):
+                headers = {"If-None-Match": etag} if conditional and etag else {}
+                t0 = time.perf_counter()
+                response = c.get("/get_next_meeting", headers=headers)
+                elapsed = time.perf_counter() - t0
+                etag = response.headers.get("ETag")
+                with lock:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+def report(name, latencies):
+    print(f"{name:<28} p50 {percentile(latencies, 50) * 1000:8.2f} ms"
+          f"  p95 {percentile(latencies, 95) * 1000:8.2f} ms"
+          f"  p99 {percentile(latencies, 99) * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    fake_outlook(build_namespace())
+    import app as backend_app
+    from alarm import alarm
+
+    app = backend_app.app
+    t0 = time.perf_counter()
+    alarm.snapshot.ensure_loaded()
+    print(f"initial load: {(time.perf_counter() - t0) * 1000:.2f} ms")
+    report("snapshot", run(app, conditional=False))
+    report("snapshot + If-None-Match", run(app, conditional=True))
+
+    # Old behaviour: every request fetches the whole window again
+    original = alarm.next_meeting_snapshot
+    def uncached():
+        alarm.refresh_alarms()
+        return original()
+    backend_app.next_meeting_snapshot = uncached
+    report("fetch per request", run(app, conditional=False))
@@ -0,0 +1,94 @@
+"""
+Deterministic synthetic calendars for benchmarks.
+
+generate_calendars() builds `accounts` x `items` fake Outlook items spread
+over the next `days` days. The same arguments (and seed) always give the
+same calendars relative to `anchor`:
+
+    recurring   share of items that are recurring series (daily, weekly on
+                weekdays, or monthly) instead of one-off meetings
+    duplicates  share of items that are copies of an invite already in an
+                earlier account (same GlobalAppointmentID, subject and time)
+    timezones   organizer time zones; meetings are placed in business hours
+                there and converted to local wall-clock time, like Outlook
+                shows them
+"""
+import os
+import sys
+import random
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fake_outlook import FakeAppointment, FakeNamespace, FakeRecurrencePattern
+from recurrence import OL_RECURS_DAILY, OL_RECURS_WEEKLY, OL_RECURS_MONTHLY
+
+TIMEZONES = ("UTC", "Europe/London", "America/New_York", "Asia/Kolkata")
+WEEKDAYS = 2 | 4 | 8 | 16 | 32
+DURATIONS = (15, 30, 30, 45, 60, 90)
+SERIES_STARTED_WITHIN = 60  # Days before the anchor a recurring series may have started
+
+def _business_hour(rng, day, tz_name):
+    # A quarter-hour slot between 08:00 and 17:45 in the organizer's zone, as local wall-clock time
+    organizer = datetime(day.year, day.month, day.day, rng.randrange(8, 18), 15 * rng.randrange(4),
+                         tzinfo=ZoneInfo(tz_name))
+    return organizer.astimezone().replace(tzinfo=None)
+
+def _pattern(rng, start):
+    kind = rng.choice((OL_RECURS_DAILY, OL_RECURS_WEEKLY, OL_RECURS_WEEKLY, OL_RECURS_MONTHLY))
+    if kind == OL_RECURS_WEEKLY:
+        return FakeRecurrencePattern(kind, 1, day_of_week_mask=WEEKDAYS)
+    if kind == OL_RECURS_MONTHLY:
+        return FakeRecurrencePattern(kind, 1, day_of_month=start.day)
+    return FakeRecurrencePattern(kind, rng.choice((1, 1, 2)))
+
+def _invite(rng, anchor, days, timezones, recurring, number):
+    """One meeting invite: (global_id, subject, start, end, is_recurring, pattern seed)."""
+    is_recurring = rng.random() < recurring
+    if is_recurring:
+        day = anchor - timedelta(days=rng.randrange(SERIES_STARTED_WITHIN))
+    else:
+        day = anchor + timedelta(days=rng.randrange(days))
+    start = _business_hour(rng, day, rng.choice(timezones))
+    if not is_recurring and start <= anchor:
+        start += timedelta(days=1)
+    end = start + timedelta(minutes=rng.choice(DURATIONS))
+    kind = "Series" if is_recurring else "Meeting"
+    return (f"SYN{number:012d}", f"{kind} {number}", start, end, is_recurring, rng.random())
+
+def _appointment(invite, address, index):
+    global_id, subject, start, end, is_recurring, pattern_seed = invite
+    # Each copy gets its own pattern object; FakeAppointment fills it in from start/end
+    pattern = _pattern(random.Random(pattern_seed), start) if is_recurring else None
+    return FakeAppointment(subject, start, end, entry_id=f"{address}:{index:08d}",
+                           last_modified=start - timedelta(days=90), pattern=pattern, global_id=global_id)
+
+def generate_calendars(accounts=3, items=1000, days=8, recurring=0.05, duplicates=0.1,
+                       timezones=TIMEZONES, seed=0, anchor=None):
+    """Return {address: [FakeAppointment]} with `items` items per account."""
+    rng = random.Random(seed)
+    anchor = anchor or datetime.now().replace(minute=0, second=0, microsecond=0)
+    calendars = {}
+    invites = []  # Every invite handed out so far, for later accounts to duplicate
+    for a in range(accounts):
+        address = f"user{a}@example.com"
+        calendar, own, copied = [], [], set()
+        for i in range(items):
+            invite = None
+            if invites and rng.random() < duplicates:
+                invite = rng.choice(invites)
+                if invite[0] in copied:
+                    invite = None  # At most one copy of an invite per account
+                else:
+                    copied.add(invite[0])
+            if invite is None:
+                invite = _invite(rng, anchor, days, timezones, recurring, len(invites) + len(own))
+                own.append(invite)
+            calendar.append(_appointment(invite, address, i))
+        calendars[address] = calendar
+        invites.extend(own)
+    return calendars
+
+def generate_namespace(accounts=3, items=1000, latency=None, **options):
+    """A FakeNamespace over generate_calendars(accounts, items, **options)."""
+    return FakeNamespace(generate_calendars(accounts, items, **options), latency=latency)
@@ -0,0 +1,548 @@
+import time
+import queue
+import collections
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import heapq
+from datetime import timedelta
+from recurrence import series_cache
+from metrics import histogram
+
+# Date format understood by Outlook's Items.Restrict
+RESTRICT_DATE_FORMAT = "%m/%d/%Y %I:%M %p"
+
+FETCH_WORKERS = 4  # Default cap on how many accounts are fetched at the same time
+STREAM_READ_AHEAD = 16  # Values a stream_accounts() worker reads ahead of its consumer
+# AccountGuard defaults: the longest a guarded fetch_accounts() call takes, and
+# failures in a row before an account is backed off for 1 min, 2, 4, ... 1 h
+FETCH_DEADLINE = 20
+BREAKER_FAILURES = 3
+BREAKER_BACKOFF = 60
+BREAKER_MAX_BACKOFF = 3600
+
+# What window_columns() reads by default: every property the fetch code uses
+WINDOW_COLUMNS = ("EntryID", "GlobalAppointmentID", "Subject", "Start", "End", "LastModificationTime", "IsRecurring")
+TABLE_ROWS = 1000  # Rows per Table.GetArray call
+
+# Columns a Table only accepts by their MAPI schema name
+TABLE_COLUMN_NAMES = {
+    "GlobalAppointmentID": "http://schemas.microsoft.com/mapi/id/{6ED8DA90-450B-101B-98DA-00AA003F1358}/00030102",
+}
+
+fetch_seconds = histogram("calendar_fetch_seconds", "Time to fetch one account's calendar", ["account"])
+
+def window_filter(start, end):
+    """
+    Build an Outlook Restrict query selecting items that start in [start, end].
+
+    Restrict only has minute precision, so the window is widened to whole
+    minutes; callers still apply their exact range check on the (few) items
+    that come back.
+    """
+    start = start.replace(second=0, microsecond=0)
+    end = end.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    return "[Start] >= '{}' AND [Start] < '{}'".format(
+        start.strftime(RESTRICT_DATE_FORMAT),
+        end.strftime(RESTRICT_DATE_FORMAT),
+    )
+
+def modified_since_filter(since):
+    """
+    Build an Outlook Restrict query selecting items modified at or after `since`.
+
+    Rounded down to the minute, so an item can be returned twice across syncs;
+    callers must treat re-applying a change as a no-op.
+    """
+    since = since.replace(second=0, microsecond=0)
+    return "[LastModificationTime] >= '{}'".format(since.strftime(RESTRICT_DATE_FORMAT))
+
+def restrict_to_window(items, start, end):
+    """
+    Return only the calendar items starting in [start, end], expanded for
+    recurrences, instead of walking the whole calendar history.
+    """
+    # Order matters: Sort and IncludeRecurrences must be set before Restrict
+    items.Sort("[Start]")
+    items.IncludeRecurrences = True
+    return items.Restrict(window_filter(start, end))
+
+def _wall_clock(dt):
+    return dt.replace(tzinfo=None) if dt.tzinfo else dt
+
+def iter_window(calendar_folder, start, end, modified_since=None, cache=series_cache):
+    """
+    Yield the meetings starting in [start, end] in start order, without making
+    the provider expand recurrences (IncludeRecurrences) on every call.
+
+    One-off items come straight from a Restrict query. Recurring series are
+    read from their master item only when it changed (see
+    recurrence.SeriesCache) and expanded locally over the window; their
+    occurrences carry the master's EntryID and LastModificationTime.
+
+    With modified_since, only items (and series) modified at or after that
+    time are returned. Like restrict_to_window, bounds are minute-rounded.
+    """
+    query = "[IsRecurring] = False AND " + window_filter(start, end)
+    if modified_since is not None:
+        query += " AND " + modified_since_filter(modified_since)
+    items = calendar_folder.Items
+    items.Sort("[Start]")
+    singles = items.Restrict(query)
+
+    wall_start, wall_end = _wall_clock(start), _wall_clock(end)
+    since = _wall_clock(modified_since).replace(second=0, microsecond=0) if modified_since else None
+    series = []
+    for master in calendar_folder.Items.Restrict("[IsRecurring] = True"):
+        if since is not None and _wall_clock(master.LastModificationTime) < since:
+            continue
+        series.append(cache.occurrences(master, wall_start, wall_end))
+
+    if not series:
+        return iter(singles)
+    return heapq.merge(singles, *series, key=lambda item: _wall_clock(item.Start))
+
+
+
+# ----- Columnar (Table) fetching -----
+
+class ColumnBatch:
+    """
+    Calendar items as columns instead of objects: batch["Start"] is the list
+    of every item's Start, batch["Subject"] of every Subject, and so on, all
+    in the same (start) order.
+
+    Reading a property of an Outlook item is a cross-process COM call, so a
+    per-item loop costs several calls per meeting; a batch is filled with a
+    few bulk calls whatever the number of items (see window_columns).
+    """
+
+    __slots__ = ("names", "columns")
+
+    def __init__(self, names, columns=None):
+        self.names = tuple(names)
+        self.columns = columns if columns is not None else {name: [] for name in self.names}
+
+    @classmethod
+    def from_rows(cls, names, rows):
+        """Build a batch from row tuples whose values are in `names` order."""
+        rows = list(rows)
+        names = tuple(names)
+        if not rows:
+            return cls(names)
+        return cls(names, dict(zip(names, map(list, zip(*rows)))))
+
+    @classmethod
+    def from_items(cls, names, items):
+        """Build a batch from AppointmentItem-like objects (one property read per column per item)."""
+        return cls.from_rows(names, (tuple(getattr(item, name, None) for name in names) for item in items))
+
+    def __len__(self):
+        return len(self.columns[self.names[0]]) if self.names else 0
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def rows(self):
+        """Row tuples in `names` order."""
+        return zip(*(self.columns[name] for name in self.names))
+
+
+class _CachedMaster:
+    # A recurring master as listed by a Table: its EntryID and LastModificationTime only
+    __slots__ = ("EntryID", "LastModificationTime")
+
+    def __init__(self, entry_id, last_modified):
+        self.EntryID = entry_id
+        self.LastModificationTime = last_modified
+
+
+def _table_value(value):
+    # Binary columns (the global ID) come back as bytes; items report them as hex
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex().upper()
+    return value
+
+def read_table(table, names, rows=TABLE_ROWS):
+    """
+    Read the columns `names` of every row of an Outlook Table into a
+    ColumnBatch: one Columns.Add per column and one GetArray call per
+    `rows` rows, instead of one call per property per item.
+    """
+    table.Columns.RemoveAll()
+    for name in names:
+        table.Columns.Add(TABLE_COLUMN_NAMES.get(name, name))
+    fetched = []
+    while not table.EndOfTable:
+        chunk = table.GetArray(rows)
+        if not chunk:
+            break
+        fetched.extend(tuple(_table_value(value) for value in row) for row in chunk)
+    return ColumnBatch.from_rows(names, fetched)
+
+def window_columns(calendar_folder, start, end, columns=WINDOW_COLUMNS, modified_since=None, cache=series_cache):
+    """
+    The meetings of iter_window() as a ColumnBatch of `columns` (which must
+    include "Start"), in start order.
+
+    One-off items are read through a Table (Folder.GetTable) restricted to
+    the window, so only the requested columns cross the process boundary,
+    in bulk. Tables do not expand recurrences; series are expanded locally
+    as in iter_window and merged in. Masters are listed through a Table too,
+    and only those that changed since they were cached are opened.
+    """
+    columns = tuple(columns)
+    query = "[IsRecurring] = False AND " + window_filter(start, end)
+    if modified_since is not None:
+        query += " AND " + modified_since_filter(modified_since)
+    table = calendar_folder.GetTable(query)
+    table.Sort("[Start]")
+    singles = read_table(table, columns)
+
+    wall_start, wall_end = _wall_clock(start), _wall_clock(end)
+    since = _wall_clock(modified_since).replace(second=0, microsecond=0) if modified_since else None
+    masters = {}
+    listed = read_table(calendar_folder.GetTable("[IsRecurring] = True"), ("EntryID", "LastModificationTime"))
+    for entry_id, last_modified in listed.rows():
+        if since is None or _wall_clock(last_modified) >= since:
+            # Enough for the cache to hand out a series it already has
+            masters[entry_id] = _CachedMaster(entry_id, last_modified)
+    stale = {entry_id for entry_id, master in masters.items()
+             if not cache.is_current(entry_id, master.LastModificationTime)}
+    if stale:
+        # New or edited series: open their masters to read the pattern
+        for master in calendar_folder.Items.Restrict("[IsRecurring] = True"):
+            entry_id = master.EntryID
+            if entry_id in stale:
+                masters[entry_id] = master
+
+    series = []
+    for master in masters.values():
+        occurrences = cache.occurrences(master, wall_start, wall_end)
+        series.append(tuple(getattr(occurrence, name) for name in columns) for occurrence in occurrences)
+
+    if not series:
+        return singles
+    start_at = columns.index("Start")
+    rows = heapq.merge(singles.rows(), *series, key=lambda row: _wall_clock(row[start_at]))
+    return ColumnBatch.from_rows(columns, rows)
+
+# ----- Concurrent per-account fetching -----
+
+_worker = threading.local()
+
+def init_worker(namespace):
+    """
+    Default per-thread setup for fetch workers.
+
+    CalendarSources are asked for their per-thread source. COM objects cannot
+    be shared across apartments, so a worker handed an Outlook namespace
+    initializes COM and dispatches its own; plain Python namespaces (fakes)
+    are shared as they are.
+    """
+    if hasattr(namespace, "for_worker"):
+        namespace = namespace.for_worker()  # A CalendarSource knows how to set itself up
+    elif hasattr(namespace, "_oleobj_"):
+        import pythoncom
+        import win32com.client
+        pythoncom.CoInitialize()
+        namespace = win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
+    _worker.namespace = namespace
+
+def _account_label(account):
+    # Accounts are names or (display name, SMTP address) tuples
+    return account[-1] if isinstance(account, tuple) else account
+
+def _run_in_worker(fetch_one, account):
+    with fetch_seconds.time(account=_account_label(account)):
+        return fetch_one(_worker.namespace, account)
+
+def _start_fetches(namespace, accounts, fetch_one, max_workers, initializer):
+    # {account: Future}, fetched by at most max_workers daemon threads: a
+    # fetch that never returns holds up neither the caller nor process exit
+    futures = {account: Future() for account in accounts}
+    queue = collections.deque(accounts)
+
+    def work():
+        try:
+            initializer(namespace)
+            error = None
+        except Exception as e:
+            error = e  # Every account this worker takes fails with it
+        while True:
+            try:
+                account = queue.popleft()
+            except IndexError:
+                return
+            future = futures[account]
+            if not future.set_running_or_notify_cancel():
+                continue  # Cancelled: the deadline passed before it started
+            try:
+                if error is not None:
+                    raise error
+                future.set_result(_run_in_worker(fetch_one, account))
+            except BaseException as e:
+                future.set_exception(e)
+
+    for _ in range(max(1, min(max_workers or 1, len(accounts)))):
+        threading.Thread(target=work, name="calendar-fetch", daemon=True).start()
+    return futures
+
+def fetch_accounts(namespace, accounts, fetch_one, max_workers=FETCH_WORKERS, initializer=init_worker, guard=None):
+    """
+    Run fetch_one(worker_namespace, account) for every account on a pool of at
+    most max_workers threads, so a sync takes as long as the slowest account
+    rather than the sum of all of them.
+
+    `accounts` must be plain values (names, tuples), not COM objects. Returns
+    {account: result} in the order of `accounts`; accounts whose fetch raised
+    are reported and left out.
+
+    With a `guard` (AccountGuard) the call returns within the guard's
+    deadline however any account behaves: an account that fails, is still
+    fetching by then or is backed off gets its last good result instead, or
+    is left out if the guard keeps none.
+    """
+    accounts = list(accounts)
+    results = {}
+    if not accounts:
+        return results
+    started = time.monotonic()
+    asked = [account for account in accounts if guard is None or guard.allow(account, started)]
+    futures = _start_fetches(namespace, asked, fetch_one, max_workers, initializer)
+    if guard is not None:
+        for account, future in futures.items():
+            guard.started(account, future)
+    for account in accounts:
+        future = futures.get(account)
+        if future is not None:
+            timeout = None if guard is None else max(0.0, started + guard.deadline - time.monotonic())
+            try:
+                results[account] = future.result(timeout)
+                continue
+            except FutureTimeout:  # Not the builtin TimeoutError before Python 3.11
+                if future.cancel():
+                    print(f"Error fetching account {account}: not started within {guard.deadline}s")
+                else:
+                    guard.timed_out(account, future)
+                    print(f"Error fetching account {account}: no answer within {guard.deadline}s")
+            except Exception as e:
+                print(f"Error fetching account {account}: {e}")
+        if guard is not None:
+            found, result = guard.last_good(account)
+            if found:
+                results[account] = result
+    return results
+
+_END = object()  # Marks the end of an account's stream
+
+def stream_accounts(namespace, accounts, stream_one, initializer=init_worker, guard=None,
+                    read_ahead=STREAM_READ_AHEAD):
+    """
+    Lazy counterpart of fetch_accounts(): stream_one(worker_namespace,
+    account) is a generator, run for every account on its own daemon thread
+    (so COM objects never leave the thread that read them), and the returned
+    list holds one iterator per account over the values it yields. Workers
+    stay at most `read_ahead` values ahead of their iterator and stop when it
+    is closed.
+
+    With a `guard` (AccountGuard), accounts it holds back (see
+    AccountGuard.allow_read) are left out, and an account that yields nothing
+    within the guard's deadline (or then stalls for as long) ends its
+    iterator early: a hung account can't stall the caller. An account whose
+    generator raises is reported and ends its iterator.
+    """
+    started = time.monotonic()
+    streams = []
+    for account in accounts:
+        if guard is not None and not guard.allow_read(account, started):
+            print(f"Skipping account {account}: backed off or not answering")
+            continue
+        streams.append(_account_stream(namespace, account, stream_one, initializer, guard, started, read_ahead))
+    return streams
+
+def _account_stream(namespace, account, stream_one, initializer, guard, started, read_ahead):
+    values = queue.Queue(maxsize=read_ahead)
+    closed = threading.Event()
+    first = Future()  # Done with the account's first answer: a value, the end, or an error
+    first.set_running_or_notify_cancel()
+
+    def put(entry):
+        # Waits while the reader is behind; False once it is gone
+        while not closed.is_set():
+            try:
+                values.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def work():
+        try:
+            initializer(namespace)
+            for value in stream_one(_worker.namespace, account):
+                if not first.done():
+                    first.set_result(None)
+                if not put((True, value)):
+                    return
+            if not first.done():
+                first.set_result(None)
+            put((True, _END))
+        except BaseException as e:
+            if not first.done():
+                first.set_exception(e)
+            put((False, e))
+
+    if guard is not None:
+        guard.reading(account, first)
+    threading.Thread(target=work, name="calendar-stream", daemon=True).start()
+
+    def read():
+        try:
+            timeout = None if guard is None else max(0.0, started + guard.deadline - time.monotonic())
+            while True:
+                try:
+                    succeeded, value = values.get(timeout=timeout)
+                except queue.Empty:
+                    if not first.done():
+                        guard.timed_out(account, first)
+                    print(f"Error reading account {account}: no answer within {guard.deadline}s")
+                    return
+                if not succeeded:
+                    print(f"Error reading account {account}: {value}")
+                    return
+                if value is _END:
+                    return
+                yield value
+                timeout = None if guard is None else guard.deadline
+        finally:
+            closed.set()
+
+    return read()
+
+
+class _AccountState:
+    __slots__ = ("failures", "retry_at", "running", "reading", "timed_out")
+
+    def __init__(self):
+        self.failures = 0     # Failed or timed-out fetches in a row
+        self.retry_at = 0.0   # time.monotonic() before which the account is not asked (breaker open)
+        self.running = None   # Future of the fetch in flight, if any
+        self.reading = None   # Future of a stream's first answer, while it is awaited
+        self.timed_out = None  # Future already counted as a failure when it missed the deadline
+
+
+class AccountGuard:
+    """
+    Per-account deadlines, last-known-good results and circuit breaking for
+    fetch_accounts(), so one slow or hung account (an offline shared
+    mailbox, a PST on a network drive) can't stall the whole sync.
+
+    - A guarded fetch_accounts() returns after `deadline` seconds at most.
+      Accounts that miss it get their last good result (if `remember`) and
+      their fetch goes on in the background: a late answer becomes the last
+      good result for next time.
+    - After `failures` failed or late fetches in a row an account is not
+      asked for `backoff` seconds, doubling with each further failure up to
+      `max_backoff`. The first fetch after that is a trial: one success
+      closes the breaker, a failure re-opens it for longer.
+    - An account whose previous fetch is still running (hung) is not asked
+      again, so a hung store costs at most one blocked thread.
+    - stream_accounts() readers are held to the same deadline and breaker
+      (see allow_read); what they read is not kept as a last good result.
+
+    Keep `remember` off for results that must not be replayed (e.g.
+    incremental changes): such accounts are then left out instead.
+    """
+
+    def __init__(self, deadline=FETCH_DEADLINE, failures=BREAKER_FAILURES, backoff=BREAKER_BACKOFF,
+                 max_backoff=BREAKER_MAX_BACKOFF, remember=True):
+        self.deadline = deadline
+        self.failures = failures
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.remember = remember
+        self._states = {}
+        self._last_good = {}
+        self._lock = threading.Lock()
+
+    def _state(self, account):
+        state = self._states.get(account)
+        if state is None:
+            state = self._states[account] = _AccountState()
+        return state
+
+    def allow(self, account, now=None):
+        """True if the account should be fetched now (breaker closed or due for a trial, nothing hung)."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._state(account)
+            return state.running is None and now >= state.retry_at
+
+    def allow_read(self, account, now=None):
+        """
+        True if a streaming read of the account may start now: breaker closed
+        or due for a trial, no fetch or read still running past its deadline,
+        and no other read waiting for the account's first answer. A fetch
+        merely in flight doesn't hold a read back.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            state = self._state(account)
+            hung = state.timed_out is not None and not state.timed_out.done()
+            return not hung and state.reading is None and now >= state.retry_at
+
+    def started(self, account, future):
+        with self._lock:
+            self._state(account).running = future
+        future.add_done_callback(lambda future: self._finished(account, future))
+
+    def reading(self, account, future):
+        """Like started(), for a future done with a streaming read's first answer (never kept as last good)."""
+        with self._lock:
+            self._state(account).reading = future
+        future.add_done_callback(lambda future: self._finished(account, future, remember=False))
+
+    def timed_out(self, account, future):
+        """Count a fetch that missed the deadline as a failure (it keeps running)."""
+        with self._lock:
+            if not future.done():
+                state = self._state(account)
+                self._failed(account, state)
+                state.timed_out = future
+
+    def _finished(self, account, future, remember=True):
+        with self._lock:
+            state = self._state(account)
+            if state.running is future:
+                state.running = None
+            if state.reading is future:
+                state.reading = None
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                state.failures = 0
+                state.retry_at = 0.0
+                if self.remember and remember:
+                    self._last_good[account] = future.result()
+            elif state.timed_out is not future:
+                self._failed(account, state)
+
+    def _failed(self, account, state):
+        state.failures += 1
+        if state.failures >= self.failures:
+            delay = min(self.max_backoff, self.backoff * 2 ** (state.failures - self.failures))
+            state.retry_at = time.monotonic() + delay
+            print(f"Account {account} failed {state.failures} times in a row; next try in {delay:.0f}s")
+
+    def last_good(self, account):
+        """(True, result) of the account's last successful fetch, or (False, None)."""
+        with self._lock:
+            if account in self._last_good:
+                return True, self._last_good[account]
+            return False, None
+
+    def status(self, account):
+        """(failures in a row, seconds until it is asked again or 0)."""
+        with self._lock:
+            state = self._state(account)
+            return state.failures, max(0.0, state.retry_at - time.monotonic())
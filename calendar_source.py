@@ -0,0 +1,99 @@
+import os
+import threading
+from calendar_provider import iter_window, window_columns, ColumnBatch, WINDOW_COLUMNS
+
+
+class CalendarSource:
+    """
+    Where meetings come from. The fetch code only needs two things from a
+    calendar backend:
+
+        accounts()  -> [(display_name, address)] of the calendars it serves
+        window(account, start, end, modified_since=None)
+                    -> items starting in [start, end], in start order, with
+                       the AppointmentItem property names (Subject, Start,
+                       End, EntryID, GlobalAppointmentID,
+                       LastModificationTime, IsRecurring)
+
+    and may implement a bulk read of the same window:
+
+        columns(account, start, end, columns=WINDOW_COLUMNS, modified_since=None)
+                    -> a calendar_provider.ColumnBatch of just those
+                       properties, in start order
+
+    which by default is built from window(). Sources may be used from
+    several fetch threads at once.
+    """
+
+    def accounts(self):
+        raise NotImplementedError
+
+    def window(self, account, start, end, modified_since=None):
+        raise NotImplementedError
+
+    def columns(self, account, start, end, columns=WINDOW_COLUMNS, modified_since=None):
+        return ColumnBatch.from_items(columns, self.window(account, start, end, modified_since))
+
+    def for_worker(self):
+        """The source to use on a fetch worker thread (see calendar_provider.init_worker)."""
+        return self
+
+
+class OutlookSource(CalendarSource):
+    """
+    Outlook through its MAPI namespace (or a FakeNamespace).
+
+    Nothing is dispatched until first use. COM objects cannot cross threads,
+    so every other thread that uses the source initializes COM and
+    dispatches its own namespace; plain Python namespaces are shared.
+    """
+
+    def __init__(self, namespace=None):
+        self._namespace = namespace
+        self._owner = threading.get_ident()
+        self._local = threading.local()
+
+    @property
+    def namespace(self):
+        if self._namespace is not None and (
+                not hasattr(self._namespace, "_oleobj_") or threading.get_ident() == self._owner):
+            return self._namespace
+        namespace = getattr(self._local, "namespace", None)
+        if namespace is None:
+            import pythoncom
+            import win32com.client
+            pythoncom.CoInitialize()
+            namespace = win32com.client.Dispatch("Outlook.Application").GetNamespace("MAPI")
+            self._local.namespace = namespace
+        return namespace
+
+    def accounts(self):
+        return [(account.DisplayName, account.SmtpAddress) for account in self.namespace.Accounts]
+
+    def window(self, account, start, end, modified_since=None):
+        display_name, _ = account
+        calendar_folder = self.namespace.Folders(display_name).Folders("Calendar")
+        return iter_window(calendar_folder, start, end, modified_since)
+
+    def columns(self, account, start, end, columns=WINDOW_COLUMNS, modified_since=None):
+        display_name, _ = account
+        calendar_folder = self.namespace.Folders(display_name).Folders("Calendar")
+        return window_columns(calendar_folder, start, end, columns, modified_since)
+
+
+def as_source(source_or_namespace):
+    """Accept a CalendarSource, or an Outlook/fake MAPI namespace as older callers pass."""
+    if isinstance(source_or_namespace, CalendarSource):
+        return source_or_namespace
+    return OutlookSource(source_or_namespace)
+
+def open_source(spec):
+    """
+    Build a source from a setting: "outlook", or one or more .ics files
+    separated by os.pathsep (each file is one account, named after the file).
+    """
+    if not spec or spec == "outlook":
+        return OutlookSource()
+    from ics_source import IcsSource
+    paths = [path for path in spec.split(os.pathsep) if path]
+    return IcsSource({os.path.splitext(os.path.basename(path))[0]: path for path in paths})
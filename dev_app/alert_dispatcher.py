@@ -0,0 +1,72 @@
+import threading
+from datetime import datetime, timedelta
+from store_writer import StoreWriter
+
+DISPATCH_JOB = "alert-dispatcher"
+
+
+class AlertDispatcher:
+    """
+    Rings meeting alerts from the schedule persisted in the store (each
+    meeting's alert_time) using one scheduler job, always set for the
+    earliest pending alert.
+
+    The scheduler never holds more than that one job, however many meetings
+    there are, and a restart loses nothing: reconcile() re-reads the store
+    and re-arms. Anything that changes alert times calls rearm() afterwards.
+
+    Alerts are changed only through `writer` (a StoreWriter of the store),
+    so claiming the due alerts can't race a snooze. A meeting is removed
+    (with its copies) in the same step that claims its alert: nothing left
+    behind for reconcile() to arm again.
+    """
+
+    def __init__(self, scheduler, store, fire, lead=timedelta(minutes=5), writer=None):
+        self.scheduler = scheduler
+        self.store = store
+        self.fire = fire  # fire(meeting), called on the scheduler's worker thread
+        self.lead = lead
+        self.writer = writer or StoreWriter(store)
+        self._lock = threading.Lock()
+
+    def rearm(self):
+        """Point the dispatcher job at the earliest pending alert; returns its time or None."""
+        with self._lock:
+            when = self.store.next_alert()
+            if when is None:
+                if self.scheduler.get_job(DISPATCH_JOB):
+                    self.scheduler.remove_job(DISPATCH_JOB)
+                return None
+            # A late wake-up still rings (misfire_grace_time=None), once (coalesce)
+            self.scheduler.add_job(
+                self.dispatch, 'date', run_date=when, id=DISPATCH_JOB, replace_existing=True,
+                misfire_grace_time=None, coalesce=True, max_instances=2
+            )
+            return when
+
+    def reconcile(self):
+        """Check the persisted alerts against the stored meetings in bulk, then re-arm."""
+        changed = self.writer.apply(self._reconcile_alerts)
+        self.rearm()
+        return changed
+
+    def _reconcile_alerts(self, store):
+        return store.reconcile_alerts(self.lead, datetime.now(store.tz))
+
+    def dispatch(self):
+        """Ring every alert that is due (including ones missed while the app was down)."""
+        due = self.writer.apply(claim_due_alerts)
+        for meeting in due:
+            try:
+                self.fire(meeting)
+            except Exception as e:
+                print("Error ringing alert:", e)
+        self.rearm()
+
+
+def claim_due_alerts(store):
+    """Store command: the alerts due now, deleted with their meetings in the same step so each rings once."""
+    due = store.due_alerts(datetime.now(store.tz))
+    for meeting in due:
+        store.delete_with_copies(meeting)
+    return due
@@ -1,139 +1,355 @@
 # app.py
 import os
-import json
-from datetime import datetime, timedelta
+import sys
+import math
+import base64
+import threading
+from datetime import datetime, timedelta, timezone
 import pytz
 from tzlocal import get_localzone
-from flask import Flask, render_template, redirect, url_for, flash
+from flask import Flask, Response, render_template, redirect, url_for, flash, request, session, jsonify
 from apscheduler.schedulers.background import BackgroundScheduler
 from win10toast import ToastNotifier
-from outlook_fetcher import get_upcoming_meetings  # Import our fetcher
+# The shared modules (calendar_provider, metrics, ...) live at the repository
+# root; set up here once for every dev_app module imported below
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from outlook_fetcher import get_meeting_changes  # Import our fetcher
+from meeting_store import MeetingStore
+from store_writer import StoreWriter
+from render_cache import RenderCache
+from meeting_table import NO_TIME
+from alert_dispatcher import AlertDispatcher
+from notifications import NotificationDispatcher, Channel, ToastSink, ConsoleSink
+from metrics import histogram, render as render_metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 # ----- Configuration & Setup -----
 app = Flask(__name__)
 app.secret_key = "secret-key-for-session"
 
-scheduler = BackgroundScheduler()
-scheduler.start()
+scheduler = BackgroundScheduler()  # Started by start(), not on import
 
 notifier = ToastNotifier()
 
 local_tz = get_localzone()
-JSON_FILE = "meetings.json"
+DB_FILE = "meetings.db"
+JSON_FILE = "meetings.json"  # Legacy store, imported into DB_FILE on first run
 MEETING_WINDOW_DAYS = 8
+ALERT_BEFORE = timedelta(minutes=5)
+ALERT_COALESCE = 3  # Seconds: alerts ringing this close together share one toast
+TOAST_SECONDS = 10  # How long a toast stays up; the next one waits for it
+SNOOZE_MINUTES = 10
+API_PAGE_SIZE = 100  # Meetings per /api/meetings page unless ?limit= says otherwise
+API_MAX_PAGE_SIZE = 500
+FETCH_WORKERS = 4  # Max accounts fetched from Outlook at the same time
 
-# ----- JSON Persistence Functions -----
-def load_meetings():
-    if os.path.exists(JSON_FILE):
-        with open(JSON_FILE, "r") as file:
-            try:
-                data = json.load(file)
-                # Convert ISO strings back to datetime objects
-                for meeting in data:
-                    meeting["start_time"] = datetime.fromisoformat(meeting["start_time"]).astimezone(local_tz)
-                return data
-            except json.JSONDecodeError:
-                return []
-    return []
-
-def save_meetings(meetings):
-    serializable_meetings = []
-    for m in meetings:
-        serializable_meetings.append({
-            "id": m["id"],
-            "subject": m["subject"],
-            "start_time": m["start_time"].isoformat(),
-            "alert_job_id": m.get("alert_job_id", None)
-        })
-    with open(JSON_FILE, "w") as file:
-        json.dump(serializable_meetings, file)
-
-def get_next_meeting_id(meetings):
-    if not meetings:
-        return 1
-    return max(m["id"] for m in meetings) + 1
+# ----- Metrics -----
+sync_seconds = histogram("sync_seconds", "Time spent syncing meetings from Outlook", ["phase"])
+alarm_lateness = histogram("alarm_lateness_seconds", "How late alerts fire (fire time minus alert time)")
+render_seconds = histogram("render_seconds", "Time to build a response that was not cached", ["page"])
+
+# ----- Persistence -----
+# Meetings and their alert times from the last run: pages and alarms work
+# from this before Outlook has been asked anything
+store = MeetingStore(DB_FILE, local_tz)
+# Everything that changes the store goes through this one writer thread, in
+# order; requests and jobs submit commands and wait on their futures
+writer = StoreWriter(store)
 
 # ----- Notification Alert Function -----
-def alert_meeting(meeting_id, subject, start_time):
-    msg = f"Meeting '{subject}' starting at {start_time.strftime('%H:%M')}"
-    print("ALERT:", msg)
-    notifier.show_toast("Meeting Alert", msg, duration=10, threaded=True)
-    # Remove the meeting after the alert
-    meetings = load_meetings()
-    meetings = [m for m in meetings if m["id"] != meeting_id]
-    save_meetings(meetings)
+# Alerts of meetings starting together go out as one toast, from a small
+# pool of worker threads instead of a thread per toast
+notifications = NotificationDispatcher([
+    Channel("toast", ToastSink(notifier, duration=TOAST_SECONDS), min_interval=1),
+    Channel("console", ConsoleSink()),
+], window=ALERT_COALESCE)
+
+def alert_meeting(meeting):
+    alarm_lateness.observe((datetime.now(local_tz) - meeting["alert_time"]).total_seconds())
+    msg = f"Meeting '{meeting['subject']}' starting at {meeting['start_time'].strftime('%H:%M')}"
+    # The dispatcher already removed the meeting (and its copies in other accounts)
+    notifications.notify("Meeting Alert", msg)
+
+# Alert times are stored with the meetings; one scheduler job rings them
+dispatcher = AlertDispatcher(scheduler, store, alert_meeting, lead=ALERT_BEFORE, writer=writer)
+
+# ----- Store commands (run on the writer: command(store, ...)) -----
+def cancel_alert(store, meeting_id):
+    """Drop a meeting and its copies for good; returns it, or None if it is gone already."""
+    meeting = store.get(meeting_id)
+    if meeting:
+        store.cancel(meeting)
+    return meeting
+
+def snooze_alert(store, meeting_id, minutes):
+    """Move a meeting's alert `minutes` from now (but before it starts); returns (meeting, alert time) or None."""
+    meeting = store.get(meeting_id)
+    if not meeting:
+        return None
+    new_alert_time = datetime.now(local_tz) + timedelta(minutes=minutes)
+    # Ensure alert does not exceed meeting start time
+    if new_alert_time > meeting["start_time"]:
+        new_alert_time = meeting["start_time"] - timedelta(seconds=10)
+    # Whichever account's copy held the alert, it now rings from this one
+    store.clear_alerts([m["id"] for m in store.copies(meeting["uid"])])
+    store.update(meeting_id, alert_time=new_alert_time)
+    return meeting, new_alert_time
+
+def drop_copy(store, meeting):
+    """
+    Drop one account's copy of a meeting. If it held the meeting's alert and
+    other accounts still have the meeting, the alert moves to one of them.
+    """
+    store.delete(meeting["id"])
+    if meeting["alert_time"]:
+        for m in store.copies(meeting["uid"]):
+            store.update(m["id"], alert_time=meeting["alert_time"])
+            break
 
 # ----- Outlook Meetings Synchronization -----
+def merge_copies(meetings):
+    """
+    One row per meeting: copies from several accounts are shown together, on
+    the row holding the alert. Takes and returns a MeetingTable.
+    """
+    groups = {}
+    for index, (uid, meeting_id) in enumerate(zip(meetings.uid, meetings.id)):
+        groups.setdefault(uid or meeting_id, []).append(index)
+    shown = [next((i for i in copies if meetings.alert[i] != NO_TIME), copies[0]) for copies in groups.values()]
+    accounts = [", ".join(meetings.account_of(i) for i in copies) for copies in groups.values()]
+    return meetings.take(shown, account=accounts)
+
 def update_meetings_from_outlook():
-    """Fetch meetings from Outlook and integrate them into the local JSON store."""
-    outlook_meetings = get_upcoming_meetings()
-    meetings = load_meetings()
-    now = datetime.now(local_tz)
+    """
+    Pull only what changed in Outlook since the previous sync and reconcile it
+    into the local store: new meetings are added, rescheduled ones are moved
+    and meetings deleted in Outlook are dropped along with their alerts.
+    """
+    with sync_seconds.time(phase="fetch"):
+        changes = get_meeting_changes(store.get_sync_state(), days=MEETING_WINDOW_DAYS, max_workers=FETCH_WORKERS)
+    with sync_seconds.time(phase="reconcile"):
+        updated = writer.apply(reconcile, changes)
+        dispatcher.reconcile()
+    if not updated:
+        print("No meeting changes from Outlook.")
 
-    # For simplicity, use the subject and start_time to determine uniqueness
-    existing = {(m["subject"], m["start_time"].isoformat()) for m in meetings}
+def reconcile(store, changes):
+    """Apply get_meeting_changes() results to the store; returns True if anything changed."""
+    now = datetime.now(local_tz)
+    now_ts = now.timestamp()
 
     updated = False
-    for om in outlook_meetings:
-        key = (om["subject"], om["start_time"].isoformat())
-        # Only add if meeting not already present and meeting is in the future
-        if key not in existing and om["start_time"] > now:
-            meeting_id = get_next_meeting_id(meetings)
-            # Calculate alert time (5 minutes before the meeting)
-            alert_time = om["start_time"] - timedelta(minutes=5)
-            # Schedule the alert only if alert time is in the future
-            if alert_time > now:
-                job = scheduler.add_job(
-                    alert_meeting,
-                    'date',
-                    run_date=alert_time,
-                    args=[meeting_id, om["subject"], om["start_time"]]
-                )
-                new_meeting = {
-                    "id": meeting_id,
-                    "subject": om["subject"],
-                    "start_time": om["start_time"],
-                    "alert_job_id": job.id,
-                    "account": om.get("account", "Unknown")  # Add the account info
-                }
-                meetings.append(new_meeting)
+    if changes and store.drop_legacy():
+        # Meetings imported from meetings.json: Outlook's copies replace them
+        updated = True
+    for account, change in changes.items():
+        changed_ids = set(change["changed"].entry_id)
+        with store.transaction():
+            # Cancelled by the user: fetched again (the watermark minute is) but not re-added
+            store.forget_cancelled(account, change["entry_ids"], now_ts)
+            cancelled = store.cancelled(account)
+            # Occurrences we already know of, for items that changed in Outlook
+            known = {}
+            for m in store.for_account(account):
+                if m["entry_id"] not in change["entry_ids"]:
+                    # Deleted in Outlook (or moved out of the window)
+                    drop_copy(store, m)
+                    updated = True
+                    print(f"Removed meeting: {m['subject']} at {m['start_time']} from account: {account}")
+                elif m["entry_id"] in changed_ids:
+                    known[(m["entry_id"], int(m["start_time"].timestamp()))] = m
+
+            added = []
+            for om in change["changed"]:
+                existing = known.pop((om["entry_id"], om["start_ts"]), None)
+                if existing:
+                    # Same occurrence, keep its (possibly snoozed) alert
+                    if (existing["subject"], existing["uid"]) != (om["subject"], om["uid"]):
+                        store.update(existing["id"], subject=om["subject"], uid=om["uid"])
+                        updated = True
+                elif (om["entry_id"], om["start_ts"]) not in cancelled:
+                    added.append(om)
+
+            # Occurrences of changed items that no longer exist were rescheduled or removed;
+            # drop them first so a rescheduled meeting is not mistaken for a copy of itself
+            for m in known.values():
+                drop_copy(store, m)
                 updated = True
-                print(f"Added meeting: {om['subject']} at {om['start_time']} from account: {new_meeting['account']}")
-    if updated:
-        save_meetings(meetings)
-    else:
-        print("No new meetings to add from Outlook.")
+                print(f"Removed meeting: {m['subject']} at {m['start_time']} from account: {account}")
+
+            for om in added:
+                # Only add meetings that are in the future
+                if om["start_ts"] <= now_ts:
+                    continue
+                # Schedule the alert only if alert time is in the future
+                alert_time = om["start_time"] - ALERT_BEFORE
+                if alert_time > now:
+                    # The same invite in another account already has an alert
+                    duplicate = bool(store.copies(om["uid"]))
+                    store.add({
+                        "subject": om["subject"],
+                        "start_time": om["start_time"],
+                        "account": account,  # Add the account info
+                        "entry_id": om["entry_id"],
+                        "uid": om["uid"],
+                        "alert_time": None if duplicate else alert_time
+                    })
+                    updated = True
+                    print(f"Added meeting: {om['subject']} at {om['start_time']} from account: {account}")
 
+            store.set_sync_state(account, change["state"])
+    return updated
 
-# Schedule this function to run periodically (e.g., every 10 minutes)
-scheduler.add_job(update_meetings_from_outlook, 'interval', minutes=10)
 
-# Optionally, call it at startup so it runs immediately.
-update_meetings_from_outlook()
+# Set once start() has run in this process
+started = threading.Event()
+_start_lock = threading.Lock()
+
+def start():
+    """
+    Start the background work, once per process (later calls do nothing).
+    Returns within milliseconds: alerts are re-armed from the store, and the
+    first sync with Outlook runs on the scheduler instead of holding up the
+    first request. Serve meetings.db from one process: each one that
+    starts syncs and rings alerts.
+    """
+    with _start_lock:  # Concurrent first requests wait for the one starting
+        if started.is_set():
+            return
+        started.set()
+        writer.apply(MeetingStore.import_json, JSON_FILE)  # Carry over meetings from the old JSON store
+        scheduler.start()
+        # Alerts persisted before a restart ring again, even if Outlook is unreachable
+        dispatcher.reconcile()
+        # Sync now in the background, then every 10 minutes
+        scheduler.add_job(update_meetings_from_outlook, 'interval', minutes=10, next_run_time=datetime.now(local_tz))
+
+@app.before_request
+def start_on_first_request():
+    # Under `flask run` or a WSGI server nothing runs __main__: the process
+    # serving requests starts the work itself (the reloader's parent never does)
+    if not started.is_set():
+        start()
+
+# ----- Response cache -----
+# Pages and API answers are built once per schedule version: refreshing a
+# dashboard costs a version check and, usually, an empty 304
+pages = RenderCache()
+
+def moving_window_deadline(now_ts, end_ts=None):
+    """
+    Epoch seconds until which a window starting now still holds the same
+    meetings: when the first of them starts (and drops out) or, if its end
+    (end_ts) moves along with now, when the next meeting comes into range.
+    None if only a store change can alter it.
+    """
+    deadlines = []
+    first = store.first_start(now_ts)
+    if first is not None:
+        deadlines.append(first)
+    if end_ts is not None:
+        following = store.first_start(math.nextafter(end_ts, math.inf))
+        if following is not None:
+            deadlines.append(following - (end_ts - now_ts))
+    return min(deadlines) if deadlines else None
+
+def conditional(page, mimetype):
+    response = Response(page.body, mimetype=mimetype)
+    response.set_etag(page.etag)
+    response.last_modified = datetime.fromtimestamp(page.rendered_at, timezone.utc)
+    response.cache_control.no_cache = True  # Always revalidate, never serve stale
+    return response.make_conditional(request)
+
+def time_arg(name):
+    # An ISO 8601 query parameter as an aware datetime (naive means local time); None if absent
+    value = request.args.get(name)
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    return moment.astimezone(local_tz) if moment.tzinfo else moment.replace(tzinfo=local_tz)
+
+def encode_cursor(meeting):
+    return base64.urlsafe_b64encode(f"{meeting['start_ts']!r}:{meeting['id']}".encode()).decode()
+
+def decode_cursor(cursor):
+    # (start_ts, id) of the last meeting already returned; ValueError if malformed
+    if not cursor:
+        return None
+    try:
+        start_ts, meeting_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return float(start_ts), int(meeting_id)
+    except (ValueError, UnicodeError):
+        raise ValueError(f"Invalid cursor: {cursor}") from None
 
 # ----- Flask Route (GET-only, because no manual new meeting form) -----
+def render_index(now):
+    with render_seconds.time(page="index"):
+        window_end = now + timedelta(days=MEETING_WINDOW_DAYS)
+        # Display only meetings within the 8-day window.
+        meetings = merge_copies(store.window_table(now, window_end))
+        return render_template("index.html", meetings=meetings)
+
 @app.route("/", methods=["GET"])
 def index():
-    meetings = load_meetings()
     now = datetime.now(local_tz)
-    window_end = now + timedelta(days=MEETING_WINDOW_DAYS)
-    # Display only meetings within the 8-day window.
-    meetings = [m for m in meetings if now <= m["start_time"] <= window_end]
-    return render_template("index.html", meetings=meetings)
+    if "_flashes" in session:
+        # The page carries this visit's flash messages: not one to reuse
+        return render_index(now)
+    version = store.version  # Read before the meetings, so a write in between makes the page stale
+    key = ("index", request.script_root)
+    page = pages.get(key, version, now.timestamp())
+    if page is None:
+        body = render_index(now).encode()
+        window_end = now + timedelta(days=MEETING_WINDOW_DAYS)
+        page = pages.put(key, body, version, moving_window_deadline(now.timestamp(), window_end.timestamp()),
+                         now.timestamp())
+    return conditional(page, "text/html")
+
+@app.route("/api/meetings", methods=["GET"])
+def api_meetings():
+    """
+    Stored meetings as JSON, earliest first, a page at a time. ?from= and
+    ?to= (ISO 8601) bound the start times (default: now and the 8-day
+    window), ?account= keeps one account, ?limit= sets the page size and
+    ?cursor= continues after the previous page (its "next_cursor").
+    """
+    now = datetime.now(local_tz)
+    try:
+        start, end = time_arg("from"), time_arg("to")
+        after = decode_cursor(request.args.get("cursor"))
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    limit = min(max(request.args.get("limit", default=API_PAGE_SIZE, type=int), 1), API_MAX_PAGE_SIZE)
+    account = request.args.get("account") or None
+    version = store.version
+    key = ("api", request.args.get("from"), request.args.get("to"), account, limit, after)
+    page = pages.get(key, version, now.timestamp())
+    if page is None:
+        with render_seconds.time(page="api"):
+            start_ts = (start or now).timestamp()
+            end_ts = end.timestamp() if end else start_ts + timedelta(days=MEETING_WINDOW_DAYS).total_seconds()
+            meetings = store.page(start_ts, end_ts, account, after, limit + 1)
+            more = len(meetings) > limit
+            meetings = meetings[:limit]
+            body = app.json.dumps({
+                "status": "success",
+                "meetings": [{
+                    "id": m["id"], "subject": m["subject"], "start_time": m["start_time"].isoformat(),
+                    "account": m["account"], "entry_id": m["entry_id"], "uid": m["uid"],
+                    "alert_time": m["alert_time"].isoformat() if m["alert_time"] else None,
+                } for m in meetings],
+                "next_cursor": encode_cursor(meetings[-1]) if more else None,
+            }).encode()
+        # Only a window that starts "now" changes with time alone
+        valid_until = moving_window_deadline(now.timestamp(), None if end else end_ts) if start is None else None
+        page = pages.put(key, body, version, valid_until, now.timestamp())
+    return conditional(page, "application/json")
 
 # Routes for cancel/snooze remain as in your current code...
 @app.route("/cancel/<int:meeting_id>")
 def cancel_meeting(meeting_id):
-    meetings = load_meetings()
-    meeting = next((m for m in meetings if m["id"] == meeting_id), None)
+    meeting = writer.apply(cancel_alert, meeting_id)
     if meeting:
-        if meeting.get("alert_job_id"):
-            try:
-                scheduler.remove_job(meeting["alert_job_id"])
-            except Exception as e:
-                print("Error removing job:", e)
-        meetings = [m for m in meetings if m["id"] != meeting_id]
-        save_meetings(meetings)
+        dispatcher.rearm()
         flash("Meeting alert cancelled.", "success")
     else:
         flash("Meeting not found.", "error")
@@ -141,30 +357,23 @@ def cancel_meeting(meeting_id):
 
 @app.route("/snooze/<int:meeting_id>")
 def snooze_meeting(meeting_id):
-    meetings = load_meetings()
-    meeting = next((m for m in meetings if m["id"] == meeting_id), None)
-    if meeting:
-        if meeting.get("alert_job_id"):
-            try:
-                scheduler.remove_job(meeting["alert_job_id"])
-            except Exception as e:
-                print("Error removing job:", e)
-        new_alert_time = datetime.now(local_tz) + timedelta(minutes=10)
-        # Ensure alert does not exceed meeting start time
-        if new_alert_time > meeting["start_time"]:
-            new_alert_time = meeting["start_time"] - timedelta(seconds=10)
-        job = scheduler.add_job(
-            alert_meeting,
-            'date',
-            run_date=new_alert_time,
-            args=[meeting_id, meeting["subject"], meeting["start_time"]]
-        )
-        meeting["alert_job_id"] = job.id
-        save_meetings(meetings)
+    snoozed = writer.apply(snooze_alert, meeting_id, SNOOZE_MINUTES)
+    if snoozed:
+        meeting, new_alert_time = snoozed
+        dispatcher.rearm()
         flash(f"Meeting '{meeting['subject']}' snoozed until {new_alert_time.strftime('%H:%M')}", "success")
     else:
         flash("Meeting not found.", "error")
     return redirect(url_for("index"))
 
+@app.route("/metrics")
+def metrics():
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    use_reloader = True  # Restart the server when the code changes
+    # The reloader runs this file in two processes; only the one serving requests starts.
+    # Start before the first request, so alerts ring even if the page is never opened
+    if not use_reloader or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start()
+    app.run(debug=True, use_reloader=use_reloader)
\ No newline at end of file
@@ -1,29 +1,57 @@
-import win32com.client
-import heapq
-from datetime import datetime, timedelta
-from meetings_ahead import meetings_ahead, remove_timezone
+from datetime import timedelta
+from meetings_ahead import meetings_ahead
+from alarm_queue import AlarmQueue  # Shared module at the repository root (path set up by meetings_ahead)
 
 days_ahead = 30  # Number of days to look ahead for meetings
 ring_before = 5  # Minutes before the meeting to ring
 
-outlook = win32com.client.Dispatch("Outlook.Application")
-namespace = outlook.GetNamespace("MAPI")
+# Alarms stay queued between calls, keyed by meeting id
+alarms = AlarmQueue()
+
+def ring_key(meeting):
+    # "snoozed" is the number of minutes the alarm was pushed back
+    return meeting["ring_at"] + timedelta(minutes=meeting["snoozed"])
 
 def ring_time(meetings):
-    # for item 
-    heap = [(item["ring_at"]+item["snoozeed"], item) for item in meetings]
-    heapq.heapify(heap)
-    _, meeting = heapq.heappop(heap)
+    # New meetings are added; known ones keep their snooze unless they were rescheduled
+    current = set()
+    for item in meetings:
+        current.add(item["id"])
+        entry = alarms.get(item["id"])
+        if entry is None:
+            alarms.push(item["id"], ring_key(item), item)
+            continue
+        # Ids are stable across edits, so a known meeting may have been renamed or moved
+        _, known = entry
+        if known["start"] != item["start"]:
+            alarms.update(item["id"], ring_key(item), item)  # Rescheduled: the old snooze no longer applies
+        elif (known["subject"], known["end"], known["accounts"]) != (item["subject"], item["end"], item["accounts"]):
+            known.update(subject=item["subject"], end=item["end"], accounts=item["accounts"])
+    # Meetings that are no longer fetched (cancelled or deleted) stop ringing
+    for meeting_id in alarms:
+        if meeting_id not in current:
+            alarms.remove(meeting_id)
+    earliest = alarms.peek()
+    if earliest is None:
+        return None
+    _, _, meeting = earliest
     return meeting
 
-def snooze(meeting, meetings):
-    for meet in meetings:
-        if meeting["id"] == meet["id"]:
-            meetings.remove(meet)
-            break
-    meetings.append(meeting)
-    return ring_time(meetings)
-
-meeting = meetings_ahead(namespace, days_ahead, ring_before)
-meet = ring_time(meeting)
-print(f"Subject: {meet['subject']}, Start: {meet['start']}, End: {meet['end']}, Account: {meet['account']}, Ring at: {meet['ring_at']}")
\ No newline at end of file
+def snooze(meeting):
+    # Move the meeting's alarm in place instead of rebuilding the heap
+    alarms.push(meeting["id"], ring_key(meeting), meeting)
+    _, _, next_meeting = alarms.peek()
+    return next_meeting
+
+def cancel(meeting):
+    alarms.remove(meeting["id"])
+
+if __name__ == "__main__":
+    from calendar_source import OutlookSource
+
+    meeting = meetings_ahead(OutlookSource(), days_ahead, ring_before)
+    meet = ring_time(meeting)
+    if meet is None:
+        print("No upcoming meetings.")
+    else:
+        print(f"Subject: {meet['subject']}, Start: {meet['start']}, End: {meet['end']}, Account: {meet['account']}, Ring at: {meet['ring_at']}")
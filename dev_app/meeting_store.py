@@ -0,0 +1,351 @@
+import os
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from metrics import histogram
+from meeting_table import MeetingTable, NO_TIME
+
+store_seconds = histogram("store_seconds", "Time spent in the meeting store", ["op"])
+
+def _timestamp(moment):
+    return moment.timestamp() if moment is not None else None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subject TEXT NOT NULL,
+    start_ts REAL NOT NULL,          -- UTC epoch seconds
+    account TEXT NOT NULL DEFAULT 'Unknown',
+    entry_id TEXT,
+    uid TEXT,                        -- meeting_identity.meeting_id, shared by copies in other accounts
+    alert_ts REAL                    -- UTC epoch seconds the alert rings at, NULL if none
+);
+CREATE INDEX IF NOT EXISTS idx_meetings_start ON meetings (start_ts);
+CREATE INDEX IF NOT EXISTS idx_meetings_account ON meetings (account, entry_id);
+CREATE INDEX IF NOT EXISTS idx_meetings_account_start ON meetings (account, start_ts);  -- API pages of one account
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    account TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+
+-- Occurrences whose alert the user cancelled: a sync that fetches them again doesn't re-add them
+CREATE TABLE IF NOT EXISTS cancelled (
+    account TEXT NOT NULL,
+    entry_id TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    PRIMARY KEY (account, entry_id, start_ts)
+);
+"""
+
+UID_INDEX = "CREATE INDEX IF NOT EXISTS idx_meetings_uid ON meetings (uid)"
+# Only meetings that hold an alert are indexed, so the next alert is one lookup
+ALERT_INDEX = "CREATE INDEX IF NOT EXISTS idx_meetings_alert ON meetings (alert_ts) WHERE alert_ts IS NOT NULL"
+
+COLUMNS = ("id", "subject", "start_ts", "account", "entry_id", "uid", "alert_ts")
+
+# Meetings imported from meetings.json carry no account or Outlook EntryID;
+# they stand in until the first sync re-creates them from Outlook
+LEGACY_ACCOUNT = "Unknown"
+LEGACY_ROWS = f"account = '{LEGACY_ACCOUNT}' AND entry_id IS NULL"
+
+
+class MeetingStore:
+    """
+    SQLite-backed meeting store.
+
+    Every operation touches only the rows it needs (indexed by id, start time
+    and account), so page views, cancel/snooze and alerts cost the same no
+    matter how many meetings are stored. Meetings are returned as dicts with
+    a timezone-aware "start_time", like the old JSON store, and an
+    "alert_time" (None if the meeting holds no alert).
+    """
+
+    def __init__(self, path, tz):
+        self.tz = tz
+        self._lock = threading.RLock()
+        self._depth = 0  # Nesting level of transaction(); commits are deferred while > 0
+        # Shared by Flask request threads and the scheduler thread, guarded by _lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(meetings)")}
+        if "uid" not in columns:
+            # Databases created before meetings had a canonical id
+            self._conn.execute("ALTER TABLE meetings ADD COLUMN uid TEXT")
+        if "alert_ts" not in columns:
+            # Alerts used to live only as in-memory scheduler jobs (alert_job_id),
+            # which were gone after a restart; reconcile_alerts() re-creates them
+            self._conn.execute("ALTER TABLE meetings ADD COLUMN alert_ts REAL")
+        self._conn.execute(UID_INDEX)
+        self._conn.execute(ALERT_INDEX)
+        self._conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Group several operations into one atomic commit."""
+        with self._lock:
+            self._depth += 1
+            try:
+                yield self
+            except Exception:
+                self._depth -= 1
+                if not self._depth:
+                    self._conn.rollback()
+                raise
+            self._depth -= 1
+            if not self._depth:
+                try:
+                    with store_seconds.time(op="commit"):
+                        self._conn.commit()
+                except Exception:
+                    # e.g. "database is locked": don't leave the writes pending for the next commit
+                    self._conn.rollback()
+                    raise
+
+    @contextmanager
+    def savepoint(self):
+        """Inside transaction(): if the block raises, undo only what it did."""
+        with self._lock:
+            if not self._conn.in_transaction:
+                # Otherwise releasing the savepoint would commit on its own
+                self._conn.execute("BEGIN")
+            self._conn.execute("SAVEPOINT command")
+            try:
+                yield self
+            except Exception:
+                self._conn.execute("ROLLBACK TO command")
+                self._conn.execute("RELEASE command")
+                raise
+            self._conn.execute("RELEASE command")
+
+    def _execute(self, sql, params=()):
+        with self._lock, store_seconds.time(op="write"):
+            cursor = self._conn.execute(sql, params)
+            if not self._depth:
+                self._conn.commit()
+            return cursor
+
+    def _to_meeting(self, row):
+        meeting = dict(zip(COLUMNS, row))
+        meeting["start_time"] = datetime.fromtimestamp(meeting.pop("start_ts"), self.tz)
+        alert_ts = meeting.pop("alert_ts")
+        meeting["alert_time"] = datetime.fromtimestamp(alert_ts, self.tz) if alert_ts is not None else None
+        return meeting
+
+    def _select(self, where="", params=()):
+        sql = f"SELECT {', '.join(COLUMNS)} FROM meetings {where}"
+        with self._lock, store_seconds.time(op="read"):
+            return [self._to_meeting(row) for row in self._conn.execute(sql, params)]
+
+    # ----- Queries -----
+    def get(self, meeting_id):
+        meetings = self._select("WHERE id = ?", (meeting_id,))
+        return meetings[0] if meetings else None
+
+    def in_window(self, start, end):
+        """Meetings starting in [start, end], earliest first."""
+        return self._select(
+            "WHERE start_ts BETWEEN ? AND ? ORDER BY start_ts",
+            (start.timestamp(), end.timestamp())
+        )
+
+    def window_table(self, start, end):
+        """in_window() as a MeetingTable: rows stay epoch seconds, no datetime is built per meeting."""
+        sql = (f"SELECT {', '.join(COLUMNS)} FROM meetings"
+               " WHERE start_ts BETWEEN ? AND ? ORDER BY start_ts")
+        with self._lock, store_seconds.time(op="read"):
+            rows = self._conn.execute(sql, (start.timestamp(), end.timestamp())).fetchall()
+        ids, subjects, starts, accounts, entry_ids, uids, alerts = zip(*rows) if rows else ((),) * len(COLUMNS)
+        starts = [int(ts) for ts in starts]
+        return MeetingTable.from_columns(
+            subjects, starts, starts, accounts,  # No end times are stored
+            entry_id=entry_ids, uid=uids, alert=[NO_TIME if ts is None else int(ts) for ts in alerts], id=ids,
+            tz=self.tz, ordered=True
+        )
+
+    def page(self, start, end, account=None, after=None, limit=100):
+        """
+        Up to `limit` meetings starting in [start, end] (epoch seconds), of
+        one account or all, in (start, id) order, each with its stored
+        "start_ts". `after` is the (start_ts, id) of the last meeting of the
+        previous page: the next page is an index seek, however deep it is.
+        """
+        where = "WHERE start_ts BETWEEN ? AND ?"
+        params = [start, end]
+        if account is not None:
+            where += " AND account = ?"
+            params.append(account)
+        if after is not None:
+            where += " AND (start_ts > ? OR (start_ts = ? AND id > ?))"
+            params += [after[0], after[0], after[1]]
+        sql = f"SELECT {', '.join(COLUMNS)} FROM meetings {where} ORDER BY start_ts, id LIMIT ?"
+        with self._lock, store_seconds.time(op="read"):
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        # start_ts is kept as stored: it is what the next page's `after` must compare against
+        return [dict(self._to_meeting(row), start_ts=row[2]) for row in rows]
+
+    def first_start(self, since):
+        """Epoch seconds of the earliest meeting starting at or after `since` (epoch seconds), or None."""
+        with self._lock, store_seconds.time(op="read"):
+            return self._conn.execute("SELECT MIN(start_ts) FROM meetings WHERE start_ts >= ?", (since,)).fetchone()[0]
+
+    def for_account(self, account):
+        return self._select("WHERE account = ?", (account,))
+
+    def copies(self, uid):
+        """Every account's copy of one meeting (none for meetings without a uid)."""
+        if uid is None:
+            return []
+        return self._select("WHERE uid = ?", (uid,))
+
+    def next_alert(self):
+        """When the earliest pending alert rings, or None if there are none."""
+        with self._lock, store_seconds.time(op="read"):
+            alert_ts = self._conn.execute("SELECT MIN(alert_ts) FROM meetings WHERE alert_ts IS NOT NULL").fetchone()[0]
+        return datetime.fromtimestamp(alert_ts, self.tz) if alert_ts is not None else None
+
+    def due_alerts(self, now):
+        """Meetings whose alert rings at or before `now`, earliest first."""
+        return self._select("WHERE alert_ts <= ? ORDER BY alert_ts", (now.timestamp(),))
+
+    @property
+    def version(self):
+        """A number that changes whenever a write changes any row (and only then); not kept across restarts."""
+        with self._lock:
+            return self._conn.total_changes
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM meetings").fetchone()[0]
+
+    # ----- Point updates -----
+    def add(self, meeting):
+        """Insert a meeting and return its new id."""
+        cursor = self._execute(
+            "INSERT INTO meetings (subject, start_ts, account, entry_id, uid, alert_ts) VALUES (?, ?, ?, ?, ?, ?)",
+            (meeting["subject"], meeting["start_time"].timestamp(), meeting.get("account", LEGACY_ACCOUNT),
+             meeting.get("entry_id"), meeting.get("uid"), _timestamp(meeting.get("alert_time")))
+        )
+        return cursor.lastrowid
+
+    def update(self, meeting_id, **fields):
+        if "start_time" in fields:
+            fields["start_ts"] = fields.pop("start_time").timestamp()
+        if "alert_time" in fields:
+            fields["alert_ts"] = _timestamp(fields.pop("alert_time"))
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._execute(f"UPDATE meetings SET {assignments} WHERE id = ?", (*fields.values(), meeting_id))
+
+    def delete(self, meeting_id):
+        self._execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+
+    def delete_with_copies(self, meeting):
+        """Drop a meeting from every account it was seen in, with its alert."""
+        with self.transaction():
+            for m in self.copies(meeting["uid"]) or [meeting]:
+                self.delete(m["id"])
+
+    def cancel(self, meeting):
+        """
+        Drop a meeting from every account, like delete_with_copies(), and
+        keep a tombstone of each copy so the sync doesn't bring it back.
+        """
+        with self.transaction():
+            copies = self.copies(meeting["uid"]) or [meeting]
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cancelled (account, entry_id, start_ts) VALUES (?, ?, ?)",
+                [(m["account"], m["entry_id"], int(m["start_time"].timestamp())) for m in copies if m["entry_id"]]
+            )
+            for m in copies:
+                self.delete(m["id"])
+
+    def cancelled(self, account):
+        """{(entry_id, start_ts)} of the account's cancelled occurrences."""
+        with self._lock:
+            return set(self._conn.execute("SELECT entry_id, start_ts FROM cancelled WHERE account = ?", (account,)))
+
+    def forget_cancelled(self, account, entry_ids, now_ts):
+        """Drop the tombstones of occurrences that started or are no longer in the calendar (`entry_ids`)."""
+        stale = [(account, entry_id, start_ts) for entry_id, start_ts in self.cancelled(account)
+                 if start_ts <= now_ts or entry_id not in entry_ids]
+        if stale:
+            with self.transaction():
+                self._conn.executemany("DELETE FROM cancelled WHERE account = ? AND entry_id = ? AND start_ts = ?",
+                                       stale)
+
+    # ----- Bulk updates -----
+    def clear_alerts(self, meeting_ids):
+        with self.transaction():
+            self._conn.executemany("UPDATE meetings SET alert_ts = NULL WHERE id = ?",
+                                   [(meeting_id,) for meeting_id in meeting_ids])
+
+    def reconcile_alerts(self, lead, now):
+        """
+        Bring the persisted alerts in line with the stored meetings in a few
+        set-based statements: every meeting that has not started holds one
+        alert `lead` before its start (one per uid, across accounts), and
+        meetings that already started hold none. Snoozed alerts are kept.
+        Legacy rows from import_json() get no alert: the sync adds the same
+        meetings again, with theirs. Returns the number of rows changed.
+        """
+        now_ts = now.timestamp()
+        with self.transaction(), store_seconds.time(op="write"):
+            changed = self._conn.execute(
+                "UPDATE meetings SET alert_ts = NULL WHERE alert_ts IS NOT NULL AND start_ts <= ?", (now_ts,)
+            ).rowcount
+            # Copies of one meeting in several accounts: only the earliest alert stays
+            changed += self._conn.execute(
+                """UPDATE meetings SET alert_ts = NULL
+                   WHERE alert_ts IS NOT NULL AND uid IS NOT NULL AND id NOT IN (
+                       SELECT id FROM (SELECT id, MIN(alert_ts) FROM meetings
+                                       WHERE alert_ts IS NOT NULL AND uid IS NOT NULL GROUP BY uid))"""
+            ).rowcount
+            # Meetings (or groups of copies) left without an alert get one
+            changed += self._conn.execute(
+                f"""UPDATE meetings SET alert_ts = start_ts - ?
+                   WHERE alert_ts IS NULL AND start_ts > ? AND NOT ({LEGACY_ROWS}) AND (uid IS NULL OR (
+                       NOT EXISTS (SELECT 1 FROM meetings AS copy
+                                   WHERE copy.uid = meetings.uid AND copy.alert_ts IS NOT NULL)
+                       AND id = (SELECT MIN(id) FROM meetings AS copy
+                                 WHERE copy.uid = meetings.uid AND copy.start_ts > ?)))""",
+                (lead.total_seconds(), now_ts, now_ts)
+            ).rowcount
+        return changed
+
+    # ----- Sync watermarks -----
+    def get_sync_state(self):
+        with self._lock:
+            return {account: json.loads(state)
+                    for account, state in self._conn.execute("SELECT account, state FROM sync_state")}
+
+    def set_sync_state(self, account, state):
+        self._execute(
+            "INSERT OR REPLACE INTO sync_state (account, state) VALUES (?, ?)",
+            (account, json.dumps(state))
+        )
+
+    # ----- Migration -----
+    def import_json(self, json_file):
+        """
+        One-time import of the old meetings.json store (kept on disk as a
+        backup). The rows are shown until the first sync, which replaces
+        them (drop_legacy()); they hold no alerts, like the old store after
+        a restart.
+        """
+        if self.count() or not os.path.exists(json_file):
+            return
+        with open(json_file, "r") as file:
+            try:
+                data = json.load(file)
+            except json.JSONDecodeError:
+                return
+        with self.transaction():
+            for meeting in data:
+                self.add({"subject": meeting["subject"], "start_time": datetime.fromisoformat(meeting["start_time"])})
+
+    def drop_legacy(self):
+        """Delete the rows import_json() brought in; returns how many there were."""
+        return self._execute(f"DELETE FROM meetings WHERE {LEGACY_ROWS}").rowcount
@@ -1,60 +1,170 @@
-import win32com.client
 from datetime import datetime, timedelta
 import tzlocal
+from calendar_provider import window_columns, fetch_accounts, AccountGuard, ColumnBatch, FETCH_WORKERS
+from meeting_identity import meeting_id_from
+from meeting_table import MeetingTable, local_epochs, epoch
+from metrics import histogram, COUNT_BUCKETS
 
 # Get the local timezone
 local_tz = tzlocal.get_localzone()
 
-def get_outlook_calendars():
+# Properties read per item, in bulk through window_columns()
+FETCH_COLUMNS = ("EntryID", "GlobalAppointmentID", "Subject", "Start", "End", "LastModificationTime", "IsRecurring")
+
+# Deadlines and back-off per account (see calendar_provider.AccountGuard). A
+# full fetch falls back to the account's last good meetings; changes must
+# not be replayed, so a late account is left out of that sync and its
+# meetings stay in the store as they were
+upcoming_guard = AccountGuard()
+changes_guard = AccountGuard(remember=False)
+
+# Items read from Outlook per account fetch, and how many of them were meetings we kept
+items_fetched = histogram("calendar_items", "Calendar items per account fetch", ["account", "kind"], COUNT_BUCKETS)
+
+def get_outlook_namespace():
+    import win32com.client  # Only needed once Outlook is actually used
     outlook = win32com.client.Dispatch("Outlook.Application")
-    namespace = outlook.GetNamespace("MAPI")
+    return outlook.GetNamespace("MAPI")
+
+def get_calendar_folder(namespace, account):
+    """Return the account's Calendar folder, or None if it has none."""
+    try:
+        return namespace.Folders[account].Folders["Calendar"]
+    except Exception:
+        # Folder might not contain "Calendar" so we skip
+        return None
+
+def get_outlook_calendars(namespace=None):
+    namespace = namespace or get_outlook_namespace()
     calendars = []
-    
+
     # Iterate over top-level folders in Outlook.
     for folder in namespace.Folders:
-        try:
-            # Try accessing the Calendar folder within each account
-            calendar_folder = folder.Folders["Calendar"]
+        calendar_folder = get_calendar_folder(namespace, folder.Name)
+        if calendar_folder is not None:
             calendars.append({
                 "account": folder.Name,  # or folder.Store.DisplayName if you prefer
                 "calendar_folder": calendar_folder
             })
-        except Exception as e:
-            # Folder might not contain "Calendar" so we skip
-            continue
     return calendars
 
-def get_upcoming_meetings():
+def get_upcoming_meetings(days=8, namespace=None, max_workers=FETCH_WORKERS, guard=upcoming_guard):
     """
     Retrieves meetings from all available account calendars (if present)
-    within the next 8 days.
+    within the next 8 days, as one MeetingTable. Accounts are fetched
+    concurrently, at most max_workers at a time and for no longer than the
+    guard's deadline.
     """
-    calendars = get_outlook_calendars()
+    namespace = namespace or get_outlook_namespace()
     now = datetime.now(local_tz)
-    end_time = now + timedelta(days=8)
-    meetings = []
-
-    for calendar in calendars:
-        account_name = calendar["account"]
-        calendar_folder = calendar["calendar_folder"]
-
-        # Get all items from the calendar
-        items = calendar_folder.Items
-        items.IncludeRecurrences = True
-        items.Sort("[Start]")
-
-        for item in items:
-            try:
-                start = item.Start.replace(tzinfo=local_tz)
-                end   = item.End.replace(tzinfo=local_tz)
-                if now <= start <= end_time:
-                    meetings.append({
-                        "subject": item.Subject,
-                        "start_time": start,
-                        "end_time": end,
-                        "account": account_name  # Save the account name here
-                    })
-            except Exception as e:
-                print(f"Error processing item: {e}")
-
-    return meetings
+    end_time = now + timedelta(days=days)
+
+    def fetch(worker_namespace, account_name):
+        calendar_folder = get_calendar_folder(worker_namespace, account_name)
+        if calendar_folder is None:
+            return None
+
+        # Only the needed columns of the items inside the window, read in
+        # bulk; recurring series are expanded locally
+        batch = window_columns(calendar_folder, now, end_time, FETCH_COLUMNS)
+        meetings = _to_table(batch, account_name, now, end_time)
+        items_fetched.observe(len(batch), account=account_name, kind="scanned")
+        items_fetched.observe(len(meetings), account=account_name, kind="kept")
+        return meetings
+
+    accounts = [folder.Name for folder in namespace.Folders]
+    results = fetch_accounts(namespace, accounts, fetch, max_workers, guard=guard)
+    return MeetingTable.concat([table for table in results.values() if table is not None], tz=local_tz)
+
+def get_meeting_changes(sync_state, days=8, namespace=None, max_workers=FETCH_WORKERS, guard=changes_guard):
+    """
+    Retrieves only the meetings created or changed since the previous sync.
+
+    sync_state maps an account name to the "state" returned for it by the
+    previous call (missing accounts get a full fetch of the window).
+    Accounts are fetched concurrently, at most max_workers at a time; one
+    that fails or misses the guard's deadline is left out, and keeps its
+    state for the next call.
+
+    Returns a dict per account:
+        {
+            "changed":   meetings (all occurrences) of every item created or
+                         modified since the last sync, or that moved into the
+                         window because time passed, as a MeetingTable,
+            "entry_ids": EntryIDs of everything currently in the window, so the
+                         caller can drop deleted or moved-out meetings,
+            "state":     watermark to pass back on the next call
+        }
+    """
+    namespace = namespace or get_outlook_namespace()
+    now = datetime.now(local_tz)
+    end_time = now + timedelta(days=days)
+
+    def fetch(worker_namespace, account_name):
+        calendar_folder = get_calendar_folder(worker_namespace, account_name)
+        if calendar_folder is None:
+            return None
+        state = sync_state.get(account_name)
+
+        if state is None:
+            window = window_columns(calendar_folder, now, end_time, FETCH_COLUMNS)
+            watermark = None
+            candidates = [window]
+        else:
+            # Only the EntryID column is needed to detect deletions
+            window = window_columns(calendar_folder, now, end_time, ("EntryID", "Start"))
+            watermark = datetime.fromisoformat(state["watermark"])
+            candidates = [window_columns(calendar_folder, now, end_time, FETCH_COLUMNS, modified_since=watermark)]
+            # The part of the window that was beyond the previous sync's horizon
+            previous_end = datetime.fromisoformat(state["window_end"])
+            if previous_end < end_time:
+                candidates.append(window_columns(calendar_folder, previous_end, end_time, FETCH_COLUMNS))
+        entry_ids = set(window["EntryID"])
+
+        rows = {}  # An occurrence returned by two queries is kept once
+        scanned = len(window)
+        for batch in candidates:
+            if batch is not window:
+                scanned += len(batch)
+            for row in batch.rows():
+                rows[(row[0], row[3])] = row
+            modified = max(filter(None, batch["LastModificationTime"]), default=None)
+            if modified is not None:
+                modified = modified.replace(tzinfo=local_tz)
+                if watermark is None or modified > watermark:
+                    watermark = modified
+        batch = ColumnBatch.from_rows(FETCH_COLUMNS, sorted(rows.values(), key=lambda row: row[3]))
+        changed = _to_table(batch, account_name, now, end_time)
+
+        items_fetched.observe(scanned, account=account_name, kind="scanned")
+        items_fetched.observe(len(changed), account=account_name, kind="kept")
+        return {
+            "changed": changed,
+            "entry_ids": entry_ids,
+            "state": {
+                "watermark": (watermark or now).isoformat(),
+                "window_end": end_time.isoformat()
+            }
+        }
+
+    accounts = [folder.Name for folder in namespace.Folders]
+    results = fetch_accounts(namespace, accounts, fetch, max_workers, guard=guard)
+    return {account: change for account, change in results.items() if change is not None}
+
+def _to_table(batch, account_name, now, end_time):
+    """The meetings of a FETCH_COLUMNS batch that start in [now, end_time], as a MeetingTable."""
+    # Outlook's times are local wall-clock; converted in bulk, not per item
+    starts = local_epochs(batch["Start"], local_tz)
+    ends = local_epochs(batch["End"], local_tz)
+    lo, hi = epoch(now), epoch(end_time)
+    keep = [i for i, start in enumerate(starts) if lo <= start <= hi]
+    entry_ids, gids, subjects = batch["EntryID"], batch["GlobalAppointmentID"], batch["Subject"]
+    wall_starts, wall_ends, recurring = batch["Start"], batch["End"], batch["IsRecurring"]
+    return MeetingTable.from_columns(
+        [subjects[i] for i in keep], [starts[i] for i in keep], [ends[i] for i in keep],
+        account_name,  # Every row is this account's
+        entry_id=[entry_ids[i] for i in keep],  # Where the item lives in this account
+        # Which meeting it is, the same in every account
+        uid=[meeting_id_from(gids[i], recurring[i], subjects[i], wall_starts[i], wall_ends[i]) for i in keep],
+        tz=local_tz, ordered=True
+    )
@@ -0,0 +1,61 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 64  # Distinct pages / API queries kept
+
+
+class CachedPage:
+    __slots__ = ("body", "etag", "version", "valid_until", "rendered_at")
+
+    def __init__(self, body, etag, version, valid_until, rendered_at):
+        self.body = body
+        self.etag = etag
+        self.version = version          # Store version it was rendered from
+        self.valid_until = valid_until  # Epoch seconds; None if only a store change makes it stale
+        self.rendered_at = rendered_at  # Epoch seconds the content last actually changed
+
+
+class RenderCache:
+    """
+    Rendered responses (bytes) by key, each reused until the store version
+    changes or its own deadline passes, whichever comes first.
+
+    The version comes from MeetingStore.version, which moves only when a
+    write changes rows, so a page is re-rendered only after the schedule
+    changed, not on every request. The deadline covers what time alone
+    changes: a meeting starting drops out of a "from now" window.
+
+    ETags are a hash of the body, so a re-render that produces the same
+    bytes keeps its ETag (and Last-Modified) and clients still get 304s.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version, now):
+        """The cached page for `key` if it is still current, else None."""
+        with self._lock:
+            page = self._entries.get(key)
+            if page is None or page.version != version or (page.valid_until is not None and now >= page.valid_until):
+                return None
+            self._entries.move_to_end(key)
+            return page
+
+    def put(self, key, body, version, valid_until, now):
+        """Store a freshly rendered body; returns its CachedPage."""
+        etag = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            previous = self._entries.get(key)
+            rendered_at = previous.rendered_at if previous is not None and previous.etag == etag else now
+            page = self._entries[key] = CachedPage(body, etag, version, valid_until, rendered_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return page
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
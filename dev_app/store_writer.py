@@ -0,0 +1,96 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+from metrics import histogram
+
+MAX_BATCH = 256  # Commands applied under one commit
+
+batch_commands = histogram("store_batch_commands", "Commands applied per store commit",
+                           buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+
+class StoreWriter:
+    """
+    The one thread that changes the meeting store.
+
+    Request threads, the alert dispatcher and the Outlook sync submit
+    commands, command(store, *args), instead of writing themselves. The
+    writer applies them one after another in submission order, so each sees
+    everything before it, and a command's reads and writes can't interleave
+    with anyone else's (no lost snoozes). Whatever queued up while the last
+    commit was running is applied as one batch under a single commit (group
+    commit): a burst of snoozes costs one disk sync, not one each.
+
+    Each command runs in its own savepoint; one that raises is undone
+    without disturbing the rest of its batch. Futures complete only once
+    their batch is committed.
+    """
+
+    def __init__(self, store, max_batch=MAX_BATCH):
+        self.store = store
+        self.max_batch = max_batch
+        self._commands = deque()  # (future, command, args)
+        self._wakeup = threading.Condition()
+        self._stopped = False
+        self._thread = None
+
+    def submit(self, command, *args):
+        """Queue command(store, *args); returns a Future of its result."""
+        future = Future()
+        with self._wakeup:
+            if self._stopped:
+                raise RuntimeError("store writer is stopped")
+            self._commands.append((future, command, args))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="store-writer", daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+        return future
+
+    def apply(self, command, *args):
+        """Run a command through the writer and wait for it to be committed; returns its result."""
+        if threading.current_thread() is self._thread:
+            # Called from inside a command: already on the writer, in its transaction
+            return command(self.store, *args)
+        return self.submit(command, *args).result()
+
+    def stop(self):
+        """Apply what is queued, then stop the writer thread."""
+        with self._wakeup:
+            self._stopped = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                self._wakeup.wait_for(lambda: self._commands or self._stopped)
+                if not self._commands:
+                    return
+                batch = [self._commands.popleft() for _ in range(min(len(self._commands), self.max_batch))]
+            outcomes = []
+            try:
+                with self.store.transaction():
+                    for future, command, args in batch:
+                        if not future.set_running_or_notify_cancel():
+                            outcomes.append(None)
+                            continue
+                        try:
+                            with self.store.savepoint():
+                                outcomes.append((True, command(self.store, *args)))
+                        except Exception as e:
+                            outcomes.append((False, e))
+            except Exception as e:
+                # The commit failed: nothing in the batch was saved
+                print(f"Error committing store changes: {e}")
+                outcomes = [outcome and (False, e) for outcome in outcomes]
+            batch_commands.observe(len(batch))
+            for (future, _, _), outcome in zip(batch, outcomes):
+                if outcome is None:
+                    continue
+                succeeded, value = outcome
+                if succeeded:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
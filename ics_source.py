@@ -0,0 +1,515 @@
+import os
+import re
+import mmap
+import zlib
+import bisect
+import heapq
+import weakref
+import functools
+import threading
+from datetime import datetime, timedelta, timezone, tzinfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from calendar_source import CalendarSource
+from calendar_provider import ColumnBatch, WINDOW_COLUMNS
+from recurrence import (Series, Occurrence, OL_RECURS_DAILY, OL_RECURS_WEEKLY, OL_RECURS_MONTHLY,
+                        OL_RECURS_MONTH_NTH, OL_RECURS_YEARLY, OL_RECURS_YEAR_NTH, _nth_weekday)
+
+_BEGIN = b"BEGIN:VEVENT"
+_END = b"END:VEVENT"
+_BEGIN_ZONE = b"BEGIN:VTIMEZONE"
+_END_ZONE = b"END:VTIMEZONE"
+
+_WEEKDAY_BITS = {"SU": 1, "MO": 2, "TU": 4, "WE": 8, "TH": 16, "FR": 32, "SA": 64}
+_NTH_WEEKDAY = re.compile(r"^([+-]?\d+)?(SU|MO|TU|WE|TH|FR|SA)$")
+_DURATION = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+# ----- iCalendar value parsing -----
+
+def _unfold(data):
+    """Content lines of an iCalendar block (RFC 5545 3.1: CRLF + space/tab continues a line)."""
+    text = data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+    return re.sub(r"\n[ \t]", "", text).split("\n")
+
+def _split_line(line):
+    # NAME;PARAM=VALUE;...:value  (parameter values may be quoted and contain ':')
+    if '"' not in line:
+        head, colon, value = line.partition(":")
+        if not colon:
+            return None, {}, ""
+        name, *params = head.split(";")
+        return name.upper(), dict(param.partition("=")[::2] for param in params), value
+    head, quoted = [], False
+    for i, char in enumerate(line):
+        if char == '"':
+            quoted = not quoted
+        elif char == ":" and not quoted:
+            name, *params = "".join(head).split(";")
+            return name.upper(), dict(param.partition("=")[::2] for param in params), line[i + 1:]
+        head.append(char)
+    return None, {}, ""
+
+def _unescape(text):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), text)
+
+def _parse_datetime(value, params, zones=None):
+    """
+    A DATE or DATE-TIME as naive local wall-clock time (what Outlook hands
+    out). `zones` are the file's VTIMEZONEs by TZID, for zone names
+    ZoneInfo doesn't know.
+    """
+    value = value.strip()
+    if len(value) < 8 or (len(value) > 8 and (len(value) < 15 or value[8] != "T")):
+        raise ValueError(f"Bad date: {value!r}")
+    # Sliced by hand: strptime dominates indexing time on large files
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    dt = datetime(int(value[:4]), int(value[4:6]), int(value[6:8]),
+                  int(value[9:11]), int(value[11:13]), int(value[13:15]))
+    if value.endswith("Z"):
+        return dt.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    tzid = params.get("TZID", "").strip('"')
+    if tzid:
+        zone = _zoneinfo(tzid) or (zones or {}).get(tzid)
+        if zone is not None:
+            return dt.replace(tzinfo=zone).astimezone().replace(tzinfo=None)
+        if tzid not in _unknown_zones:
+            _unknown_zones.add(tzid)
+            print(f"Unknown time zone {tzid!r} (no VTIMEZONE for it): its times are read as local time")
+    return dt
+
+_unknown_zones = set()
+
+@functools.lru_cache(maxsize=None)
+def _zoneinfo(tzid):
+    # Cached misses too: Outlook's Windows zone names fail on every event otherwise
+    try:
+        return ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+def _parse_duration(value):
+    match = _DURATION.match(value.strip())
+    if not match:
+        return None
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                         minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -duration if sign == "-" else duration
+
+def _peek_start(data, zones=None):
+    """DTSTART of a VEVENT block, reading only that line."""
+    position = data.find(b"\nDTSTART")
+    if position < 0:
+        return None
+    end = data.find(b"\n", position + 1)
+    while end >= 0 and data[end + 1:end + 2] in (b" ", b"\t"):
+        end = data.find(b"\n", end + 1)
+    lines = _unfold(data[position + 1:end if end >= 0 else len(data)])
+    _, params, value = _split_line(lines[0])
+    try:
+        return _parse_datetime(value, params, zones)
+    except ValueError:
+        return None
+
+def _parse_offset(value):
+    # UTC offset as written in TZOFFSETFROM/TZOFFSETTO: +HHMM[SS] or -HHMM[SS]
+    value = value.strip()
+    digits = value.lstrip("+-")
+    offset = timedelta(hours=int(digits[:2]), minutes=int(digits[2:4]), seconds=int(digits[4:6] or 0))
+    return -offset if value.startswith("-") else offset
+
+
+class IcsTimezone(tzinfo):
+    """
+    A time zone as defined by a VTIMEZONE block of the file, for TZIDs that
+    ZoneInfo doesn't know, such as the Windows names Outlook exports use
+    ("W. Europe Standard Time"). Supports what Outlook writes: STANDARD and
+    DAYLIGHT observances starting at DTSTART, each with at most a yearly
+    RRULE (BYMONTH, with BYDAY like -1SU or a fixed day).
+    """
+
+    def __init__(self, data):
+        self.tzid = None
+        self._observances = []  # (onset, (month, weekday mask, instance) or None, until, offset_from, offset_to, name)
+        component = None
+        for line in _unfold(data):
+            name, params, value = _split_line(line)
+            if name == "BEGIN" and value.strip().upper() in ("STANDARD", "DAYLIGHT"):
+                component = {"kind": value.strip().upper()}
+            elif name == "END" and component is not None:
+                self._add(component)
+                component = None
+            elif component is not None:
+                component.setdefault(name, value.strip())
+            elif name == "TZID":
+                self.tzid = value.strip()
+
+    def _add(self, component):
+        onset = _parse_datetime(component["DTSTART"].rstrip("Z"), {})
+        rule = dict(part.partition("=")[::2] for part in component.get("RRULE", "").upper().split(";") if part)
+        yearly = until = None
+        if rule.get("FREQ") == "YEARLY":
+            month = int(rule.get("BYMONTH", onset.month))
+            match = _NTH_WEEKDAY.match(rule.get("BYDAY", ""))
+            if match:
+                nth = int(match.group(1) or 1)
+                yearly = (month, _WEEKDAY_BITS[match.group(2)], 5 if nth < 0 else nth)
+            else:
+                yearly = (month, None, int(rule.get("BYMONTHDAY", onset.day)))
+            if "UNTIL" in rule:
+                until = _parse_datetime(rule["UNTIL"].rstrip("Z"), {})
+        self._observances.append((onset, yearly, until, _parse_offset(component["TZOFFSETFROM"]),
+                                  _parse_offset(component["TZOFFSETTO"]), component.get("TZNAME", component["kind"])))
+
+    def _observance(self, dt):
+        # The observance whose latest onset is at or before the wall-clock time dt
+        wall = dt.replace(tzinfo=None)
+        latest = None
+        for onset, yearly, until, offset_from, offset_to, name in self._observances:
+            if yearly is None:
+                onsets = [onset]
+            else:
+                month, mask, day = yearly
+                onsets = []
+                for year in range(max(onset.year, wall.year - 1), wall.year + 1):
+                    on = _nth_weekday(year, month, mask, day) if mask else datetime(year, month, day).date()
+                    if on is not None:
+                        onsets.append(datetime.combine(on, onset.time()))
+            for moment in onsets:
+                if moment <= wall and (until is None or moment <= until) and (latest is None or moment > latest[0]):
+                    latest = (moment, offset_to, name)
+        if latest is None:
+            # Before the first onset: the offset the earliest observance changes from
+            onset, _, _, offset_from, _, name = min(self._observances, key=lambda observance: observance[0])
+            return offset_from, name
+        return latest[1], latest[2]
+
+    def utcoffset(self, dt):
+        return self._observance(dt)[0] if self._observances else timedelta()
+
+    def dst(self, dt):
+        return None
+
+    def tzname(self, dt):
+        return self._observance(dt)[1] if self._observances else self.tzid
+
+    def __repr__(self):
+        return f"IcsTimezone({self.tzid!r})"
+
+
+class IcsEvent:
+    """One parsed VEVENT, with the same property names as an Outlook AppointmentItem."""
+
+    __slots__ = ("Subject", "Start", "End", "EntryID", "GlobalAppointmentID", "LastModificationTime",
+                 "IsRecurring", "rrule", "exdates", "recurrence_id", "cancelled")
+
+    def __init__(self, data, offset, zones=None):
+        properties = {}
+        self.exdates = []
+        in_alarm = False
+        for line in _unfold(data):
+            name, params, value = _split_line(line)
+            if name in ("BEGIN", "END") and value.strip().upper() == "VALARM":
+                in_alarm = name == "BEGIN"  # A reminder's own SUMMARY etc. are not the event's
+            elif in_alarm:
+                continue
+            elif name == "EXDATE":
+                self.exdates.extend(_parse_datetime(v, params, zones).date() for v in value.split(",") if v)
+            elif name and name not in properties:
+                properties[name] = (params, value)
+
+        uid = properties.get("UID", ({}, ""))[1].strip()
+        self.Subject = _unescape(properties.get("SUMMARY", ({}, ""))[1])
+        self.Start = _parse_datetime(properties["DTSTART"][1], properties["DTSTART"][0], zones)
+        if "DTEND" in properties:
+            self.End = _parse_datetime(properties["DTEND"][1], properties["DTEND"][0], zones)
+        else:
+            self.End = self.Start + (_parse_duration(properties.get("DURATION", ({}, ""))[1]) or timedelta())
+        stamp = properties.get("LAST-MODIFIED") or properties.get("DTSTAMP")
+        self.LastModificationTime = _parse_datetime(stamp[1], stamp[0], zones) if stamp else datetime.min
+        self.GlobalAppointmentID = uid or None
+        self.EntryID = uid or f"offset-{offset}"
+        self.rrule = properties.get("RRULE", ({}, None))[1]
+        recurrence_id = properties.get("RECURRENCE-ID")
+        self.recurrence_id = _parse_datetime(recurrence_id[1], recurrence_id[0], zones) if recurrence_id else None
+        self.cancelled = properties.get("STATUS", ({}, ""))[1].strip().upper() == "CANCELLED"
+        self.IsRecurring = self.rrule is not None or self.recurrence_id is not None
+
+
+def _series(master, overrides):
+    """Turn a VEVENT with an RRULE (plus its RECURRENCE-ID overrides) into a recurrence.Series, or None."""
+    rule = dict(part.partition("=")[::2] for part in master.rrule.upper().split(";") if part)
+    frequency = rule.get("FREQ")
+    interval = int(rule.get("INTERVAL", 1))
+    by_day = [_NTH_WEEKDAY.match(day) for day in rule.get("BYDAY", "").split(",") if day]
+    if any(match is None for match in by_day) or set(rule) & {"BYHOUR", "BYMINUTE", "BYSECOND", "BYWEEKNO", "BYYEARDAY"}:
+        return None
+    mask = sum(_WEEKDAY_BITS[match.group(2)] for match in by_day)
+    nth = [int(match.group(1)) for match in by_day if match.group(1)] or (
+        [int(rule["BYSETPOS"])] if "BYSETPOS" in rule else [])
+    instance = 5 if nth and nth[0] < 0 else (nth[0] if nth else 0)
+    start = master.Start
+    day_of_month = int(rule.get("BYMONTHDAY", start.day))
+    month_of_year = int(rule.get("BYMONTH", start.month))
+    if day_of_month < 0:
+        return None
+
+    if frequency == "DAILY" and mask:
+        kind, interval = OL_RECURS_WEEKLY, 1  # Every weekday (or listed days)
+    elif frequency == "DAILY":
+        kind = OL_RECURS_DAILY
+    elif frequency == "WEEKLY":
+        kind, mask = OL_RECURS_WEEKLY, mask or _WEEKDAY_BITS[("MO", "TU", "WE", "TH", "FR", "SA", "SU")[start.weekday()]]
+    elif frequency == "MONTHLY":
+        kind = OL_RECURS_MONTH_NTH if mask else OL_RECURS_MONTHLY
+    elif frequency == "YEARLY":
+        kind, interval = (OL_RECURS_YEAR_NTH if mask else OL_RECURS_YEARLY), 12 * interval
+    else:
+        return None
+
+    exceptions = [(d, None) for d in master.exdates]
+    for override in overrides:
+        moved = None if override.cancelled else (override.Start, override.End, override.Subject)
+        exceptions.append((override.recurrence_id.date(), moved))
+    series = Series(
+        entry_id=master.EntryID,
+        subject=master.Subject,
+        last_modified=max([master.LastModificationTime] + [o.LastModificationTime for o in overrides]),
+        recurrence_type=kind,
+        interval=interval,
+        day_of_week_mask=mask,
+        day_of_month=day_of_month,
+        month_of_year=month_of_year,
+        instance=instance,
+        pattern_start=start.date(),
+        pattern_end=_parse_datetime(rule["UNTIL"], {}).date() if "UNTIL" in rule else None,
+        start_time=start.time(),
+        duration=int((master.End - start).total_seconds() // 60),
+        exceptions=exceptions,
+        global_id=master.GlobalAppointmentID,
+    )
+    if "COUNT" in rule:
+        series.pattern_end = series.nth_date(int(rule["COUNT"]))
+    return series
+
+
+class _Mapping:
+    """One version of the file's memory map, with the number of window() reads still using it."""
+
+    __slots__ = ("mm", "readers", "superseded")
+
+    def __init__(self, mm):
+        self.mm = mm
+        self.readers = 0
+        self.superseded = False
+
+
+class IcsCalendar:
+    """
+    One .ics file, read through a memory map and never loaded as a whole.
+
+    The file is indexed by byte offset: for each VEVENT the index keeps its
+    offset, length, CRC and DTSTART (read from that one line). One-off events
+    are parsed only when a window query lands on them, and kept; recurring
+    series are parsed when indexed. When the file changes, it is re-scanned
+    block by block and only blocks whose CRC is new are peeked at or parsed
+    again. The previous map is closed once no window() still reads from it.
+
+    Times with a TZID are converted to local time with ZoneInfo or, for
+    names it doesn't know, the file's own VTIMEZONE definition.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()  # _release() may run from a generator collected while it is held
+        self._stat = None
+        self._state = (None, [], [], [], {})  # (_Mapping, starts, singles, series, zones)
+        self._known = {}                      # (crc, length) -> (start, is_recurring, parsed event or None)
+        self._parsed = {}                     # (crc, length) -> IcsEvent, for one-offs a window query has read
+        self._zones_key = None                # CRC of the file's VTIMEZONE blocks the above were parsed with
+
+    def refresh(self):
+        """Re-index the file if it changed since the last call."""
+        stat = os.stat(self.path)
+        with self._lock:
+            if self._stat == (stat.st_mtime_ns, stat.st_size):
+                return
+            previous = self._state[0]
+            self._state = self._index()
+            self._stat = (stat.st_mtime_ns, stat.st_size)
+            if previous is not None:
+                previous.superseded = True
+                if not previous.readers:
+                    previous.mm.close()
+
+    def _release(self, mapping):
+        # A window() read is done with `mapping`
+        with self._lock:
+            mapping.readers -= 1
+            if mapping.superseded and not mapping.readers:
+                mapping.mm.close()
+
+    def _index(self):
+        with open(self.path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return (None, [], [], [], {})
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        zones, zones_key = self._zones(mm)
+        if zones_key != self._zones_key:
+            # Times already read may have been converted with other definitions
+            self._known, self._parsed, self._zones_key = {}, {}, zones_key
+        known = {}
+        singles = []      # (start, offset, length, key) of blocks parsed on demand
+        recurring = []    # parsed IcsEvents with an RRULE or RECURRENCE-ID
+        position = mm.find(_BEGIN)
+        while position >= 0:
+            end = mm.find(_END, position)
+            if end < 0:
+                break
+            end += len(_END)
+            data = mm[position:end]
+            key = (zlib.crc32(data), len(data))
+            entry = self._known.get(key)
+            if entry is None:
+                try:
+                    is_recurring = b"\nRRULE" in data or b"\nRECURRENCE-ID" in data
+                    entry = (_peek_start(data, zones), is_recurring,
+                             IcsEvent(data, position, zones) if is_recurring else None)
+                except (KeyError, ValueError) as e:
+                    print(f"Skipping unreadable event at byte {position} of {self.path}: {e}")
+                    entry = (None, False, None)
+            known[key] = entry
+            start, is_recurring, event = entry
+            if is_recurring:
+                recurring.append(event)
+            elif start is not None:
+                singles.append((start, position, len(data), key))
+            position = mm.find(_BEGIN, end)
+        self._known = known
+        # Parsed one-off events are kept only while their block is unchanged
+        self._parsed = {key: event for key, event in self._parsed.items() if key in known}
+
+        masters = {}
+        overrides = {}
+        for event in recurring:
+            if event.recurrence_id is not None:
+                overrides.setdefault(event.EntryID, []).append(event)
+            else:
+                masters[event.EntryID] = event
+        series = []
+        for uid, master in masters.items():
+            built = _series(master, overrides.pop(uid, []))
+            if built is None:
+                print(f"Unsupported recurrence in {self.path}: {master.rrule}; using the first occurrence only")
+                singles.append((master.Start, None, 0, master))
+            else:
+                series.append(built)
+        for orphans in overrides.values():
+            # Overrides whose series is not in the file are plain events
+            singles.extend((o.Start, None, 0, o) for o in orphans if not o.cancelled)
+        singles.sort(key=lambda entry: entry[0])
+        return (_Mapping(mm), [entry[0] for entry in singles], singles, series, zones)
+
+    def _zones(self, mm):
+        """The file's VTIMEZONE definitions by TZID, and a CRC of their blocks."""
+        zones = {}
+        crc = 0
+        position = mm.find(_BEGIN_ZONE)
+        while position >= 0:
+            end = mm.find(_END_ZONE, position)
+            if end < 0:
+                break
+            end += len(_END_ZONE)
+            data = mm[position:end]
+            crc = zlib.crc32(data, crc)
+            try:
+                zone = IcsTimezone(data)
+                zones[zone.tzid] = zone
+            except (KeyError, ValueError) as e:
+                print(f"Skipping unreadable time zone at byte {position} of {self.path}: {e}")
+            position = mm.find(_BEGIN_ZONE, end)
+        return zones, crc
+
+    def window(self, start, end, modified_since=None):
+        """Events starting in [start, end] in start order; only those are parsed."""
+        one_offs, series, wall_start, wall_end = self._select(start, end, modified_since)
+
+        def occurrences(s):
+            for occurrence_start, occurrence_end, subject in s.occurrences(wall_start, wall_end):
+                yield Occurrence(subject, occurrence_start, occurrence_end, s.entry_id, s.last_modified, s.global_id)
+
+        streams = [one_offs] + [occurrences(s) for s in series]
+        return heapq.merge(*streams, key=lambda item: item.Start)
+
+    def columns(self, start, end, columns=WINDOW_COLUMNS, modified_since=None):
+        """window() as a ColumnBatch; series occurrences go straight into rows, without Occurrence objects."""
+        columns = tuple(columns)
+        one_offs, series, wall_start, wall_end = self._select(start, end, modified_since)
+
+        def occurrences(s):
+            values = {"EntryID": s.entry_id, "GlobalAppointmentID": s.global_id,
+                      "LastModificationTime": s.last_modified, "IsRecurring": True}
+            for occurrence_start, occurrence_end, subject in s.occurrences(wall_start, wall_end):
+                values.update(Subject=subject, Start=occurrence_start, End=occurrence_end)
+                yield tuple(values[name] for name in columns)
+
+        start_at = columns.index("Start")
+        streams = [(tuple(getattr(event, name) for name in columns) for event in one_offs)]
+        streams += [occurrences(s) for s in series]
+        return ColumnBatch.from_rows(columns, heapq.merge(*streams, key=lambda row: row[start_at]))
+
+    def _select(self, start, end, modified_since):
+        # One-off events of the window (parsed on demand) and the series to expand over it
+        self.refresh()
+        with self._lock:
+            mapping, starts, singles, series, zones = self._state
+            if mapping is not None:
+                mapping.readers += 1  # Kept open until the events below have been read
+        wall_start = start.replace(tzinfo=None) if start.tzinfo else start
+        wall_end = end.replace(tzinfo=None) if end.tzinfo else end
+        since = None
+        if modified_since is not None:
+            since = modified_since.replace(tzinfo=None) if modified_since.tzinfo else modified_since
+
+        def one_offs():
+            lo = bisect.bisect_left(starts, wall_start)
+            hi = bisect.bisect_right(starts, wall_end)
+            for _, offset, length, key in singles[lo:hi]:
+                if offset is None:
+                    event = key  # Parsed already (series fallback or orphaned override)
+                else:
+                    event = self._parsed.get(key)
+                    if event is None:
+                        event = IcsEvent(mapping.mm[offset:offset + length], offset, zones)
+                        with self._lock:  # refresh() may be rebuilding the cache on another thread
+                            # A read of an older version of the file may have other time zones: not cached
+                            if self._state[4] is zones:
+                                event = self._parsed.setdefault(key, event)
+                if since is None or event.LastModificationTime >= since:
+                    yield event
+            done()  # Read to the end: release the map now rather than when the generator is collected
+
+        events = one_offs()
+        # Also released if the caller stops early and drops the generator
+        done = weakref.finalize(events, self._release, mapping) if mapping is not None else (lambda: None)
+        return events, [s for s in series if since is None or s.last_modified >= since], wall_start, wall_end
+
+
+class IcsSource(CalendarSource):
+    """Calendars exported as .ics files, one file per account: {address: path}."""
+
+    def __init__(self, calendars):
+        self._calendars = {address: IcsCalendar(path) for address, path in calendars.items()}
+
+    def accounts(self):
+        return [(address, address) for address in self._calendars]
+
+    def window(self, account, start, end, modified_since=None):
+        _, address = account
+        return self._calendars[address].window(start, end, modified_since)
+
+    def columns(self, account, start, end, columns=WINDOW_COLUMNS, modified_since=None):
+        _, address = account
+        return self._calendars[address].columns(start, end, columns, modified_since)
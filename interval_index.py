@@ -0,0 +1,214 @@
+import heapq
+import random
+
+
+class _Node:
+    __slots__ = ("start", "end", "key", "item_id", "item", "priority", "left", "right", "max_end")
+
+    def __init__(self, key, end, item_id, item):
+        self.key = key  # (start, sequence): unique, in start order
+        self.start = key[0]
+        self.end = end
+        self.item_id = item_id
+        self.item = item
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+        self.max_end = end  # Latest end in this subtree
+
+
+def _fix(node):
+    max_end = node.end
+    if node.left is not None and node.left.max_end > max_end:
+        max_end = node.left.max_end
+    if node.right is not None and node.right.max_end > max_end:
+        max_end = node.right.max_end
+    node.max_end = max_end
+
+def _split(node, key):
+    # (nodes with keys < key, nodes with keys >= key)
+    if node is None:
+        return None, None
+    if node.key < key:
+        node.right, right = _split(node.right, key)
+        _fix(node)
+        return node, right
+    left, node.left = _split(node.left, key)
+    _fix(node)
+    return left, node
+
+def _merge(left, right):
+    # Every key in `left` is below every key in `right`
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _fix(left)
+        return left
+    right.left = _merge(left, right.left)
+    _fix(right)
+    return right
+
+def _delete(node, key):
+    if node.key == key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _delete(node.left, key)
+    else:
+        node.right = _delete(node.right, key)
+    _fix(node)
+    return node
+
+
+class IntervalIndex:
+    """
+    Meetings as [start, end) intervals keyed by meeting id, in a balanced
+    search tree ordered by start (a treap) where every node also keeps the
+    latest end in its subtree.
+
+    add (or move) and remove are O(log n), so a sync only pays for the
+    meetings that changed. The latest-end field lets a query skip every
+    subtree that ends before the range it asks about: "what overlaps T" and
+    "what overlaps [a, b)" cost O(log n + k) in practice for k answers,
+    instead of a scan of the whole schedule. Starts and ends can be anything
+    ordered (datetimes, epoch seconds) as long as they are all the same kind.
+    """
+
+    def __init__(self):
+        self._root = None
+        self._nodes = {}  # item_id -> _Node
+        self._sequence = 0
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, item_id):
+        return item_id in self._nodes
+
+    def __iter__(self):
+        """Item ids in no particular order."""
+        return iter(list(self._nodes))
+
+    def get(self, item_id):
+        """Return (start, end, item) for an id, or None."""
+        node = self._nodes.get(item_id)
+        if node is None:
+            return None
+        return node.start, node.end, node.item
+
+    def add(self, item_id, start, end, item=None):
+        """Add an interval, or move it if the id is already indexed. A missing end means zero length."""
+        if end is None or end < start:
+            end = start
+        node = self._nodes.get(item_id)
+        if node is not None:
+            if node.start == start and node.end == end:
+                node.item = item  # Same place in the tree: nothing to rebalance
+                return
+            self.remove(item_id)
+        self._sequence += 1
+        node = self._nodes[item_id] = _Node((start, self._sequence), end, item_id, item)
+        left, right = _split(self._root, node.key)
+        self._root = _merge(_merge(left, node), right)
+
+    def remove(self, item_id):
+        """Drop an interval and return its item (None if it was not indexed)."""
+        node = self._nodes.pop(item_id, None)
+        if node is None:
+            return None
+        self._root = _delete(self._root, node.key)
+        return node.item
+
+    # ----- Queries -----
+    def overlapping(self, start, end=None):
+        """
+        (start, end, item) of every interval overlapping [start, end), in
+        start order. Without `end`, the ones in progress at the moment `start`.
+        """
+        if end is None:
+            end = start
+        found = []
+        self._overlapping(self._root, start, end, found)
+        return found
+
+    def _overlapping(self, node, start, end, found):
+        # Nothing in a subtree ends after `start` -> nothing in it overlaps
+        if node is None or node.max_end <= start:
+            return
+        self._overlapping(node.left, start, end, found)
+        # An empty range (a moment) still matches the intervals that begin at it
+        if node.start < end or (node.start == start == end):
+            if node.end > start:
+                found.append((node.start, node.end, node.item))
+            self._overlapping(node.right, start, end, found)
+
+    def conflicts(self, start, end):
+        """
+        Pairs ((start, end, item), (start, end, item)) of intervals that
+        overlap each other, for the intervals overlapping [start, end).
+        Zero-length intervals conflict with nothing.
+        """
+        pairs = []
+        active = []  # (end, sequence, interval) of the ones still running, earliest end first
+        for sequence, interval in enumerate(self.overlapping(start, end)):
+            while active and active[0][0] <= interval[0]:
+                heapq.heappop(active)
+            if interval[1] > interval[0]:
+                pairs.extend((other, interval) for _, _, other in active)
+                heapq.heappush(active, (interval[1], sequence, interval))
+        return pairs
+
+    def busy_until(self, moment):
+        """The latest end of the intervals starting at or before `moment` (None if there are none)."""
+        latest = None
+        node = self._root
+        while node is not None:
+            if node.start <= moment:
+                for end in (node.end, node.left.max_end if node.left is not None else None):
+                    if end is not None and (latest is None or end > latest):
+                        latest = end
+                node = node.right
+            else:
+                node = node.left
+        return latest
+
+    def free_slot(self, after, duration, until=None):
+        """
+        Start of the first gap of at least `duration` at or after `after`
+        that no interval covers (and that ends by `until`), or None.
+        Walks only the intervals between `after` and the gap it finds.
+        """
+        cursor = after
+        busy = self.busy_until(after)
+        if busy is not None and busy > cursor:
+            cursor = busy
+        for node in self._from(after):
+            if until is not None and cursor + duration > until:
+                return None
+            if node.end == node.start:
+                continue  # Zero length: takes no time
+            if node.start - cursor >= duration:
+                return cursor
+            if node.end > cursor:
+                cursor = node.end
+        if until is not None and cursor + duration > until:
+            return None
+        return cursor
+
+    def _from(self, moment):
+        # Nodes starting after `moment`, in start order
+        stack = []
+        node = self._root
+        while stack or node is not None:
+            if node is not None:
+                if node.start > moment:
+                    stack.append(node)
+                    node = node.left
+                else:
+                    node = node.right
+                continue
+            node = stack.pop()
+            yield node
+            node = node.right
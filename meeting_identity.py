@@ -0,0 +1,87 @@
+import hashlib
+
+
+def _wall_clock(dt):
+    return dt.replace(tzinfo=None) if dt.tzinfo else dt
+
+def global_id(item):
+    """The provider's GlobalAppointmentID (same in every mailbox that got the invite), or None."""
+    try:
+        return getattr(item, "GlobalAppointmentID", None) or None
+    except Exception:
+        # COM raises for items that have none (e.g. some shared/imported calendars)
+        return None
+
+def fingerprint(subject, start, end):
+    """Fallback identity for items without a global ID: what the invite looks like, not where it lives."""
+    return "|".join((" ".join((subject or "").split()).casefold(),
+                     _wall_clock(start).isoformat(), _wall_clock(end).isoformat()))
+
+def meeting_id(item):
+    """
+    Canonical id of one meeting (one occurrence for recurring series).
+
+    Built from the global appointment ID, so it survives subject edits and
+    reschedules and is the same in every account that received the invite.
+    Occurrences of a series share their master's global ID and are told apart
+    by start time. Items without one fall back to fingerprint().
+    """
+    gid = global_id(item)
+    if gid is None:
+        return meeting_id_from(None, False, item.Subject, item.Start, item.End)
+    if getattr(item, "IsRecurring", False):
+        return meeting_id_from(gid, True, None, item.Start, None)
+    return meeting_id_from(gid, False, None, None, None)
+
+def meeting_id_from(gid, is_recurring, subject, start, end):
+    """meeting_id() from property values already read, e.g. one row of a ColumnBatch."""
+    if not gid:
+        basis = "fp|" + fingerprint(subject, start, end)
+    elif is_recurring:
+        basis = f"{gid}|{_wall_clock(start).isoformat()}"
+    else:
+        basis = gid
+    return hashlib.sha256(basis.encode()).hexdigest()
+
+
+class MeetingIndex:
+    """
+    Meetings keyed by canonical id, merging the copies seen in several accounts.
+
+    add() is O(1): the first copy is kept (with an "accounts" list of every
+    account it was seen in) and later copies only add their account.
+    """
+
+    def __init__(self):
+        self._meetings = {}
+
+    def __len__(self):
+        return len(self._meetings)
+
+    def __contains__(self, meeting_id):
+        return meeting_id in self._meetings
+
+    def __iter__(self):
+        return iter(self._meetings.values())
+
+    def get(self, meeting_id):
+        return self._meetings.get(meeting_id)
+
+    def add(self, meeting):
+        """Index a meeting dict (needs "id" and "account"); returns False if it was a duplicate."""
+        known = self._meetings.get(meeting["id"])
+        if known is None:
+            meeting.setdefault("accounts", [meeting["account"]])
+            self._meetings[meeting["id"]] = meeting
+            return True
+        if meeting["account"] not in known["accounts"]:
+            known["accounts"].append(meeting["account"])
+        return False
+
+
+def dedupe(meetings):
+    """The meetings with cross-account duplicates merged, first copy first."""
+    index = MeetingIndex()
+    for meeting in meetings:
+        index.add(meeting)
+    return list(index)
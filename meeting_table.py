@@ -0,0 +1,256 @@
+import sys
+import bisect
+from array import array
+from datetime import datetime, timezone
+
+NO_TIME = -(1 << 63)  # In a time column: not set (e.g. a meeting that holds no alert)
+
+_DAY = 86400
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+def _utc_offset(wall, tz):
+    # Seconds east of UTC at the wall-clock time `wall` (seconds since 1970-01-01 00:00 wall time)
+    moment = datetime.fromtimestamp(wall, timezone.utc).replace(tzinfo=None)
+    moment = moment.timestamp() if tz is None else moment.replace(tzinfo=tz).timestamp()
+    return wall - int(moment)
+
+def local_epochs(datetimes, tz=None):
+    """
+    Epoch seconds, as an array('q'), of wall-clock datetimes read in `tz`
+    (the system zone if None). None becomes NO_TIME.
+
+    Any tzinfo the datetimes carry is ignored: Outlook hands out local
+    wall-clock times, whatever pywin32 labels them with. The UTC offset is
+    looked up once per day rather than once per datetime; only on the days
+    a DST change happens is each time converted on its own.
+    """
+    days = {}  # day number -> offset for the whole day, or None on a day with a change
+    epochs = array("q")
+    for dt in datetimes:
+        if dt is None:
+            epochs.append(NO_TIME)
+            continue
+        # Plain arithmetic on the fields: far cheaper than any datetime conversion
+        day = dt.toordinal() - _EPOCH_ORDINAL
+        wall = day * _DAY + dt.hour * 3600 + dt.minute * 60 + dt.second
+        offset = days.get(day, NO_TIME)
+        if offset == NO_TIME:
+            first, last = _utc_offset(day * _DAY, tz), _utc_offset(day * _DAY + _DAY - 1, tz)
+            offset = days[day] = first if first == last else None
+        epochs.append(wall - (offset if offset is not None else _utc_offset(wall, tz)))
+    return epochs
+
+def epoch(moment):
+    """Epoch seconds of an aware datetime (or a naive one in the system zone); None -> NO_TIME."""
+    return NO_TIME if moment is None else int(moment.timestamp())
+
+
+class MeetingTable:
+    """
+    Meetings stored column-wise, in start order.
+
+    Times (start, end, alert) are int64 epoch seconds in array('q') columns,
+    accounts are small integer codes into `accounts`, and subjects are
+    interned, so a meeting costs a few dozen bytes instead of a dict of
+    datetimes. Window queries are a binary search on the start column.
+
+    Rows are read through MeetingRow views, which give aware datetimes in
+    `tz` and also answer row["start_time"] like the meeting dicts used
+    elsewhere.
+    """
+
+    __slots__ = ("tz", "start", "end", "alert", "account", "accounts", "_account_codes",
+                 "subject", "uid", "entry_id", "id")
+
+    def __init__(self, tz=None):
+        self.tz = tz
+        self.start = array("q")
+        self.end = array("q")
+        self.alert = array("q")
+        self.account = array("H")
+        self.accounts = []
+        self._account_codes = {}
+        self.subject = []
+        self.uid = []
+        self.entry_id = []
+        self.id = []
+
+    @classmethod
+    def from_columns(cls, subject, start, end, account, entry_id=None, uid=None, alert=None, id=None,
+                     tz=None, ordered=False):
+        """
+        Build a table from columns of equal length. Times are epoch seconds
+        (see local_epochs), `account` is one name for every row or a column of
+        them. Rows are sorted by start unless `ordered` says they already are.
+        """
+        count = len(start)
+        columns = [subject, start, end,
+                   [account] * count if isinstance(account, str) else account,
+                   entry_id or [None] * count, uid or [None] * count,
+                   alert if alert is not None else [NO_TIME] * count, id or [None] * count]
+        if not ordered:
+            order = sorted(range(count), key=start.__getitem__)
+            columns = [[column[i] for i in order] for column in columns]
+        subject, start, end, account, entry_id, uid, alert, id = columns
+        table = cls(tz)
+        table.start.extend(start)
+        table.end.extend(end)
+        table.alert.extend(alert)
+        table.account.extend(map(table._account_code, account))
+        intern = sys.intern
+        table.subject = [intern(s) if s is not None else "" for s in subject]
+        table.uid = list(uid)
+        table.entry_id = list(entry_id)
+        table.id = list(id)
+        return table
+
+    @classmethod
+    def concat(cls, tables, tz=None):
+        """All the rows of several tables in one, in start order."""
+        columns = {name: [] for name in ("subject", "start", "end", "account", "entry_id", "uid", "alert", "id")}
+        for table in tables:
+            for name, column in columns.items():
+                if name == "account":
+                    column.extend(table.accounts[code] for code in table.account)
+                else:
+                    column.extend(getattr(table, name))
+        return cls.from_columns(tz=tz, **columns)
+
+    def _account_code(self, name):
+        code = self._account_codes.get(name)
+        if code is None:
+            code = self._account_codes[name] = len(self.accounts)
+            self.accounts.append(sys.intern(name))
+        return code
+
+    def __len__(self):
+        return len(self.start)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.start)
+        if not 0 <= index < len(self.start):
+            raise IndexError("meeting index out of range")
+        return MeetingRow(self, index)
+
+    def __iter__(self):
+        return (MeetingRow(self, index) for index in range(len(self.start)))
+
+    def bounds(self, start, end):
+        """(lo, hi): the rows starting in [start, end] (epoch seconds) are lo..hi-1."""
+        return bisect.bisect_left(self.start, start), bisect.bisect_right(self.start, end)
+
+    def window(self, start, end):
+        """The meetings starting in [start, end] (epoch seconds or aware datetimes), as a table."""
+        if isinstance(start, datetime):
+            start, end = epoch(start), epoch(end)
+        lo, hi = self.bounds(start, end)
+        # Contiguous rows: every column is one slice copy
+        table = MeetingTable(self.tz)
+        table.accounts = self.accounts
+        table._account_codes = self._account_codes
+        for name in ("start", "end", "alert", "account", "subject", "uid", "entry_id", "id"):
+            setattr(table, name, getattr(self, name)[lo:hi])
+        return table
+
+    def take(self, indices, account=None):
+        """
+        A table of the rows at `indices` (kept in that order, which must
+        follow start order). `account` optionally replaces their accounts,
+        one name per row.
+        """
+        indices = list(indices)
+        table = MeetingTable(self.tz)
+        for name in ("start", "end", "alert"):
+            column = getattr(self, name)
+            getattr(table, name).extend(column[i] for i in indices)
+        if account is None:
+            table.accounts = self.accounts
+            table._account_codes = self._account_codes
+            table.account.extend(self.account[i] for i in indices)
+        else:
+            table.account.extend(map(table._account_code, account))
+        for name in ("subject", "uid", "entry_id", "id"):
+            column = getattr(self, name)
+            setattr(table, name, [column[i] for i in indices])
+        return table
+
+    def account_of(self, index):
+        return self.accounts[self.account[index]]
+
+    def to_datetime(self, seconds):
+        """An epoch column value as an aware datetime in the table's zone (None for NO_TIME)."""
+        if seconds == NO_TIME:
+            return None
+        if self.tz is None:
+            return datetime.fromtimestamp(seconds).astimezone()
+        return datetime.fromtimestamp(seconds, self.tz)
+
+
+class MeetingRow:
+    """One row of a MeetingTable, read on demand; row["start_time"] works like on a meeting dict."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    @property
+    def subject(self):
+        return self.table.subject[self.index]
+
+    @property
+    def account(self):
+        return self.table.account_of(self.index)
+
+    @property
+    def uid(self):
+        return self.table.uid[self.index]
+
+    @property
+    def entry_id(self):
+        return self.table.entry_id[self.index]
+
+    @property
+    def id(self):
+        return self.table.id[self.index]
+
+    @property
+    def start_ts(self):
+        return self.table.start[self.index]
+
+    @property
+    def end_ts(self):
+        return self.table.end[self.index]
+
+    @property
+    def alert_ts(self):
+        seconds = self.table.alert[self.index]
+        return None if seconds == NO_TIME else seconds
+
+    @property
+    def start_time(self):
+        return self.table.to_datetime(self.table.start[self.index])
+
+    @property
+    def end_time(self):
+        return self.table.to_datetime(self.table.end[self.index])
+
+    @property
+    def alert_time(self):
+        return self.table.to_datetime(self.table.alert[self.index])
+
+    def as_dict(self):
+        return {"id": self.id, "subject": self.subject, "start_time": self.start_time, "end_time": self.end_time,
+                "account": self.account, "entry_id": self.entry_id, "uid": self.uid, "alert_time": self.alert_time}
@@ -1,91 +1,103 @@
-import win32com.client
 from datetime import datetime, timedelta, timezone
+from calendar_provider import window_columns, fetch_accounts, AccountGuard, FETCH_WORKERS
+from meeting_identity import meeting_id_from
 
 days_ahead = 8  # Number of days to look ahead for meetings
 
-# Initialize Outlook COM object
-outlook = win32com.client.Dispatch("Outlook.Application")
-namespace = outlook.GetNamespace("MAPI")
+# The only properties read per item, in bulk through window_columns()
+MEETING_COLUMNS = ("Subject", "Start", "End", "GlobalAppointmentID", "IsRecurring")
 
-def meetings_ahead(namespace, days_ahead):
+# Deadlines and back-off per account, and each account's last good meetings
+# for when it is slow or down (see calendar_provider.AccountGuard)
+account_guard = AccountGuard()
+
+def meetings_ahead(namespace, days_ahead, max_workers=FETCH_WORKERS, guard=account_guard):
     """
     Parameters:
     namespace (object): The namespace object containing the accounts to fetch calendar data from.
     days_ahead (int): The number of days from the current date to filter meetings.
+    max_workers (int): How many accounts may be fetched at the same time.
+    guard (AccountGuard): Deadline and back-off per account; a slow or failing
+                          account is listed with its last good meetings.
 
     Returns:
     dict: 
           Example:
             {
                 "account1@example.com": [
-                    {"subject": "Meeting 1", "start": datetime1, "end": datetime2},
-                    {"subject": "Meeting 2", "start": datetime3, "end": datetime4}
+                    {"subject": "Meeting 1", "start": datetime1, "end": datetime2, "id": id1},
+                    {"subject": "Meeting 2", "start": datetime3, "end": datetime4, "id": id2}
                 ],
                 "account2@example.com": [
-                    {"subject": "Meeting 3", "start": datetime5, "end": datetime6}
+                    {"subject": "Meeting 1", "start": datetime1, "end": datetime2, "id": id1}
                 ]
             }
+          An invite received by several accounts is listed under each of them
+          with the same "id" (see meeting_identity).
     """
     # Time range
     now = datetime.now(timezone.utc)
     end_time = now + timedelta(days=days_ahead)
 
-    # Get all accounts
-    accounts = namespace.Accounts
-    
-    meetings_per_account = {}
-
-    for account in accounts:
-        try:
-            print(f"\nAccount: {account.SmtpAddress}")
-            
-            # Access root folder and Calendar folder
-            root_folder = namespace.Folders(account.DisplayName)
-            calendar_folder = root_folder.Folders("Calendar")
-
-            # Get calendar items and configure view
-            items = calendar_folder.Items
-            items.Sort("[Start]")
-            items.IncludeRecurrences = True
-
-            # Collect meetings
-            meetings = []
-
-            for item in items:
-                try:
-                    start = item.Start
-                    end = item.End
-                    
-                    # Skip items without start time
-                    if start is None:
-                        continue
-
-                    # Convert start to timezone-aware
-                    if not hasattr(start, 'tzinfo') or start.tzinfo is None:
-                        start = start.replace(tzinfo=timezone.utc)
-                    if not hasattr(end, 'tzinfo') or end.tzinfo is None:
-                        end = end.replace(tzinfo=timezone.utc)
-
-                    # Filter by time range
-                    if now <= start <= end_time:
-                        meetings.append({
-                            "subject": item.Subject,
-                            "start": start,
-                            "end": end
-                        })
-                        # print(f"Meeting: {item.Subject}, Start: {start}, End: {end}")
-                except Exception as e:
-                    print(f"Error processing item: {e}")
-
-            meetings_per_account[account.SmtpAddress] = meetings
-
-        except Exception as e:
-            print(f"Error accessing account {account.DisplayName}: {e}")
-
-    return meetings_per_account
-
-meet = meetings_ahead(namespace, days_ahead)
-for account, meetings in meet.items():
-    print(f"\nAccount: {account}")
-    for meeting in meetings:
-        print(f"Subject: {meeting['subject']}, Start: {meeting['start']}, End: {meeting['end']}")
\ No newline at end of file
+    def fetch(worker_namespace, account):
+        display_name, smtp_address = account
+        print(f"\nAccount: {smtp_address}")
+        
+        # Access root folder and Calendar folder
+        root_folder = worker_namespace.Folders(display_name)
+        calendar_folder = root_folder.Folders("Calendar")
+
+        # Only the needed columns of the items inside the window, read in
+        # bulk; recurring series are expanded locally
+        batch = window_columns(calendar_folder, now, end_time, MEETING_COLUMNS)
+
+        # Collect meetings
+        meetings = []
+
+        for subject, start, end, gid, is_recurring in batch.rows():
+            try:
+                # Skip items without start time
+                if start is None:
+                    continue
+
+                # Convert start to timezone-aware
+                if not hasattr(start, 'tzinfo') or start.tzinfo is None:
+                    start = start.replace(tzinfo=timezone.utc)
+                if not hasattr(end, 'tzinfo') or end.tzinfo is None:
+                    end = end.replace(tzinfo=timezone.utc)
+
+                # Filter by time range
+                if now <= start <= end_time:
+                    meetings.append({
+                        "subject": subject,
+                        "start": start,
+                        "end": end,
+                        "id": meeting_id_from(gid, is_recurring, subject, start, end)
+                    })
+                    # print(f"Meeting: {subject}, Start: {start}, End: {end}")
+            except Exception as e:
+                print(f"Error processing item: {e}")
+
+        return meetings
+
+    # Get all accounts; COM objects stay on this thread, workers get plain names
+    accounts = [(account.DisplayName, account.SmtpAddress) for account in namespace.Accounts]
+
+    # Accounts are fetched concurrently, at most max_workers at a time and
+    # for no longer than the guard's deadline; an account that fails or is
+    # late is reported and listed with its last good meetings (or left out)
+    results = fetch_accounts(namespace, accounts, fetch, max_workers, guard=guard)
+    return {smtp_address: meetings for (_, smtp_address), meetings in results.items()}
+
+if __name__ == "__main__":
+    import win32com.client
+
+    # Initialize Outlook COM object
+    outlook = win32com.client.Dispatch("Outlook.Application")
+    namespace = outlook.GetNamespace("MAPI")
+
+    meet = meetings_ahead(namespace, days_ahead)
+    for account, meetings in meet.items():
+        print(f"\nAccount: {account}")
+        for meeting in meetings:
+            print(f"Subject: {meeting['subject']}, Start: {meeting['start']}, End: {meeting['end']}")
\ No newline at end of file
@@ -0,0 +1,264 @@
+import json
+import time
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from metrics import histogram
+
+COALESCE_WINDOW = 3.0  # Seconds: alerts raised this close together go out as one notification
+MAX_PENDING = 100      # Alerts waiting to be grouped; more are dropped
+MAX_LINES = 10         # Alerts listed in a grouped message before "... and N more"
+
+delivery_seconds = histogram("notification_delivery_seconds",
+                             "Time from the first alert of a notification to its delivery", ["channel"])
+
+
+class Notification:
+    """One or more alerts, (title, message) each, delivered together."""
+
+    __slots__ = ("alerts", "raised_at")
+
+    def __init__(self, alerts, raised_at=None):
+        self.alerts = list(alerts)
+        self.raised_at = raised_at if raised_at is not None else time.monotonic()
+
+    def merged(self, other):
+        """Both notifications as one (a channel that was busy or rate limited sends them together)."""
+        return Notification(self.alerts + other.alerts, min(self.raised_at, other.raised_at))
+
+    @property
+    def title(self):
+        if len(self.alerts) == 1:
+            return self.alerts[0][0]
+        return f"{self.alerts[0][0]} ({len(self.alerts)})"
+
+    @property
+    def message(self):
+        if len(self.alerts) == 1:
+            return self.alerts[0][1]
+        lines = [message for _, message in self.alerts[:MAX_LINES]]
+        if len(self.alerts) > MAX_LINES:
+            lines.append(f"... and {len(self.alerts) - MAX_LINES} more")
+        return "\n".join(lines)
+
+
+# ----- Sinks: where a notification goes; send() may block, it runs on a pool worker -----
+
+class ToastSink:
+    """Windows toast through win10toast, shown for `duration` seconds (blocks meanwhile)."""
+
+    def __init__(self, notifier=None, duration=10):
+        if notifier is None:
+            from win10toast import ToastNotifier
+            notifier = ToastNotifier()
+        self.notifier = notifier
+        self.duration = duration
+
+    def send(self, notification):
+        # Not threaded: the dispatcher's worker already is the background thread
+        self.notifier.show_toast(notification.title, notification.message, duration=self.duration, threaded=False)
+
+
+class SoundSink:
+    """Rings a ring_player.RingPlayer once per notification, however many alerts it groups."""
+
+    def __init__(self, player):
+        self.player = player
+
+    def send(self, notification):
+        self.player.ring()
+
+
+class ConsoleSink:
+    def send(self, notification):
+        print(f"{notification.title}: {notification.message}")
+
+
+class WebhookSink:
+    """POSTs each notification as JSON ({"title", "message", "alerts"}) to `url`."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, notification):
+        body = json.dumps({"title": notification.title, "message": notification.message,
+                           "alerts": [{"title": title, "message": message}
+                                      for title, message in notification.alerts]}).encode()
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class WebhookStub:
+    """
+    A local HTTP endpoint that records what WebhookSink posts, for tests and
+    benchmarks:
+
+        with WebhookStub() as stub:
+            dispatcher = NotificationDispatcher([Channel("hook", WebhookSink(stub.url))])
+            ...
+            stub.wait(1)  # -> the JSON bodies received so far
+    """
+
+    def __init__(self, host="127.0.0.1", port=0):
+        received = self.received = []
+        arrived = self._arrived = threading.Condition()
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with arrived:
+                    received.append(json.loads(body))
+                    arrived.notify_all()
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self._server.server_address[1]}/"
+        self._thread = None
+
+    def wait(self, count, timeout=10):
+        """Block until `count` posts have arrived (or timeout); returns them."""
+        with self._arrived:
+            self._arrived.wait_for(lambda: len(self.received) >= count, timeout)
+            return list(self.received)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="webhook-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ----- Dispatcher -----
+
+class Channel:
+    """
+    A sink plus its delivery rules: at most one delivery in flight, and at
+    least `min_interval` seconds between the end of one and the start of the
+    next. Notifications that arrive in between are merged and sent as one.
+    """
+
+    __slots__ = ("name", "sink", "min_interval", "pending", "busy", "next_at")
+
+    def __init__(self, name, sink, min_interval=0.0):
+        self.name = name
+        self.sink = sink
+        self.min_interval = min_interval
+        self.pending = None  # Notification waiting for this channel
+        self.busy = False
+        self.next_at = 0.0   # time.monotonic() before which nothing is sent
+
+
+class NotificationDispatcher:
+    """
+    Delivers alerts to several channels without a thread per alert.
+
+    notify() only appends to a bounded list and returns. One dispatcher
+    thread groups alerts raised within `window` seconds of the first one
+    into a single Notification and hands it to every channel; deliveries run
+    on a pool of at most `workers` threads. Each channel is rate limited on
+    its own (see Channel), so a slow toast never holds up the console or a
+    webhook, and a burst of meetings at the top of the hour becomes one
+    toast instead of ten overlapping ones.
+
+    Threads start with the first notification, not on construction.
+    """
+
+    def __init__(self, channels, window=COALESCE_WINDOW, workers=2, max_pending=MAX_PENDING):
+        self.channels = list(channels)
+        self.window = window
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._workers = workers
+        self._alerts = []
+        self._batch_due = None  # time.monotonic() the current batch goes out at
+        self._wakeup = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        self._pool = None
+
+    def notify(self, title, message):
+        """Queue an alert; returns False if it was dropped because too many are pending."""
+        with self._wakeup:
+            if len(self._alerts) >= self.max_pending:
+                self.dropped += 1
+                return False
+            if not self._alerts:
+                self._batch_due = time.monotonic() + self.window
+            self._alerts.append((title, message, time.monotonic()))
+            if self._thread is None:
+                self._start()
+            self._wakeup.notify_all()
+            return True
+
+    def flush(self):
+        """Send the alerts being grouped now instead of at the end of the window."""
+        with self._wakeup:
+            if self._alerts:
+                self._batch_due = time.monotonic()
+                self._wakeup.notify_all()
+
+    def idle(self):
+        """True when nothing is waiting to be grouped or delivered."""
+        with self._wakeup:
+            return not self._alerts and not any(channel.pending or channel.busy for channel in self.channels)
+
+    def stop(self):
+        """Deliver what is pending, then stop the threads."""
+        self.flush()
+        with self._wakeup:
+            self._wakeup.wait_for(lambda: self._thread is None or (
+                not self._alerts and not any(channel.pending or channel.busy for channel in self.channels)))
+            self._stopped = True
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._pool.shutdown(wait=True)
+
+    def _start(self):
+        self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="notify")
+        self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with self._wakeup:
+            while not self._stopped:
+                now = time.monotonic()
+                if self._alerts and now >= self._batch_due:
+                    notification = Notification([(title, message) for title, message, _ in self._alerts],
+                                                self._alerts[0][2])
+                    self._alerts = []
+                    for channel in self.channels:
+                        channel.pending = notification if channel.pending is None else channel.pending.merged(notification)
+                    self._wakeup.notify_all()
+                deadlines = [self._batch_due] if self._alerts else []
+                for channel in self.channels:
+                    if channel.pending is None or channel.busy:
+                        continue
+                    if now >= channel.next_at:
+                        channel.busy = True
+                        notification, channel.pending = channel.pending, None
+                        self._pool.submit(self._deliver, channel, notification)
+                    else:
+                        deadlines.append(channel.next_at)
+                self._wakeup.wait(max(0.0, min(deadlines) - now) if deadlines else None)
+
+    def _deliver(self, channel, notification):
+        try:
+            channel.sink.send(notification)
+            delivery_seconds.observe(time.monotonic() - notification.raised_at, channel=channel.name)
+        except Exception as e:
+            print(f"Error sending notification to {channel.name}: {e}")
+        with self._wakeup:
+            channel.busy = False
+            channel.next_at = time.monotonic() + channel.min_interval
+            self._wakeup.notify_all()
@@ -1,9 +1,3 @@
-import win32com.client
-
-# Initialize Outlook COM object
-outlook = win32com.client.Dispatch("Outlook.Application")
-namespace = outlook.GetNamespace("MAPI")
-
 def get_accounts(namespace):
     """Retrieve all Outlook accounts on the machine."""
     accounts = namespace.Accounts
@@ -14,4 +8,11 @@ def get_accounts(namespace):
     
     return account_list
 
-print(get_accounts(namespace))
\ No newline at end of file
+if __name__ == "__main__":
+    import win32com.client
+
+    # Initialize Outlook COM object
+    outlook = win32com.client.Dispatch("Outlook.Application")
+    namespace = outlook.GetNamespace("MAPI")
+
+    print(get_accounts(namespace))
\ No newline at end of file
@@ -0,0 +1,244 @@
+import bisect
+import calendar
+import heapq
+import threading
+from datetime import date, datetime, timedelta
+from meeting_identity import global_id
+
+# Outlook OlRecurrenceType values
+OL_RECURS_DAILY = 0
+OL_RECURS_WEEKLY = 1
+OL_RECURS_MONTHLY = 2
+OL_RECURS_MONTH_NTH = 3
+OL_RECURS_YEARLY = 5
+OL_RECURS_YEAR_NTH = 6
+
+CACHE_HORIZON = timedelta(days=7)  # Expand this far past the requested window, so the next syncs hit the cache
+
+def _naive(dt):
+    # COM hands out aware datetimes holding local wall-clock time; we work on the wall-clock value
+    if dt is None:
+        return None
+    return dt.replace(tzinfo=None) if dt.tzinfo else dt
+
+def _weekday_bit(d):
+    # olSunday = 1, olMonday = 2, ... olSaturday = 64
+    return 1 << ((d.weekday() + 1) % 7)
+
+def _nth_weekday(year, month, mask, instance):
+    """The instance-th day of the month matching the weekday mask (instance 5 = last)."""
+    days = [date(year, month, day) for day in range(1, calendar.monthrange(year, month)[1] + 1)]
+    matching = [d for d in days if mask & _weekday_bit(d)]
+    if not matching:
+        return None
+    return matching[-1] if instance >= 5 else matching[min(instance, len(matching)) - 1]
+
+
+class Series:
+    """
+    A recurring series read from its master item once: the pattern plus its
+    exceptions, with no COM objects kept around.
+    """
+
+    __slots__ = ("entry_id", "global_id", "subject", "last_modified", "recurrence_type", "interval", "day_of_week_mask",
+                 "day_of_month", "month_of_year", "instance", "pattern_start", "pattern_end",
+                 "start_time", "duration", "skipped", "moved")
+
+    def __init__(self, entry_id, subject, last_modified, recurrence_type, interval, day_of_week_mask,
+                 day_of_month, month_of_year, instance, pattern_start, pattern_end, start_time, duration,
+                 exceptions=(), global_id=None):
+        self.entry_id = entry_id
+        self.global_id = global_id
+        self.subject = subject
+        self.last_modified = last_modified
+        self.recurrence_type = recurrence_type
+        self.interval = max(1, interval or 1)
+        self.day_of_week_mask = day_of_week_mask
+        self.day_of_month = day_of_month
+        self.month_of_year = month_of_year
+        self.instance = instance
+        self.pattern_start = pattern_start    # date
+        self.pattern_end = pattern_end        # date, or None for no end date
+        self.start_time = start_time          # time of day
+        self.duration = duration              # minutes
+        # exceptions: (original date, None if deleted else (start, end, subject))
+        self.skipped = {original for original, _ in exceptions}
+        self.moved = sorted(occurrence for _, occurrence in exceptions if occurrence)
+
+    @classmethod
+    def from_item(cls, item):
+        """Read a recurring master (COM AppointmentItem or fake) into a Series."""
+        pattern = item.GetRecurrencePattern()
+        exceptions = []
+        for exception in pattern.Exceptions:
+            original = _naive(exception.OriginalDate).date()
+            if exception.Deleted:
+                exceptions.append((original, None))
+            else:
+                moved = exception.AppointmentItem
+                exceptions.append((original, (_naive(moved.Start), _naive(moved.End), moved.Subject)))
+        return cls(
+            entry_id=item.EntryID,
+            subject=item.Subject,
+            last_modified=_naive(item.LastModificationTime),
+            recurrence_type=pattern.RecurrenceType,
+            interval=pattern.Interval,
+            day_of_week_mask=pattern.DayOfWeekMask,
+            day_of_month=pattern.DayOfMonth,
+            month_of_year=pattern.MonthOfYear,
+            instance=pattern.Instance,
+            pattern_start=_naive(pattern.PatternStartDate).date(),
+            pattern_end=None if pattern.NoEndDate else _naive(pattern.PatternEndDate).date(),
+            start_time=_naive(pattern.StartTime).time(),
+            duration=pattern.Duration,
+            exceptions=exceptions,
+            global_id=global_id(item),
+        )
+
+    # ----- Expansion -----
+    def _dates(self, first, last):
+        """Dates of regular occurrences in [first, last], in order."""
+        start = max(first, self.pattern_start)
+        if self.pattern_end is not None:
+            last = min(last, self.pattern_end)
+        if start > last:
+            return
+        kind = self.recurrence_type
+
+        if kind == OL_RECURS_DAILY:
+            step = self.interval
+            k = -(-(start - self.pattern_start).days // step)
+            d = self.pattern_start + timedelta(days=k * step)
+            while d <= last:
+                yield d
+                d += timedelta(days=step)
+
+        elif kind == OL_RECURS_WEEKLY:
+            step = 7 * self.interval
+            anchor = self.pattern_start - timedelta(days=(self.pattern_start.weekday() + 1) % 7)  # Sunday
+            week = anchor + timedelta(days=(start - anchor).days // step * step)
+            while week <= last:
+                for offset in range(7):
+                    d = week + timedelta(days=offset)
+                    if start <= d <= last and self.day_of_week_mask & _weekday_bit(d):
+                        yield d
+                week += timedelta(days=step)
+
+        elif kind in (OL_RECURS_MONTHLY, OL_RECURS_MONTH_NTH, OL_RECURS_YEARLY, OL_RECURS_YEAR_NTH):
+            if kind in (OL_RECURS_YEARLY, OL_RECURS_YEAR_NTH):
+                # Yearly intervals are given in months (12 = every year) by current Outlook versions
+                step = self.interval if self.interval >= 12 else 12 * self.interval
+                first_month = self.pattern_start.year * 12 + (self.month_of_year or self.pattern_start.month) - 1
+            else:
+                step = self.interval
+                first_month = self.pattern_start.year * 12 + self.pattern_start.month - 1
+            k = max(0, (start.year * 12 + start.month - 1 - first_month) // step)
+            month = first_month + k * step
+            while True:
+                year, month_index = divmod(month, 12)
+                if date(year, month_index + 1, 1) > last:
+                    return
+                if kind in (OL_RECURS_MONTHLY, OL_RECURS_YEARLY):
+                    day = min(self.day_of_month, calendar.monthrange(year, month_index + 1)[1])
+                    d = date(year, month_index + 1, day)
+                else:
+                    d = _nth_weekday(year, month_index + 1, self.day_of_week_mask, self.instance)
+                if d is not None and start <= d <= last:
+                    yield d
+                month += step
+
+    def nth_date(self, count):
+        """Date of the count-th regular occurrence, ignoring exceptions (iCalendar COUNT), or None."""
+        horizon = self.pattern_start + timedelta(days=366 * 100)
+        for n, d in enumerate(self._dates(self.pattern_start, horizon), 1):
+            if n == count:
+                return d
+        return None
+
+    def occurrences(self, window_start, window_end):
+        """Yield (start, end, subject) for occurrences starting in [window_start, window_end], lazily and in order."""
+        duration = timedelta(minutes=self.duration)
+
+        def regular():
+            for d in self._dates(window_start.date(), window_end.date()):
+                if d in self.skipped:
+                    continue
+                start = datetime.combine(d, self.start_time)
+                if window_start <= start <= window_end:
+                    yield start, start + duration, self.subject
+
+        lo = bisect.bisect_left(self.moved, (window_start,))
+        moved = (o for o in self.moved[lo:] if o[0] <= window_end)
+        return heapq.merge(regular(), moved)
+
+
+class Occurrence:
+    """One expanded occurrence, with the same property names as an Outlook AppointmentItem."""
+
+    __slots__ = ("Subject", "Start", "End", "EntryID", "GlobalAppointmentID", "LastModificationTime")
+
+    IsRecurring = True
+
+    def __init__(self, subject, start, end, entry_id, last_modified, global_id=None):
+        self.Subject = subject
+        self.Start = start
+        self.End = end
+        self.EntryID = entry_id
+        self.LastModificationTime = last_modified
+        self.GlobalAppointmentID = global_id
+
+
+class SeriesCache:
+    """
+    Recurring series keyed by EntryID, with their expanded occurrences.
+
+    A series is re-read from the provider only when its LastModificationTime
+    changes; its occurrences are expanded for the requested window plus
+    CACHE_HORIZON and reused until a later window runs past them.
+    """
+
+    def __init__(self):
+        self._series = {}   # entry_id -> [series, expanded_from, expanded_until, occurrences]
+        self._lock = threading.Lock()  # Accounts are fetched on several threads
+
+    def __len__(self):
+        return len(self._series)
+
+    def is_current(self, entry_id, last_modified):
+        """True if the series `entry_id` is cached as of `last_modified` (no need to re-read its master)."""
+        with self._lock:
+            cached = self._series.get(entry_id)
+        return cached is not None and cached[0].last_modified == _naive(last_modified)
+
+    def series(self, item):
+        """Return the Series for a recurring master, reading its pattern only if it changed."""
+        entry_id = item.EntryID
+        last_modified = _naive(item.LastModificationTime)
+        with self._lock:
+            cached = self._series.get(entry_id)
+        if cached and cached[0].last_modified == last_modified:
+            return cached[0]
+        series = Series.from_item(item)
+        with self._lock:
+            self._series[entry_id] = [series, None, None, []]
+        return series
+
+    def occurrences(self, item, window_start, window_end):
+        """Occurrences of the master `item` starting in [window_start, window_end], in start order."""
+        series = self.series(item)
+        with self._lock:
+            entry = self._series[series.entry_id]
+            _, expanded_from, expanded_until, occurrences = entry
+            if expanded_from is None or window_start < expanded_from or window_end > expanded_until:
+                expanded_until = window_end + CACHE_HORIZON
+                occurrences = list(series.occurrences(window_start, expanded_until))
+                entry[1:] = [window_start, expanded_until, occurrences]
+        lo = bisect.bisect_left(occurrences, (window_start,))
+        for start, end, subject in occurrences[lo:]:
+            if start > window_end:
+                break
+            yield Occurrence(subject, start, end, series.entry_id, series.last_modified, series.global_id)
+
+
+# Shared by every fetch in this process
+series_cache = SeriesCache()
@@ -0,0 +1,134 @@
+import io
+import math
+import sys
+import wave
+import queue
+import struct
+import threading
+
+
+class Sound:
+    """A sound decoded once and kept in memory, both as PCM and as a complete WAV file."""
+
+    def __init__(self, wav_bytes):
+        self.wav_bytes = wav_bytes
+        with wave.open(io.BytesIO(wav_bytes), "rb") as wav:
+            self.channels = wav.getnchannels()
+            self.sample_width = wav.getsampwidth()
+            self.frame_rate = wav.getframerate()
+            self.pcm = wav.readframes(wav.getnframes())
+
+    @property
+    def duration(self):
+        return len(self.pcm) / (self.channels * self.sample_width * self.frame_rate)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "rb") as file:
+            return cls(file.read())
+
+    @classmethod
+    def tone(cls, freq=1000, duration_ms=1000, frame_rate=22050):
+        """A sine beep, the in-memory equivalent of winsound.Beep(freq, duration_ms)."""
+        frames = int(frame_rate * duration_ms / 1000)
+        pcm = b"".join(
+            struct.pack("<h", int(12000 * math.sin(2 * math.pi * freq * i / frame_rate)))
+            for i in range(frames)
+        )
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(frame_rate)
+            wav.writeframes(pcm)
+        return cls(buffer.getvalue())
+
+
+# ----- Output backends -----
+
+class WinsoundSink:
+    """Plays from memory with winsound (Windows); no file is read at ring time."""
+
+    def __init__(self):
+        import winsound
+        self._winsound = winsound
+
+    def play(self, sound):
+        self._winsound.PlaySound(sound.wav_bytes, self._winsound.SND_MEMORY)
+
+
+class SimpleAudioSink:
+    """Plays the PCM buffer with the optional simpleaudio package (any OS)."""
+
+    def __init__(self):
+        import simpleaudio
+        self._simpleaudio = simpleaudio
+
+    def play(self, sound):
+        self._simpleaudio.play_buffer(
+            sound.pcm, sound.channels, sound.sample_width, sound.frame_rate
+        ).wait_done()
+
+
+class NullSink:
+    """Discards every sound (headless machines)."""
+
+    def play(self, sound):
+        pass
+
+
+class RecordingSink:
+    """Remembers what it was asked to play, for tests and benchmarks."""
+
+    def __init__(self):
+        self.played = []
+        self.event = threading.Event()
+
+    def play(self, sound):
+        self.played.append(sound)
+        self.event.set()
+
+
+def default_sink():
+    if sys.platform == "win32":
+        return WinsoundSink()
+    try:
+        return SimpleAudioSink()
+    except ImportError:
+        print("No audio backend available (install simpleaudio); rings will be silent")
+        return NullSink()
+
+
+# ----- Player -----
+
+class RingPlayer:
+    """
+    Plays sounds on a dedicated worker thread so alerting never waits on audio.
+
+    ring() only enqueues and returns immediately. If rings pile up faster than
+    they can be played (several meetings starting at once), the extra ones are
+    dropped rather than queued behind each other.
+    """
+
+    def __init__(self, sound, sink=None, max_pending=2):
+        self.sound = sound
+        self.sink = sink or default_sink()
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="ring-player", daemon=True)
+        self._thread.start()
+
+    def ring(self, sound=None):
+        """Queue a sound (the default ring if None); returns False if it was dropped."""
+        try:
+            self._pending.put_nowait(sound or self.sound)
+            return True
+        except queue.Full:
+            return False
+
+    def _run(self):
+        while True:
+            sound = self._pending.get()
+            try:
+                self.sink.play(sound)
+            except Exception as e:
+                print(f"Error playing sound: {e}")
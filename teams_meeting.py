@@ -1,12 +1,22 @@
+import os
 import win32com.client
 from datetime import datetime, timedelta
 import time
 import tzlocal
-from playsound import playsound
+from calendar_provider import iter_window
+from meeting_identity import meeting_id
+from alarm_engine import AlarmEngine
+from ring_player import RingPlayer, Sound
 
 # Get local timezone
 local_tz = tzlocal.get_localzone()
 
+ALERT_BEFORE = timedelta(minutes=5)  # Ring 5 minutes before the meeting
+SYNC_INTERVAL = 60  # Seconds between Outlook syncs
+RING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ring1.wav")
+
+player = None  # RingPlayer, created at startup with the ring decoded once
+
 def get_upcoming_meetings():
     outlook = win32com.client.Dispatch("Outlook.Application")
     namespace = outlook.GetNamespace("MAPI")
@@ -15,9 +25,7 @@ def get_upcoming_meetings():
     now = datetime.now(local_tz)
     end_time = now + timedelta(days=1)
 
-    calendar_items = calendar_folder.Items
-    calendar_items.IncludeRecurrences = True
-    calendar_items.Sort("[Start]")
+    calendar_items = iter_window(calendar_folder, now, end_time)
 
     meetings = []
     for item in calendar_items:
@@ -29,38 +37,44 @@ def get_upcoming_meetings():
                 meetings.append({
                     "subject": item.Subject,
                     "start": start,
-                    "end": end
+                    "end": end,
+                    "id": meeting_id(item)
                 })
         except Exception as e:
             print(f"Error processing item: {e}")
 
     return meetings
 
-def check_and_alert(meetings):
-    now = datetime.now(local_tz)
+def alert(meeting_id, meeting):
+    print(f"ALERT: Meeting '{meeting['subject']}' is starting soon at {meeting['start']}!")
+    player.ring()  # Queued on the player thread, never blocks the next alert
 
+def schedule_alerts(engine, meetings):
+    """Hand the current meetings to the alarm engine; it rings each one once, 5 minutes before it starts."""
+    now = datetime.now(local_tz)
+    alarms = {}
     for meeting in meetings:
         start_time = meeting["start"]
-        time_to_meeting = (start_time - now).total_seconds() / 60
-
-        print(f"Checking meeting: {meeting['subject']} | Start: {start_time} | Now: {now} | Time to meeting: {time_to_meeting:.2f} mins")
-
-        # Alert if within next 5 minutes
-        if 0 <= time_to_meeting <= 5:
-            print(f"ALERT: Meeting '{meeting['subject']}' is starting soon at {start_time}!")
-            playsound("ring1.wav")
+        if start_time < now:
+            continue
+        alarms[meeting["id"]] = (start_time - ALERT_BEFORE, meeting)
+    engine.replace_all(alarms)
+    print(f"Scheduled {len(alarms)} meeting alert(s), next sync in {SYNC_INTERVAL} seconds")
 
 if __name__ == "__main__":
     print("Meeting alarm started. Monitoring your Outlook calendar...")
 
+    player = RingPlayer(Sound.from_file(RING_FILE))
+    engine = AlarmEngine(on_ring=alert).start()
     while True:
         try:
             meetings = get_upcoming_meetings()
-            check_and_alert(meetings)
-            time.sleep(60)  # Check every 60 seconds
+            schedule_alerts(engine, meetings)
+            # Alarms are fired by the engine at their exact time; this only refreshes the schedule
+            time.sleep(SYNC_INTERVAL)
         except KeyboardInterrupt:
             print("Program interrupted by user. Exiting...")
             break
         except Exception as e:
             print(f"An error occurred: {e}")
-            time.sleep(60)
\ No newline at end of file
+            time.sleep(SYNC_INTERVAL)
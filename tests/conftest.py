@@ -0,0 +1,87 @@
+import os
+import sys
+import types
+import importlib.util
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Shared modules at the root, the Outlook fakes next to the benchmarks, and
+# each app's own modules (both apps' app.py are loaded under their own names)
+for path in (ROOT, os.path.join(ROOT, "benchmarks"), os.path.join(ROOT, "backend"), os.path.join(ROOT, "dev_app")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+
+def load(name, path):
+    """Import the file at `path` as module `name` (several modules of the repository share a file name)."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def dev_app(tmp_path_factory):
+    """dev_app/app.py, imported with its meetings.db in a temporary directory and toasts silenced."""
+    toast = types.ModuleType("win10toast")  # Windows only
+    toast.ToastNotifier = lambda: types.SimpleNamespace(show_toast=lambda *args, **kwargs: None)
+    sys.modules.setdefault("win10toast", toast)
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("dev_app"))
+    try:
+        module = load("dev_app_app", os.path.join(ROOT, "dev_app", "app.py"))
+    finally:
+        os.chdir(cwd)
+    module.started.set()  # Tests drive syncs and alerts themselves: no scheduler, no background sync
+    return module
+
+
+@pytest.fixture(scope="session")
+def feature_funcs():
+    """dev_app/feature_funcs' meetings_ahead and alarm, which share their names with other modules."""
+    folder = os.path.join(ROOT, "dev_app", "feature_funcs")
+    shadowed = sys.modules.pop("meetings_ahead", None)
+    sys.path.insert(0, folder)
+    try:
+        meetings_ahead = load("meetings_ahead", os.path.join(folder, "meetings_ahead.py"))
+        alarm = load("feature_alarm", os.path.join(folder, "alarm.py"))
+    finally:
+        sys.path.remove(folder)
+        del sys.modules["meetings_ahead"]
+        if shadowed is not None:
+            sys.modules["meetings_ahead"] = shadowed
+    return types.SimpleNamespace(meetings_ahead=meetings_ahead, alarm=alarm)
+
+
+@pytest.fixture
+def store(tmp_path, dev_app):
+    from meeting_store import MeetingStore
+    return MeetingStore(str(tmp_path / "meetings.db"), dev_app.local_tz)
+
+
+@pytest.fixture(scope="session")
+def backend_app(tmp_path_factory):
+    """backend/app.py, with its saved schedule in a temporary directory and nothing started."""
+    module = load("backend_app", os.path.join(ROOT, "backend", "app.py"))
+    from alarm import alarm
+    alarm.SCHEDULE_FILE = str(tmp_path_factory.mktemp("backend") / "alarm_schedule.json")
+    module.started.set()  # Tests refresh the schedule themselves: no background refresher
+    return module
+
+
+@pytest.fixture
+def backend(backend_app):
+    """
+    The backend's alarm module, emptied and reading an empty calendar of
+    a@example.com (backend.source.namespace, a FakeNamespace) instead of Outlook.
+    """
+    from alarm import alarm
+    from alarm_queue import AlarmQueue
+    from calendar_source import OutlookSource
+    from fake_outlook import FakeNamespace
+    from interval_index import IntervalIndex
+    alarm.alarms, alarm.cancelled, alarm.meeting_index = AlarmQueue(), set(), IntervalIndex()
+    alarm.source = OutlookSource(FakeNamespace({"a@example.com": []}))
+    alarm.snapshot.refreshed_at = None
+    return alarm
@@ -0,0 +1,173 @@
+import time
+import threading
+import collections
+from datetime import datetime, timedelta
+import pytest
+from calendar_provider import AccountGuard, fetch_accounts
+from fake_outlook import FakeAppointment, FakeNamespace
+
+ACCOUNTS = ["a@example.com", "b@example.com"]
+
+
+@pytest.fixture
+def namespace():
+    start = datetime(2026, 1, 5, 9)
+    namespace = FakeNamespace({account: [FakeAppointment(f"{account} meeting", start, start + timedelta(hours=1))]
+                               for account in ACCOUNTS})
+    yield namespace
+    for account in ACCOUNTS:
+        namespace.release(account)  # Don't leave a worker thread blocked
+
+@pytest.fixture
+def asked():
+    return collections.Counter()
+
+@pytest.fixture
+def fetch(asked):
+    def fetch_one(namespace, account):
+        asked[account] += 1
+        return [item.Subject for item in namespace.calendar(account).Items]
+    return fetch_one
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_unguarded_fetch_returns_every_account(namespace, fetch):
+    assert fetch_accounts(namespace, ACCOUNTS, fetch) == {
+        "a@example.com": ["a@example.com meeting"],
+        "b@example.com": ["b@example.com meeting"],
+    }
+
+def test_failing_account_is_left_out(namespace, fetch):
+    namespace.set_offline("a@example.com")
+    assert list(fetch_accounts(namespace, ACCOUNTS, fetch)) == ["b@example.com"]
+
+def test_hung_account_gets_its_last_good_result(namespace, fetch, asked):
+    guard = AccountGuard(deadline=0.2)
+    first = fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)
+    namespace.hang("a@example.com")
+    namespace.calendar("a@example.com")._items[0].Subject = "renamed"
+    t0 = time.monotonic()
+    assert fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard) == first
+    assert time.monotonic() - t0 < 2  # Well short of "forever"
+    assert guard.status("a@example.com")[0] == 1
+
+    # Still hung: not asked again, so it holds one thread at most
+    fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)
+    assert asked["a@example.com"] == 2
+
+    # Its late answer is the last good result for the next sync
+    namespace.release("a@example.com")
+    wait_until(lambda: guard.allow("a@example.com"))
+    assert guard.last_good("a@example.com") == (True, ["renamed"])
+    assert fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)["a@example.com"] == ["renamed"]
+    assert guard.status("a@example.com") == (0, 0.0)
+
+def test_without_remember_a_late_account_is_left_out(namespace, fetch):
+    guard = AccountGuard(deadline=0.2, remember=False)
+    fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)
+    namespace.hang("a@example.com")
+    assert list(fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)) == ["b@example.com"]
+    assert guard.last_good("a@example.com") == (False, None)
+
+def test_breaker_stops_asking_an_offline_account(namespace, fetch, asked):
+    guard = AccountGuard(deadline=1.0, failures=3, backoff=60)
+    fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)
+    namespace.set_offline("a@example.com")
+    asked.clear()
+    for _ in range(10):
+        results = fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)
+        assert results["a@example.com"] == ["a@example.com meeting"]  # Last good
+    assert asked["a@example.com"] == 3
+    failures, retry_in = guard.status("a@example.com")
+    assert failures == 3 and 0 < retry_in <= 60
+
+def test_breaker_trial_closes_or_reopens_it(namespace, fetch, asked):
+    guard = AccountGuard(deadline=1.0, failures=2, backoff=0.05, max_backoff=30)
+    namespace.set_offline("a@example.com")
+    for failures in (1, 2):
+        fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)
+        # Failures are counted by the fetch's done-callback, just after fetch_accounts() sees them
+        wait_until(lambda: guard.status("a@example.com")[0] == failures)
+    assert not guard.allow("a@example.com")
+
+    # A failed trial re-opens the breaker
+    wait_until(lambda: guard.allow("a@example.com"))
+    fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)
+    wait_until(lambda: guard.status("a@example.com")[0] == 3)
+    assert asked["a@example.com"] == 3
+
+    # A successful one closes it
+    namespace.set_offline("a@example.com", False)
+    wait_until(lambda: guard.allow("a@example.com"))
+    assert fetch_accounts(namespace, ACCOUNTS, fetch, guard=guard)["a@example.com"] == ["a@example.com meeting"]
+    wait_until(lambda: guard.status("a@example.com") == (0, 0.0))
+
+
+# ----- Streaming reads (next_meetings) -----
+
+@pytest.fixture(params=["backend", "feature_funcs"])
+def next_meetings(request):
+    if request.param == "backend":
+        from alarm.meeting_ahead import next_meetings
+        return next_meetings
+    return request.getfixturevalue("feature_funcs").meetings_ahead.next_meetings
+
+@pytest.fixture
+def upcoming():
+    # Booked relative to now: next_meetings reads from the current time on
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(hours=1)
+    namespace = FakeNamespace({account: [FakeAppointment(f"{account} meeting", start + timedelta(minutes=10 * i),
+                                                         start + timedelta(hours=1))]
+                               for i, account in enumerate(ACCOUNTS)})
+    yield namespace
+    for account in ACCOUNTS:
+        namespace.release(account)
+
+# How a source names an account: (display name, address)
+HUNG = ("a@example.com", "a@example.com")
+
+def subjects(meetings):
+    return [meeting["subject"] for meeting in meetings]
+
+def test_next_meetings_returns_without_a_hung_account(upcoming, next_meetings):
+    guard = AccountGuard(deadline=0.2)
+    assert subjects(next_meetings(upcoming, 2, 1, guard=guard)) == [f"{account} meeting" for account in ACCOUNTS]
+    upcoming.hang("a@example.com")
+    for _ in range(2):
+        t0 = time.monotonic()
+        assert subjects(next_meetings(upcoming, 2, 1, guard=guard)) == ["b@example.com meeting"]
+        assert time.monotonic() - t0 < 2
+    assert not guard.allow_read(HUNG)  # Still hung: skipped, not asked again
+    assert guard.status(HUNG)[0] == 1
+
+    upcoming.release("a@example.com")
+    wait_until(lambda: guard.allow_read(HUNG))
+    assert subjects(next_meetings(upcoming, 1, 1, guard=guard)) == ["a@example.com meeting"]
+    assert guard.last_good(HUNG) == (False, None)  # Streams aren't replayed
+    wait_until(lambda: guard.status(HUNG) == (0, 0.0))
+
+def test_next_meetings_skips_a_backed_off_account(upcoming, next_meetings):
+    guard = AccountGuard(deadline=1.0, failures=1, backoff=60)
+    upcoming.set_offline("a@example.com")
+    assert subjects(next_meetings(upcoming, 2, 1, guard=guard)) == ["b@example.com meeting"]
+    wait_until(lambda: guard.status(HUNG)[0] == 1)
+    upcoming.set_offline("a@example.com", False)
+    assert subjects(next_meetings(upcoming, 2, 1, guard=guard)) == ["b@example.com meeting"]
+    assert not guard.allow(HUNG)  # Full fetches share the breaker
+
+def test_a_fetch_in_flight_does_not_hold_a_read_back(upcoming, next_meetings):
+    guard = AccountGuard(deadline=5.0)
+    upcoming.hang("a@example.com")
+    fetching = threading.Thread(target=fetch_accounts, args=(upcoming, [HUNG], lambda ns, account: ns.calendar(account[1]).Items),
+                                kwargs={"guard": guard})
+    fetching.start()
+    wait_until(lambda: not guard.allow(HUNG))
+    assert guard.allow_read(HUNG)
+    upcoming.release("a@example.com")
+    fetching.join()
+    assert len(next_meetings(upcoming, 2, 1, guard=guard)) == 2
@@ -0,0 +1,77 @@
+import queue
+from datetime import datetime, timedelta, timezone
+import pytest
+from alarm_engine import AlarmEngine
+
+QUIET = 0.3  # Seconds to wait for an alarm that must not ring
+
+
+def at(seconds):
+    return datetime.now(timezone.utc) + timedelta(seconds=seconds)
+
+@pytest.fixture
+def rung():
+    return queue.Queue()
+
+@pytest.fixture
+def engine(rung):
+    engine = AlarmEngine(on_ring=lambda alarm_id, payload: rung.put((alarm_id, payload))).start()
+    yield engine
+    engine.stop()
+
+def ring(rung, timeout=5):
+    return rung.get(timeout=timeout)
+
+def silent(rung):
+    with pytest.raises(queue.Empty):
+        rung.get(timeout=QUIET)
+    return True
+
+
+def test_alarms_ring_once_in_ring_order(engine, rung):
+    engine.schedule("later", at(0.2), "second")
+    engine.schedule("sooner", at(0.1), "first")
+    engine.schedule("past", at(-60), "overdue")
+    assert [ring(rung) for _ in range(3)] == [("past", "overdue"), ("sooner", "first"), ("later", "second")]
+    assert silent(rung) and engine.pending() == 0
+
+def test_a_sync_repeating_a_rung_alarm_does_not_ring_it_again(engine, rung):
+    when = at(-1)
+    engine.schedule("m", when, "standup")
+    assert ring(rung) == ("m", "standup")
+    engine.schedule("m", when, "standup")
+    engine.replace_all({"m": (when, "standup")})
+    assert silent(rung)
+    # Rescheduled: a new ring time rings again
+    engine.schedule("m", at(0.05), "standup (moved)")
+    assert ring(rung) == ("m", "standup (moved)")
+
+def test_an_earlier_alarm_wakes_the_sleeping_engine(engine, rung):
+    engine.schedule("tomorrow", at(86400))
+    engine.schedule("now", at(0.05))
+    assert ring(rung, timeout=2) == ("now", None)
+    assert engine.pending() == 1
+
+def test_cancelled_and_replaced_alarms_do_not_ring(engine, rung):
+    engine.schedule("cancelled", at(0.1))
+    engine.schedule("dropped", at(0.1))
+    engine.schedule("moved", at(0.1))
+    engine.cancel("cancelled")
+    engine.replace_all({"moved": (at(86400), None), "new": (at(0.1), "added")})
+    assert ring(rung) == ("new", "added")
+    assert silent(rung)
+    assert engine.pending() == 1
+
+def test_a_failing_callback_does_not_stop_the_engine(rung):
+    def on_ring(alarm_id, payload):
+        if alarm_id == "bad":
+            raise RuntimeError("no sound device")
+        rung.put(alarm_id)
+
+    engine = AlarmEngine(on_ring).start()
+    try:
+        engine.schedule("bad", at(-1))
+        engine.schedule("good", at(0.05))
+        assert ring(rung) == "good"
+    finally:
+        engine.stop()
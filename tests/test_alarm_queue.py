@@ -0,0 +1,121 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from alarm_queue import AlarmQueue
+from calendar_provider import AccountGuard
+from fake_outlook import FakeAppointment, FakeNamespace
+
+ACCOUNT = "a@example.com"
+
+
+def drain(alarms):
+    return [alarms.pop()[1] for _ in range(len(alarms))]
+
+
+def test_pops_in_key_order_with_ties_in_insertion_order():
+    alarms = AlarmQueue()
+    for alarm_id, key in [("c", 3), ("a", 1), ("b1", 2), ("b2", 2)]:
+        alarms.push(alarm_id, key)
+    assert alarms.peek() == (1, "a", None)
+    assert drain(alarms) == ["a", "b1", "b2", "c"]
+    assert alarms.peek() is None
+
+def test_update_and_remove_in_place():
+    alarms = AlarmQueue()
+    for i in range(10):
+        alarms.push(i, i, f"item {i}")
+    alarms.update(9, -1)                  # Earlier
+    alarms.update(0, 100, "snoozed")      # Later, with a new item
+    alarms.push(5, 50)                    # push() of a queued id moves it
+    assert alarms.remove(3) == "item 3"
+    assert alarms.remove(3) is None
+    assert 3 not in alarms and len(alarms) == 9
+    assert alarms.get(0) == (100, "snoozed")
+    assert drain(alarms) == [9, 1, 2, 4, 6, 7, 8, 5, 0]
+
+def test_matches_a_sorted_list():
+    rng = random.Random(3)
+    alarms = AlarmQueue()
+    expected = {}
+    for _ in range(5000):
+        alarm_id = rng.randrange(200)
+        action = rng.random()
+        if action < 0.5:
+            key = rng.randrange(1000)
+            alarms.push(alarm_id, key)
+            expected[alarm_id] = key
+        elif action < 0.8:
+            alarms.remove(alarm_id)
+            expected.pop(alarm_id, None)
+        elif expected:
+            key, alarm_id, _ = alarms.pop()
+            assert key == min(expected.values()) and expected.pop(alarm_id) == key
+    assert sorted(alarms.get(alarm_id)[0] for alarm_id in alarms) == sorted(expected.values())
+
+
+# ----- dev_app/feature_funcs/alarm.py -----
+
+@pytest.fixture
+def feature(feature_funcs):
+    feature_funcs.alarm.alarms = AlarmQueue()
+    return feature_funcs.alarm
+
+def meeting(meeting_id, subject, start, accounts=(ACCOUNT,)):
+    return {"id": meeting_id, "subject": subject, "start": start, "end": start + timedelta(minutes=30),
+            "account": accounts[0], "accounts": list(accounts), "ring_at": start - timedelta(minutes=5),
+            "snoozed": 0}
+
+def test_ring_time_follows_the_calendar(feature):
+    now = datetime.now()
+    assert feature.ring_time([]) is None
+    first = meeting("a", "Standup", now + timedelta(hours=1))
+    second = meeting("b", "Review", now + timedelta(hours=2))
+    assert feature.ring_time([first, second])["id"] == "a"
+
+    # Renamed and booked in a second account: same alarm, new details
+    first["snoozed"] = 10
+    feature.snooze(first)
+    renamed = meeting("a", "Daily standup", first["start"], accounts=(ACCOUNT, "b@example.com"))
+    ringing = feature.ring_time([renamed, second])
+    assert (ringing["subject"], ringing["accounts"], ringing["snoozed"]) == (
+        "Daily standup", [ACCOUNT, "b@example.com"], 10)
+    assert feature.alarms.get("a")[0] == first["ring_at"] + timedelta(minutes=10)
+
+    # Moved to tomorrow: rings then, and the snooze no longer applies
+    moved = meeting("a", "Daily standup", now + timedelta(days=1))
+    assert feature.ring_time([moved, second])["id"] == "b"
+    assert feature.alarms.get("a") == (moved["ring_at"], moved)
+
+    # Deleted from the calendar
+    assert feature.ring_time([moved])["id"] == "a"
+    assert feature.ring_time([]) is None
+
+def test_snooze_and_cancel(feature):
+    now = datetime.now()
+    first = meeting("a", "Standup", now + timedelta(hours=1))
+    second = meeting("b", "Review", now + timedelta(hours=1, minutes=10))
+    feature.ring_time([first, second])
+    first["snoozed"] = 15
+    assert feature.snooze(first)["id"] == "b"
+    feature.cancel(second)
+    assert feature.ring_time([first])["id"] == "a"
+
+def test_ring_time_over_a_fetched_calendar(feature_funcs, feature):
+    now = datetime.now().replace(second=0, microsecond=0)
+    standup = FakeAppointment("Standup", now + timedelta(hours=1), now + timedelta(hours=1, minutes=15))
+    review = FakeAppointment("Review", now + timedelta(hours=3), now + timedelta(hours=4))
+    namespace = FakeNamespace({ACCOUNT: [standup, review]})
+
+    def fetch():
+        return feature_funcs.meetings_ahead.meetings_ahead(namespace, 8, 5, guard=AccountGuard())
+
+    assert feature.ring_time(fetch())["subject"] == "Standup"
+    folder = namespace.calendar(ACCOUNT)
+    folder.remove(standup.EntryID)
+    standup.Start += timedelta(days=1)
+    standup.End += timedelta(days=1)
+    standup.Subject = "Standup (moved)"
+    folder.add(standup)
+    assert feature.ring_time(fetch())["subject"] == "Review"
+    assert feature.alarms.get(feature.ring_time(fetch())["id"])[1]["subject"] == "Review"
+    assert [feature.alarms.pop()[2]["subject"] for _ in range(2)] == ["Review", "Standup (moved)"]
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+import pytest
+from alert_dispatcher import AlertDispatcher, DISPATCH_JOB
+from store_writer import StoreWriter
+
+
+class Scheduler:
+    """The part of APScheduler's interface AlertDispatcher uses, run by hand."""
+
+    def __init__(self):
+        self.jobs = {}
+
+    def add_job(self, func, trigger, run_date, id, **kwargs):
+        self.jobs[id] = (func, run_date)
+
+    def get_job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def remove_job(self, job_id):
+        del self.jobs[job_id]
+
+
+@pytest.fixture
+def writer(store):
+    writer = StoreWriter(store)
+    yield writer
+    writer.stop()
+
+def meeting(store, subject, minutes, account="a@example.com", uid=None, alert=True):
+    start = datetime.now(store.tz) + timedelta(minutes=minutes)
+    return {"subject": subject, "start_time": start, "account": account, "entry_id": f"{account}/{subject}",
+            "uid": uid, "alert_time": start - timedelta(minutes=5) if alert else None}
+
+def add(store, *meetings):
+    return [store.add(m) for m in meetings]
+
+def subjects(store):
+    return sorted(m["subject"] for m in store._select())
+
+
+def test_a_due_alert_rings_once_and_is_not_rearmed(store, writer):
+    add(store,
+        meeting(store, "Standup", 3, uid="standup"),                      # Alert due 2 minutes ago
+        meeting(store, "Standup", 3, account="b@example.com", uid="standup", alert=False),
+        meeting(store, "Review", 60, uid="review"))
+    rung = []
+    scheduler = Scheduler()
+    dispatcher = AlertDispatcher(scheduler, store, rung.append, writer=writer)
+    dispatcher.reconcile()
+    assert scheduler.get_job(DISPATCH_JOB)[1] <= datetime.now(store.tz)
+
+    dispatcher.dispatch()
+    assert [m["subject"] for m in rung] == ["Standup"]
+    assert subjects(store) == ["Review"]  # Both accounts' copies are gone with the alert
+    # Later syncs re-check the alerts: nothing is left to arm for the meeting that rang
+    dispatcher.reconcile()
+    dispatcher.dispatch()
+    assert len(rung) == 1
+    assert scheduler.get_job(DISPATCH_JOB)[1] == store.next_alert()
+
+def test_reconcile_keeps_one_alert_per_meeting(store, writer):
+    add(store, meeting(store, "Review", 60, uid="review"),
+        meeting(store, "Review", 60, account="b@example.com", uid="review"),
+        meeting(store, "Started", -1, uid="started"))
+    dispatcher = AlertDispatcher(Scheduler(), store, lambda m: None, writer=writer)
+    dispatcher.reconcile()
+    alerts = [m["alert_time"] for m in store._select() if m["subject"] == "Review"]
+    assert len(alerts) == 2 and alerts.count(None) == 1
+    assert [m["alert_time"] for m in store._select() if m["subject"] == "Started"] == [None]
+
+def test_snooze_and_cancel_commands(dev_app, store, writer):
+    first, second = add(store, meeting(store, "Review", 60, uid="review"),
+                        meeting(store, "Review", 60, account="b@example.com", uid="review", alert=False))
+    _, alert_time = writer.apply(dev_app.snooze_alert, second, 10)
+    assert store.get(first)["alert_time"] is None
+    assert store.get(second)["alert_time"] == alert_time
+    assert timedelta(minutes=9) < alert_time - datetime.now(store.tz) <= timedelta(minutes=10)
+
+    assert writer.apply(dev_app.cancel_alert, first)["subject"] == "Review"
+    assert store.count() == 0
+    assert writer.apply(dev_app.cancel_alert, first) is None
+
+def test_a_restarted_dispatcher_arms_the_persisted_alerts(store, writer):
+    add(store, meeting(store, "Review", 60, uid="review"), meeting(store, "Planning", 30, uid="planning"))
+    AlertDispatcher(Scheduler(), store, lambda m: None, writer=writer).reconcile()
+    scheduler = Scheduler()  # A new process: nothing scheduled but what the store holds
+    dispatcher = AlertDispatcher(scheduler, store, lambda m: None, writer=writer)
+    dispatcher.reconcile()
+    assert list(scheduler.jobs) == [DISPATCH_JOB]
+    assert scheduler.get_job(DISPATCH_JOB)[1] == store.next_alert()
+    assert store.next_alert() == min(m["alert_time"] for m in store._select())  # Planning's
+
+    writer.apply(lambda store: store.clear_alerts([m["id"] for m in store._select()]))
+    assert dispatcher.rearm() is None and scheduler.jobs == {}
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+import pytest
+from calendar_provider import AccountGuard
+from fake_outlook import FakeAppointment, FakeNamespace
+from outlook_fetcher import get_meeting_changes
+
+ACCOUNT = "a@example.com"
+
+
+@pytest.fixture
+def calendar():
+    now = datetime.now().replace(second=0, microsecond=0)
+    items = [
+        FakeAppointment(f"Meeting {i}", now + timedelta(days=1, hours=i), now + timedelta(days=1, hours=i, minutes=30),
+                        last_modified=now - timedelta(hours=5 - i))
+        for i in range(3)
+    ]
+    return FakeNamespace({ACCOUNT: items}), items
+
+def sync(namespace, state):
+    return get_meeting_changes(state, days=8, namespace=namespace, guard=AccountGuard(remember=False))[ACCOUNT]
+
+def subjects(store):
+    now = datetime.now(store.tz)
+    return sorted(m["subject"] for m in store.in_window(now, now + timedelta(days=8)))
+
+
+def test_first_sync_is_full(calendar):
+    namespace, items = calendar
+    change = sync(namespace, {})
+    assert sorted(change["changed"].subject) == ["Meeting 0", "Meeting 1", "Meeting 2"]
+    assert change["entry_ids"] == {item.EntryID for item in items}
+
+def test_later_syncs_return_only_changes(calendar):
+    namespace, items = calendar
+    state = sync(namespace, {})["state"]
+    items[0].Subject = "Meeting 0 (edited)"
+    items[0].LastModificationTime = datetime.now()
+    change = sync(namespace, {ACCOUNT: state})
+    # Meeting 2 was modified in the watermark's minute, which is always asked for again
+    assert sorted(change["changed"].subject) == ["Meeting 0 (edited)", "Meeting 2"]
+    assert change["entry_ids"] == {item.EntryID for item in items}
+
+def test_deleted_items_leave_the_window(calendar):
+    namespace, items = calendar
+    state = sync(namespace, {})["state"]
+    namespace.calendar(ACCOUNT).remove(items[1].EntryID)
+    assert items[1].EntryID not in sync(namespace, {ACCOUNT: state})["entry_ids"]
+
+def test_reconcile_adds_moves_and_drops(dev_app, store, calendar):
+    namespace, items = calendar
+    assert dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+    assert subjects(store) == ["Meeting 0", "Meeting 1", "Meeting 2"]
+    for meeting in store.for_account(ACCOUNT):
+        assert meeting["alert_time"] == meeting["start_time"] - dev_app.ALERT_BEFORE
+
+    folder = namespace.calendar(ACCOUNT)
+    moved = items[0]
+    folder.remove(moved.EntryID)
+    moved.Start += timedelta(days=1)
+    moved.End += timedelta(days=1)
+    moved.LastModificationTime = datetime.now()
+    folder.add(moved)
+    folder.remove(items[1].EntryID)
+    assert dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+
+    assert subjects(store) == ["Meeting 0", "Meeting 2"]
+    stored = {m["entry_id"]: m for m in store.for_account(ACCOUNT)}
+    assert stored[moved.EntryID]["start_time"].replace(tzinfo=None) == moved.Start
+    assert stored[moved.EntryID]["alert_time"] == stored[moved.EntryID]["start_time"] - dev_app.ALERT_BEFORE
+
+def test_unchanged_sync_keeps_a_snooze(dev_app, store, calendar):
+    namespace, _ = calendar
+    dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+    meeting = store.for_account(ACCOUNT)[-1]
+    _, snoozed_until = dev_app.snooze_alert(store, meeting["id"], 10)
+    assert not dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+    assert store.get(meeting["id"])["alert_time"] == snoozed_until
+
+def test_a_cancelled_meeting_stays_cancelled(dev_app, store, calendar):
+    namespace, items = calendar
+    dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+    # Meeting 2 has the newest LastModificationTime: every sync fetches it again
+    [latest] = [m for m in store.for_account(ACCOUNT) if m["entry_id"] == items[2].EntryID]
+    assert dev_app.cancel_alert(store, latest["id"])
+    assert not dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+    assert subjects(store) == ["Meeting 0", "Meeting 1"]
+
+    # Moved in Outlook: a new occurrence, with its alert
+    folder = namespace.calendar(ACCOUNT)
+    folder.remove(items[2].EntryID)
+    items[2].Start += timedelta(hours=1)
+    items[2].End += timedelta(hours=1)
+    items[2].LastModificationTime = datetime.now()
+    folder.add(items[2])
+    assert dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+    assert subjects(store) == ["Meeting 0", "Meeting 1", "Meeting 2"]
+    assert store.cancelled(ACCOUNT) == {(items[2].EntryID, int((items[2].Start - timedelta(hours=1)).timestamp()))}
+
+def test_tombstones_go_with_their_meetings(dev_app, store, calendar):
+    namespace, items = calendar
+    dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+    dev_app.cancel_alert(store, store.for_account(ACCOUNT)[0]["id"])
+    assert len(store.cancelled(ACCOUNT)) == 1
+    namespace.calendar(ACCOUNT).remove(items[0].EntryID)
+    dev_app.reconcile(store, {ACCOUNT: sync(namespace, store.get_sync_state())})
+    assert store.cancelled(ACCOUNT) == set()
@@ -0,0 +1,198 @@
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+import pytest
+from ics_source import IcsCalendar, IcsSource
+
+WINDOW = (datetime(2026, 1, 1), datetime(2026, 12, 31, 23, 59))
+
+# Outlook exports Windows zone names, defined by a VTIMEZONE in the file
+W_EUROPE = """BEGIN:VTIMEZONE
+TZID:W. Europe Standard Time
+BEGIN:STANDARD
+DTSTART:16010101T030000
+TZOFFSETFROM:+0200
+TZOFFSETTO:+0100
+RRULE:FREQ=YEARLY;BYDAY=-1SU;BYMONTH=10
+END:STANDARD
+BEGIN:DAYLIGHT
+DTSTART:16010101T020000
+TZOFFSETFROM:+0100
+TZOFFSETTO:+0200
+RRULE:FREQ=YEARLY;BYDAY=-1SU;BYMONTH=3
+END:DAYLIGHT
+END:VTIMEZONE
+"""
+
+def event(uid, start, end, summary, *extra):
+    return "\n".join(["BEGIN:VEVENT", f"UID:{uid}", f"DTSTART:{start}", f"DTEND:{end}", f"SUMMARY:{summary}",
+                      *extra, "END:VEVENT"]) + "\n"
+
+def write(path, *blocks):
+    text = "BEGIN:VCALENDAR\nVERSION:2.0\n" + "".join(blocks) + "END:VCALENDAR\n"
+    path.write_bytes(text.replace("\n", "\r\n").encode())
+    # A rewrite within the same clock tick must still be seen as a change
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def read(calendar, window=WINDOW):
+    return [(e.Subject, e.Start) for e in calendar.window(*window)]
+
+def local(*fields, hours):
+    """Wall-clock time of a moment written at UTC+hours, in this machine's time zone (naive)."""
+    return datetime(*fields, tzinfo=timezone(timedelta(hours=hours))).astimezone().replace(tzinfo=None)
+
+@pytest.fixture
+def ics(tmp_path):
+    return tmp_path / "calendar.ics"
+
+
+def test_one_off_events_in_start_order(ics):
+    write(ics,
+          event("b", "20260302T100000", "20260302T110000", "Second"),
+          event("a", "20260301T090000", "20260301T093000", "First"),
+          event("c", "20270101T090000", "20270101T093000", "Next year"))
+    events = list(IcsCalendar(str(ics)).window(*WINDOW))
+    assert [(e.Subject, e.Start, e.End) for e in events] == [
+        ("First", datetime(2026, 3, 1, 9), datetime(2026, 3, 1, 9, 30)),
+        ("Second", datetime(2026, 3, 2, 10), datetime(2026, 3, 2, 11)),
+    ]
+    assert [e.EntryID for e in events] == ["a", "b"]
+
+def test_folded_lines_escapes_and_reminders(ics):
+    write(ics, "BEGIN:VEVENT\nUID:x\nDTSTART:20260301T090000\nDURATION:PT45M\n"
+               "SUMMARY:Budget\\, Q2 \n and\\; more\nBEGIN:VALARM\nACTION:DISPLAY\nSUMMARY:Reminder\n"
+               "TRIGGER:-PT15M\nEND:VALARM\nEND:VEVENT\n")
+    [meeting] = IcsCalendar(str(ics)).window(*WINDOW)
+    assert meeting.Subject == "Budget, Q2 and; more"
+    assert meeting.End - meeting.Start == timedelta(minutes=45)
+
+def test_weekly_rule_with_exdate_and_overrides(ics):
+    write(ics,
+          event("s", "20260105T090000", "20260105T093000", "Standup",
+                "RRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20260121T235959", "EXDATE:20260107T090000"),
+          event("s", "20260112T100000", "20260112T103000", "Standup (late)", "RECURRENCE-ID:20260112T090000"),
+          event("s", "20260114T090000", "20260114T093000", "Standup", "RECURRENCE-ID:20260114T090000",
+                "STATUS:CANCELLED"))
+    assert read(IcsCalendar(str(ics))) == [
+        ("Standup", datetime(2026, 1, 5, 9)),
+        ("Standup (late)", datetime(2026, 1, 12, 10)),
+        ("Standup", datetime(2026, 1, 19, 9)),
+        ("Standup", datetime(2026, 1, 21, 9)),
+    ]
+
+def test_count_and_monthly_rules(ics):
+    write(ics,
+          event("d", "20260101T080000", "20260101T081500", "Daily", "RRULE:FREQ=DAILY;INTERVAL=2;COUNT=3"),
+          event("m", "20260101T120000", "20260101T130000", "Monthly",
+                "RRULE:FREQ=MONTHLY;BYDAY=-1FR;COUNT=2"))
+    assert read(IcsCalendar(str(ics))) == [
+        ("Daily", datetime(2026, 1, 1, 8)),
+        ("Daily", datetime(2026, 1, 3, 8)),
+        ("Daily", datetime(2026, 1, 5, 8)),
+        ("Monthly", datetime(2026, 1, 30, 12)),
+        ("Monthly", datetime(2026, 2, 27, 12)),
+    ]
+
+def test_utc_and_vtimezone_times_become_local(ics):
+    write(ics, W_EUROPE,
+          event("w", "20260115T100000", "20260115T110000", "Winter").replace(
+              "DTSTART:", "DTSTART;TZID=W. Europe Standard Time:").replace(
+              "DTEND:", "DTEND;TZID=W. Europe Standard Time:"),
+          event("s", "20260701T100000", "20260701T110000", "Summer").replace(
+              "DTSTART:", 'DTSTART;TZID="W. Europe Standard Time":'),
+          event("u", "20260801T100000Z", "20260801T110000Z", "UTC"))
+    assert dict(read(IcsCalendar(str(ics)))) == {
+        "Winter": local(2026, 1, 15, 10, hours=1),
+        "Summer": local(2026, 7, 1, 10, hours=2),
+        "UTC": local(2026, 8, 1, 10, hours=0),
+    }
+
+def test_edits_are_picked_up_and_the_old_map_is_closed(ics):
+    write(ics, event("a", "20260301T090000", "20260301T093000", "One"),
+          event("b", "20260302T090000", "20260302T093000", "Two"))
+    calendar = IcsCalendar(str(ics))
+    reading = calendar.window(*WINDOW)
+    assert next(reading).Subject == "One"
+    old = calendar._state[0].mm
+
+    write(ics, event("a", "20260301T090000", "20260301T093000", "One (renamed)"),
+          event("b", "20260302T090000", "20260302T093000", "Two"))
+    assert read(calendar) == [("One (renamed)", datetime(2026, 3, 1, 9)), ("Two", datetime(2026, 3, 2, 9))]
+    assert not old.closed  # Still being read
+    assert next(reading).Subject == "Two"
+    assert list(reading) == []
+    assert old.closed
+
+def test_a_dropped_read_releases_the_old_map(ics):
+    write(ics, event("a", "20260301T090000", "20260301T093000", "One"),
+          event("b", "20260302T090000", "20260302T093000", "Two"))
+    calendar = IcsCalendar(str(ics))
+    reading = calendar.window(*WINDOW)
+    next(reading)
+    old = calendar._state[0].mm
+    write(ics, event("a", "20260301T090000", "20260301T093000", "One"))
+    calendar.refresh()
+    assert not old.closed
+    del reading
+    assert old.closed
+
+def test_a_read_of_the_previous_version_does_not_fill_the_cache(ics):
+    def in_zone(uid, day, summary):
+        return event(uid, f"202601{day}T100000", f"202601{day}T110000", summary).replace(
+            "DTSTART:", "DTSTART;TZID=W. Europe Standard Time:").replace(
+            "DTEND:", "DTEND;TZID=W. Europe Standard Time:")
+
+    blocks = [in_zone("a", 15, "One"), in_zone("b", 16, "Two")]
+    write(ics, W_EUROPE, *blocks)
+    calendar = IcsCalendar(str(ics))
+    reading = calendar.window(*WINDOW)
+    next(reading)
+    # Same events, but the zone is redefined an hour further east
+    write(ics, W_EUROPE.replace("+0100", "+0200").replace("TZOFFSETFROM:+0200", "TZOFFSETFROM:+0300"), *blocks)
+    calendar.refresh()
+    assert [e.Start for e in reading] == [local(2026, 1, 16, 10, hours=1)]
+    assert read(calendar) == [("One", local(2026, 1, 15, 10, hours=2)), ("Two", local(2026, 1, 16, 10, hours=2))]
+
+def test_reads_and_refreshes_on_several_threads(ics):
+    staged = ics.with_suffix(".tmp")
+
+    def version(n):
+        # Replaced whole, as an export does, so readers never see a half-written file
+        write(staged, *(event(f"{n}-{i}", f"202603{i % 28 + 1:02}T090000", f"202603{i % 28 + 1:02}T093000",
+                           f"Meeting {i}") for i in range(200)))
+        os.replace(staged, ics)
+
+    version(0)
+    calendar = IcsCalendar(str(ics))
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        try:
+            while not stop.is_set():
+                assert len(read(calendar)) == 200
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for n in range(1, 30):
+        version(n)
+        calendar.refresh()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+def test_modified_since_and_sources(ics):
+    write(ics, event("a", "20260301T090000", "20260301T093000", "Old", "LAST-MODIFIED:20260101T000000Z"),
+          event("b", "20260302T090000", "20260302T093000", "New", "LAST-MODIFIED:20260201T000000Z"))
+    source = IcsSource({"me@example.com": str(ics)})
+    [account] = source.accounts()
+    since = local(2026, 1, 15, hours=0)
+    assert [e.Subject for e in source.window(account, *WINDOW, modified_since=since)] == ["New"]
+    batch = source.columns(account, *WINDOW, columns=("Subject", "Start"))
+    assert batch["Subject"] == ["Old", "New"]
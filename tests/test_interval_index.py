@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from fake_outlook import FakeAppointment
+from interval_index import IntervalIndex
+
+
+def brute_overlapping(intervals, start, end=None):
+    # Zero-length intervals take no time, so they overlap nothing
+    end = start if end is None else end
+    return sorted((s, e, i) for i, (s, e) in intervals.items() if e > start and (s < end or s == start))
+
+def brute_free_slot(intervals, after, duration, until):
+    cursor = after
+    while cursor + duration <= until:
+        blocking = [e for s, e in intervals.values() if e > s and s < cursor + duration and e > cursor]
+        if not blocking:
+            return cursor
+        cursor = max(blocking)
+    return None
+
+
+@pytest.fixture
+def random_index():
+    rng = random.Random(7)
+    index, intervals = IntervalIndex(), {}
+    for _ in range(3000):
+        item_id = rng.randrange(300)
+        if rng.random() < 0.8:
+            start = rng.randrange(10000)
+            end = start + rng.choice([0, rng.randrange(1, 200)])
+            index.add(item_id, start, end, item_id)
+            intervals[item_id] = (start, end)
+        else:
+            assert index.remove(item_id) == (item_id if intervals.pop(item_id, None) else None)
+    return index, intervals, rng
+
+
+def test_queries_match_a_scan(random_index):
+    index, intervals, rng = random_index
+    assert len(index) == len(intervals) and sorted(index) == sorted(intervals)
+    for _ in range(300):
+        start = rng.randrange(-100, 10100)
+        end = start + rng.randrange(0, 500)
+        assert sorted(index.overlapping(start, end)) == brute_overlapping(intervals, start, end)
+        assert sorted(index.overlapping(start)) == brute_overlapping(intervals, start)
+        starting = [e for s, e in intervals.values() if s <= start]
+        assert index.busy_until(start) == (max(starting) if starting else None)
+        duration = rng.randrange(1, 100)
+        assert index.free_slot(start, duration, start + 2000) == brute_free_slot(intervals, start, duration,
+                                                                                 start + 2000)
+
+def test_conflicts_match_a_scan(random_index):
+    index, intervals, rng = random_index
+    for _ in range(50):
+        start = rng.randrange(10000)
+        end = start + rng.randrange(1, 1000)
+        found = {frozenset((a[2], b[2])) for a, b in index.conflicts(start, end)}
+        in_range = [(s, e, i) for s, e, i in brute_overlapping(intervals, start, end) if e > s]
+        expected = {frozenset((a[2], b[2])) for n, a in enumerate(in_range) for b in in_range[n + 1:]
+                    if a[0] < b[1] and b[0] < a[1]}
+        assert found == expected
+        assert len(index.conflicts(start, end)) == len(expected)  # Each pair once
+
+def test_moving_an_interval_and_edge_cases():
+    index = IntervalIndex()
+    index.add("a", 10, 20, "first")
+    index.add("b", 20, 30)
+    index.add("point", 25, None)
+    assert [item for _, _, item in index.overlapping(20)] == [None]  # "a" ends as "b" starts
+    assert index.overlapping(25, 25) == [(20, 30, None)]  # A zero-length meeting takes no time
+    assert index.conflicts(0, 100) == []
+    index.add("a", 10, 20, "renamed")
+    assert index.get("a") == (10, 20, "renamed")
+    index.add("a", 22, 28, "moved")
+    assert index.get("a") == (22, 28, "moved") and len(index) == 3
+    assert [(x[2], y[2]) for x, y in index.conflicts(0, 100)] == [(None, "moved")]
+    assert index.free_slot(0, 10) == 0 and index.free_slot(5, 10, until=14) is None
+    assert index.free_slot(15, 5) == 15 and index.free_slot(15, 6) == 30
+    assert index.remove("missing") is None and "a" in index
+
+
+def test_schedule_routes(backend, backend_app):
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(hours=1)
+    folder = backend.source.namespace.calendar("a@example.com")
+    folder.add(FakeAppointment("Standup", start, start + timedelta(minutes=30)))
+    folder.add(FakeAppointment("Review", start + timedelta(minutes=15), start + timedelta(hours=1)))
+    backend.snapshot.refresh()
+    client = backend_app.app.test_client()
+
+    at = (start + timedelta(minutes=20)).isoformat()
+    assert [m["subject"] for m in client.get(f"/meetings/overlapping?at={at}").json["meetings"]] == [
+        "Standup", "Review"]
+    [conflict] = client.get(f"/meetings/conflicts?start={start.isoformat()}").json["conflicts"]
+    assert [m["subject"] for m in conflict["meetings"]] == ["Standup", "Review"]
+    assert conflict["cross_account"] is False
+    assert client.get(f"/meetings/conflicts?start={start.isoformat()}&cross_account=1").json["conflicts"] == []
+    slot = client.get(f"/meetings/free_slot?minutes=30&after={start.isoformat()}").json
+    assert slot["start"] == client.get(f"/meetings/overlapping?at={at}").json["meetings"][1]["end"]
+    assert client.get("/meetings/overlapping?at=tomorrow").status_code == 400
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from calendar_provider import AccountGuard
+from fake_outlook import FakeAppointment, FakeNamespace
+from meeting_identity import meeting_id, meeting_id_from, MeetingIndex, dedupe
+
+START = datetime(2026, 3, 2, 10)
+END = START + timedelta(hours=1)
+
+
+class NoGlobalId(FakeAppointment):
+    @property
+    def GlobalAppointmentID(self):
+        raise AttributeError("COM error: property not available")
+
+    @GlobalAppointmentID.setter
+    def GlobalAppointmentID(self, value):
+        pass
+
+
+def test_id_survives_edits_and_is_shared_by_every_copy_of_an_invite():
+    item = FakeAppointment("Planning", START, END)
+    before = meeting_id(item)
+    item.Subject, item.Start, item.End = "Planning (moved)", START + timedelta(days=1), END + timedelta(days=1)
+    assert meeting_id(item) == before
+    copy = FakeAppointment("Planning", START, END, global_id=item.GlobalAppointmentID)
+    assert meeting_id(copy) == before
+    assert meeting_id(FakeAppointment("Planning", START, END)) != before
+
+def test_occurrences_of_a_series_are_told_apart_by_start():
+    first = FakeAppointment("Standup", START, END, global_id="series")
+    second = FakeAppointment("Standup", START + timedelta(days=1), END + timedelta(days=1), global_id="series")
+    first.IsRecurring = second.IsRecurring = True
+    assert meeting_id(first) != meeting_id(second)
+    assert meeting_id(first) == meeting_id_from("series", True, None, START.replace(tzinfo=timezone.utc), None)
+
+def test_items_without_a_global_id_fall_back_to_what_they_look_like():
+    item = NoGlobalId("Weekly  sync", START, END)
+    assert meeting_id(item) == meeting_id(NoGlobalId("weekly sync", START, END))
+    assert meeting_id(item) == meeting_id_from("", False, "Weekly sync", START.astimezone(), END)
+    assert meeting_id(item) != meeting_id(NoGlobalId("Weekly sync", START, END + timedelta(minutes=30)))
+
+def test_index_merges_copies_into_the_first():
+    meetings = [{"id": "x", "account": "a@example.com", "subject": "first"},
+                {"id": "y", "account": "a@example.com"},
+                {"id": "x", "account": "b@example.com", "subject": "second"},
+                {"id": "x", "account": "b@example.com"}]
+    index = MeetingIndex()
+    assert [index.add(dict(m)) for m in meetings] == [True, True, False, False]
+    assert len(index) == 2 and "x" in index
+    assert index.get("x")["subject"] == "first"
+    assert index.get("x")["accounts"] == ["a@example.com", "b@example.com"]
+    assert [m["id"] for m in dedupe([dict(m) for m in meetings])] == ["x", "y"]
+
+def test_an_invite_in_two_accounts_is_fetched_as_one_meeting():
+    from alarm.meeting_ahead import meetings_ahead
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(hours=2)
+    shared = [FakeAppointment("All hands", start, start + timedelta(hours=1), global_id="all-hands")
+              for _ in range(2)]
+    namespace = FakeNamespace({"a@example.com": [shared[0]], "b@example.com": [shared[1]],
+                               "c@example.com": [FakeAppointment("1:1", start, start + timedelta(minutes=30))]})
+    meetings = meetings_ahead(namespace, 1, guard=AccountGuard())
+    assert sorted((m["subject"], tuple(sorted(m["accounts"]))) for m in meetings) == [
+        ("1:1", ("c@example.com",)), ("All hands", ("a@example.com", "b@example.com"))]
@@ -0,0 +1,96 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from calendar_provider import AccountGuard
+from fake_outlook import FakeAppointment, FakeNamespace
+from meeting_store import MeetingStore
+from outlook_fetcher import get_meeting_changes
+
+ACCOUNT = "a@example.com"
+
+
+def meeting(store, subject, minutes, **fields):
+    start = datetime.now(store.tz).replace(microsecond=0) + timedelta(minutes=minutes)
+    return dict({"subject": subject, "start_time": start, "account": ACCOUNT, "entry_id": subject}, **fields)
+
+def write_legacy(path, starts):
+    path.write_text(json.dumps([{"id": i, "subject": f"Meeting {i}", "start_time": start.isoformat(),
+                                 "alert_job_id": None} for i, start in enumerate(starts)]))
+
+
+def test_queries_use_start_order_and_alerts(store):
+    late = store.add(meeting(store, "Late", 120, alert_time=None))
+    soon = store.add(meeting(store, "Soon", 30))
+    store.update(soon, alert_time=datetime.now(store.tz) - timedelta(seconds=1))
+    now = datetime.now(store.tz)
+    assert [m["subject"] for m in store.in_window(now, now + timedelta(hours=3))] == ["Soon", "Late"]
+    assert [m["subject"] for m in store.in_window(now, now + timedelta(hours=1))] == ["Soon"]
+    assert [m["id"] for m in store.due_alerts(now)] == [soon]
+    assert store.get(late)["alert_time"] is None
+    assert store.get(soon)["start_time"].tzinfo is not None
+
+def test_pages_seek_past_the_previous_one(store):
+    for i in range(5):
+        store.add(meeting(store, f"M{i}", 10 * (i + 1)))
+    now = datetime.now(store.tz).timestamp()
+    first = store.page(now, now + 3600, limit=2)
+    second = store.page(now, now + 3600, after=(first[-1]["start_ts"], first[-1]["id"]), limit=2)
+    last = store.page(now, now + 3600, after=(second[-1]["start_ts"], second[-1]["id"]), limit=2)
+    assert [m["subject"] for m in first + second + last] == ["M0", "M1", "M2", "M3", "M4"]
+
+def test_a_transaction_commits_all_or_nothing(store):
+    try:
+        with store.transaction():
+            store.add(meeting(store, "Kept?", 10))
+            raise ValueError
+    except ValueError:
+        pass
+    assert store.count() == 0
+    with store.transaction():
+        store.add(meeting(store, "A", 10))
+        store.add(meeting(store, "B", 20))
+    assert store.count() == 2
+
+def test_sync_state_round_trips(store):
+    store.set_sync_state(ACCOUNT, {"watermark": "2026-01-01T00:00:00+00:00"})
+    assert store.get_sync_state() == {ACCOUNT: {"watermark": "2026-01-01T00:00:00+00:00"}}
+
+def test_older_databases_are_upgraded(tmp_path, dev_app):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE meetings (id INTEGER PRIMARY KEY AUTOINCREMENT, subject TEXT NOT NULL, "
+                 "start_ts REAL NOT NULL, account TEXT NOT NULL DEFAULT 'Unknown', entry_id TEXT)")
+    conn.execute("INSERT INTO meetings (subject, start_ts) VALUES ('Old', 2000000000)")
+    conn.commit()
+    conn.close()
+    store = MeetingStore(path, dev_app.local_tz)
+    [old] = store._select()
+    assert (old["subject"], old["uid"], old["alert_time"]) == ("Old", None, None)
+
+
+def test_import_is_skipped_once_the_store_has_meetings(store, tmp_path):
+    legacy = tmp_path / "meetings.json"
+    write_legacy(legacy, [datetime.now().astimezone() + timedelta(days=1)])
+    store.import_json(str(legacy))
+    store.import_json(str(legacy))
+    assert store.count() == 1
+
+def test_imported_meetings_hold_no_alert_and_are_replaced_by_the_sync(dev_app, store, tmp_path):
+    now = datetime.now().replace(second=0, microsecond=0)
+    items = [FakeAppointment(f"Meeting {i}", now + timedelta(days=1, hours=i), now + timedelta(days=1, hours=i + 1))
+             for i in range(3)]
+    legacy = tmp_path / "meetings.json"
+    write_legacy(legacy, [item.Start.astimezone() for item in items])
+    store.import_json(str(legacy))
+    store.reconcile_alerts(dev_app.ALERT_BEFORE, datetime.now(store.tz))
+    assert store.count() == 3 and store.next_alert() is None  # Shown, but the sync brings their alerts
+
+    changes = get_meeting_changes({}, days=8, namespace=FakeNamespace({ACCOUNT: items}),
+                                  guard=AccountGuard(remember=False))
+    assert dev_app.reconcile(store, changes)
+    store.reconcile_alerts(dev_app.ALERT_BEFORE, datetime.now(store.tz))
+    meetings = store._select()
+    assert {m["account"] for m in meetings} == {ACCOUNT}
+    assert sorted(m["subject"] for m in meetings) == ["Meeting 0", "Meeting 1", "Meeting 2"]
+    assert all(m["alert_time"] == m["start_time"] - dev_app.ALERT_BEFORE for m in meetings)
+    assert store.drop_legacy() == 0
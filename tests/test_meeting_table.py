@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import pytest
+from meeting_table import MeetingTable, MeetingRow, NO_TIME, local_epochs, epoch
+
+BERLIN = ZoneInfo("Europe/Berlin")
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def every_quarter_hour(start, days):
+    return [start + timedelta(minutes=15 * i) for i in range(days * 96)]
+
+@pytest.mark.parametrize("tz", [BERLIN, NEW_YORK, timezone.utc])
+@pytest.mark.parametrize("start", [datetime(2026, 3, 7), datetime(2026, 10, 24)])
+def test_local_epochs_match_datetime_across_dst_changes(tz, start):
+    times = every_quarter_hour(start, 10)
+    assert list(local_epochs(times, tz)) == [int(dt.replace(tzinfo=tz).timestamp()) for dt in times]
+
+def test_local_epochs_read_wall_clock_times():
+    wall = datetime(2026, 7, 1, 9, 30)
+    labelled = wall.replace(tzinfo=timezone.utc)  # What pywin32 hands out, whatever the real zone
+    assert list(local_epochs([wall, labelled, None], BERLIN)) == [epoch(wall.replace(tzinfo=BERLIN))] * 2 + [NO_TIME]
+    assert list(local_epochs([wall])) == [int(wall.timestamp())]  # The system zone
+
+
+def table(tz=BERLIN):
+    def at(hour):
+        return epoch(datetime(2026, 5, 4, hour, tzinfo=tz))
+    return MeetingTable.from_columns(
+        subject=["Review", "Standup", "Lunch"], start=[at(14), at(9), at(12)], end=[at(15), at(9) + 900, at(13)],
+        account=["b@example.com", "a@example.com", "a@example.com"], entry_id=["r", "s", "l"],
+        uid=["review", "standup", None], alert=[at(14) - 300, at(9) - 300, NO_TIME], id=[3, 1, 2], tz=tz)
+
+def test_rows_are_kept_in_start_order_and_read_like_meeting_dicts():
+    meetings = table()
+    assert [row.subject for row in meetings] == ["Standup", "Lunch", "Review"]
+    assert meetings.accounts == ["a@example.com", "b@example.com"]  # One code per account
+    standup, lunch, review = meetings
+    assert standup["start_time"] == datetime(2026, 5, 4, 9, tzinfo=BERLIN)
+    assert standup["start_time"].utcoffset() == timedelta(hours=2)
+    assert (lunch.alert_ts, lunch.alert_time, lunch.get("nothing", "default")) == (None, None, "default")
+    assert review.as_dict() == {
+        "id": 3, "subject": "Review", "start_time": datetime(2026, 5, 4, 14, tzinfo=BERLIN),
+        "end_time": datetime(2026, 5, 4, 15, tzinfo=BERLIN), "account": "b@example.com", "entry_id": "r",
+        "uid": "review", "alert_time": datetime(2026, 5, 4, 13, 55, tzinfo=BERLIN)}
+    assert meetings[-1].subject == "Review"
+    with pytest.raises(IndexError):
+        meetings[3]
+    with pytest.raises(KeyError):
+        standup["nothing"]
+
+def test_window_includes_both_ends():
+    meetings = table()
+    noon = datetime(2026, 5, 4, 12, tzinfo=BERLIN)
+    assert [row.subject for row in meetings.window(noon, noon + timedelta(hours=2))] == ["Lunch", "Review"]
+    assert [row.subject for row in meetings.window(epoch(noon) + 1, epoch(noon) + 3600)] == []
+    assert meetings.window(noon, noon)[0].account == "a@example.com"
+
+def test_take_and_concat():
+    meetings = table()
+    taken = meetings.take([0, 2], account=["c@example.com", "a@example.com"])
+    assert [(row.subject, row.account) for row in taken] == [("Standup", "c@example.com"), ("Review", "a@example.com")]
+    assert [row.account for row in meetings.take([1])] == ["a@example.com"]
+    later = MeetingTable.from_columns(["Early"], [epoch(datetime(2026, 5, 4, 8, tzinfo=BERLIN))],
+                                      [epoch(datetime(2026, 5, 4, 9, tzinfo=BERLIN))], "d@example.com")
+    both = MeetingTable.concat([meetings, later], tz=BERLIN)
+    assert [(row.subject, row.account) for row in both][:2] == [("Early", "d@example.com"), ("Standup", "a@example.com")]
+    assert len(both) == 4 and isinstance(both[0], MeetingRow)
+
+def test_the_store_window_table_matches_in_window(store):
+    now = datetime.now(store.tz).replace(microsecond=0)
+    for i, subject in enumerate(["B", "A", "C"]):
+        store.add({"subject": subject, "start_time": now + timedelta(hours=3 - i), "account": "a@example.com",
+                   "entry_id": subject, "alert_time": None})
+    end = now + timedelta(hours=4)
+    rows = [row.as_dict() for row in store.window_table(now, end)]
+    assert [row.pop("end_time") for row in rows] == [row["start_time"] for row in rows]  # No end times are stored
+    assert rows == store.in_window(now, end)
@@ -0,0 +1,91 @@
+import threading
+from notifications import (Channel, Notification, NotificationDispatcher, WebhookSink, WebhookStub,
+                           MAX_LINES)
+
+
+class Recorder:
+    """A sink that records what it is sent, optionally holding each send until released."""
+
+    def __init__(self, hold=False):
+        self.sent = []
+        self.gate = threading.Event()
+        if not hold:
+            self.gate.set()
+        self._arrived = threading.Condition()
+
+    def send(self, notification):
+        self.gate.wait()
+        with self._arrived:
+            self.sent.append(notification)
+            self._arrived.notify_all()
+
+    def wait(self, count, timeout=5):
+        with self._arrived:
+            assert self._arrived.wait_for(lambda: len(self.sent) >= count, timeout), "not delivered in time"
+            return [notification.alerts for notification in self.sent]
+
+
+def test_a_grouped_notification_lists_its_alerts():
+    alerts = [(f"Meeting {i}", f"starts at {i}") for i in range(MAX_LINES + 2)]
+    assert (Notification(alerts[:1]).title, Notification(alerts[:1]).message) == alerts[0]
+    grouped = Notification(alerts)
+    assert grouped.title == f"Meeting 0 ({MAX_LINES + 2})"
+    assert grouped.message.splitlines() == [message for _, message in alerts[:MAX_LINES]] + ["... and 2 more"]
+
+def test_alerts_raised_together_go_out_as_one_notification():
+    sink = Recorder()
+    dispatcher = NotificationDispatcher([Channel("toast", sink)], window=0.2)
+    for i in range(3):
+        assert dispatcher.notify(f"Meeting {i}", "in 5 minutes")
+    assert sink.wait(1) == [[(f"Meeting {i}", "in 5 minutes") for i in range(3)]]
+    dispatcher.notify("Later", "in 5 minutes")
+    dispatcher.flush()
+    assert sink.wait(2)[1] == [("Later", "in 5 minutes")]
+    dispatcher.stop()
+
+def test_a_rate_limited_channel_merges_what_arrives_meanwhile():
+    limited, free = Recorder(), Recorder()
+    dispatcher = NotificationDispatcher([Channel("toast", limited, min_interval=0.5), Channel("console", free)],
+                                        window=0.0)
+    for title in ("A", "B", "C"):
+        dispatcher.notify(title, "")
+        free.wait(len(free.sent) + 1)
+    assert limited.wait(2) == [[("A", "")], [("B", ""), ("C", "")]]
+    assert len(free.sent) == 3
+    dispatcher.stop()
+
+def test_a_slow_channel_does_not_hold_up_the_others():
+    slow, fast = Recorder(hold=True), Recorder()
+    dispatcher = NotificationDispatcher([Channel("toast", slow), Channel("webhook", fast)], window=0.1)
+    dispatcher.notify("A", "")
+    fast.wait(1)
+    dispatcher.notify("B", "")
+    dispatcher.notify("C", "")
+    assert fast.wait(2) == [[("A", "")], [("B", ""), ("C", "")]]
+    assert slow.sent == []
+    slow.gate.set()
+    assert slow.wait(2) == [[("A", "")], [("B", ""), ("C", "")]]
+    dispatcher.stop()
+
+def test_pending_alerts_are_bounded_and_a_failing_sink_is_skipped():
+    class Failing:
+        def send(self, notification):
+            raise OSError("no notification area")
+
+    sink = Recorder()
+    dispatcher = NotificationDispatcher([Channel("broken", Failing()), Channel("console", sink)],
+                                        window=60, max_pending=2)
+    assert [dispatcher.notify(str(i), "") for i in range(3)] == [True, True, False]
+    assert dispatcher.dropped == 1
+    dispatcher.stop()  # Delivers what is pending first
+    assert sink.wait(1) == [[("0", ""), ("1", "")]]
+    assert dispatcher.idle()
+
+def test_webhook_sink_posts_json():
+    with WebhookStub() as stub:
+        dispatcher = NotificationDispatcher([Channel("hook", WebhookSink(stub.url))], window=0.0)
+        dispatcher.notify("Standup", "in 5 minutes")
+        [body] = stub.wait(1)
+        dispatcher.stop()
+    assert body == {"title": "Standup", "message": "in 5 minutes",
+                    "alerts": [{"title": "Standup", "message": "in 5 minutes"}]}
@@ -0,0 +1,77 @@
+import json
+import threading
+from datetime import datetime, timedelta
+import pytest
+from fake_outlook import FakeAppointment
+
+
+def book(backend, subject, hours):
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(hours=hours)
+    backend.source.namespace.calendar("a@example.com").add(FakeAppointment(subject, start, start + timedelta(hours=1)))
+
+
+@pytest.fixture
+def stream(backend, backend_app):
+    book(backend, "Standup", 1)
+    book(backend, "Review", 2)
+    backend.snapshot.refresh()
+    responses = []
+
+    def open_stream(headers=None):
+        response = backend_app.app.test_client().get("/stream/next_meeting", headers=headers, buffered=False)
+        responses.append(response)
+        return response, iter(response.response)
+
+    yield open_stream
+    for response in responses:
+        response.close()
+
+def parse(chunk):
+    fields = dict(line.split(": ", 1) for line in chunk.decode().splitlines() if line)
+    return fields["id"], fields["event"], json.loads(fields["data"])["meeting"]
+
+
+def test_a_stream_sends_the_next_meeting_and_then_each_change(stream, backend):
+    response, events = stream()
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    first_id, name, meeting = parse(next(events))
+    assert (name, meeting["subject"]) == ("next_meeting", "Standup")
+
+    backend.snooze_meeting(meeting["id"], 1)
+    snoozed_id, _, snoozed = parse(next(events))
+    assert (snoozed["subject"], snoozed["snoozed"]) == ("Standup", 1) and snoozed_id != first_id
+    backend.cancel_meeting(meeting["id"])
+    assert parse(next(events))[2]["subject"] == "Review"
+
+def test_changes_the_client_cannot_see_are_not_sent(stream, backend, backend_app, monkeypatch):
+    monkeypatch.setattr(backend_app, "KEEPALIVE", 0.1)
+    _, events = stream()
+    parse(next(events))
+    backend.snapshot.touch()  # e.g. a sync that only changed a later meeting
+    assert next(events) == b": keep-alive\n\n"
+
+def test_a_reconnecting_client_is_not_sent_what_it_has(stream, backend, backend_app, monkeypatch):
+    monkeypatch.setattr(backend_app, "KEEPALIVE", 0.1)
+    _, events = stream()
+    last_id, _, _ = parse(next(events))
+    _, resumed = stream({"Last-Event-ID": last_id})
+    assert next(resumed) == b": keep-alive\n\n"
+    _, stale = stream({"Last-Event-ID": "0123456789ab-0"})
+    assert parse(next(stale))[2]["subject"] == "Standup"
+
+def test_every_open_stream_gets_a_change(stream, backend):
+    streams = [stream()[1] for _ in range(5)]
+    meeting = [parse(next(events))[2] for events in streams][0]
+    received = []
+
+    def read(events):
+        received.append(parse(next(events))[2]["subject"])
+
+    threads = [threading.Thread(target=read, args=(events,)) for events in streams]
+    for thread in threads:
+        thread.start()
+    backend.cancel_meeting(meeting["id"])
+    for thread in threads:
+        thread.join(timeout=5)
+    assert received == ["Review"] * 5
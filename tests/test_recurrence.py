@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta
+from calendar_provider import iter_window
+from fake_outlook import FakeAppointment, FakeException, FakeFolder, FakeRecurrencePattern
+from recurrence import (Series, SeriesCache, OL_RECURS_DAILY, OL_RECURS_WEEKLY, OL_RECURS_MONTHLY,
+                        OL_RECURS_MONTH_NTH)
+
+# Outlook's DayOfWeekMask bits
+SUNDAY, MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY = (1 << n for n in range(7))
+
+def master(subject, start, minutes=30, **pattern):
+    recurrence_type = pattern.pop("recurrence_type")
+    return FakeAppointment(subject, start, start + timedelta(minutes=minutes),
+                           pattern=FakeRecurrencePattern(recurrence_type, **pattern))
+
+def dates(item, first, last):
+    series = Series.from_item(item)
+    return [start.date() for start, _, _ in series.occurrences(first, last)]
+
+
+def test_weekly_on_several_days_with_exceptions():
+    moved = FakeAppointment("Standup (moved)", datetime(2026, 1, 10, 11), datetime(2026, 1, 10, 11, 30))
+    item = master("Standup", datetime(2026, 1, 5, 9), recurrence_type=OL_RECURS_WEEKLY,
+                  day_of_week_mask=MONDAY | WEDNESDAY | FRIDAY, exceptions=[
+                      FakeException(datetime(2026, 1, 7, 9)),           # Deleted
+                      FakeException(datetime(2026, 1, 9, 9), moved),    # Moved to Saturday
+                  ])
+    occurrences = list(Series.from_item(item).occurrences(datetime(2026, 1, 5), datetime(2026, 1, 12, 23, 59)))
+    assert occurrences == [
+        (datetime(2026, 1, 5, 9), datetime(2026, 1, 5, 9, 30), "Standup"),
+        (datetime(2026, 1, 10, 11), datetime(2026, 1, 10, 11, 30), "Standup (moved)"),
+        (datetime(2026, 1, 12, 9), datetime(2026, 1, 12, 9, 30), "Standup"),
+    ]
+
+def test_every_other_week():
+    item = master("1:1", datetime(2026, 1, 6, 14), recurrence_type=OL_RECURS_WEEKLY, interval=2,
+                  day_of_week_mask=TUESDAY)
+    assert dates(item, datetime(2026, 1, 1), datetime(2026, 2, 28)) == [
+        date(2026, 1, 6), date(2026, 1, 20), date(2026, 2, 3), date(2026, 2, 17)]
+    # A window starting between two occurrences lands on the series' weeks
+    assert dates(item, datetime(2026, 1, 12), datetime(2026, 1, 31)) == [date(2026, 1, 20)]
+
+def test_monthly_on_the_nth_weekday():
+    second_tuesday = master("Review", datetime(2026, 1, 13, 10), recurrence_type=OL_RECURS_MONTH_NTH,
+                            day_of_week_mask=TUESDAY, instance=2)
+    assert dates(second_tuesday, datetime(2026, 1, 1), datetime(2026, 3, 31)) == [
+        date(2026, 1, 13), date(2026, 2, 10), date(2026, 3, 10)]
+    last_friday = master("Retro", datetime(2026, 1, 30, 16), recurrence_type=OL_RECURS_MONTH_NTH,
+                         day_of_week_mask=FRIDAY, instance=5)
+    assert dates(last_friday, datetime(2026, 1, 1), datetime(2026, 3, 31)) == [
+        date(2026, 1, 30), date(2026, 2, 27), date(2026, 3, 27)]
+
+def test_monthly_on_a_day_the_month_lacks():
+    item = master("Invoices", datetime(2026, 1, 31, 9), recurrence_type=OL_RECURS_MONTHLY, day_of_month=31)
+    assert dates(item, datetime(2026, 1, 1), datetime(2026, 4, 30, 23, 59)) == [
+        date(2026, 1, 31), date(2026, 2, 28), date(2026, 3, 31), date(2026, 4, 30)]
+
+def test_daily_with_an_end_date():
+    item = master("Sprint", datetime(2026, 1, 1, 8), recurrence_type=OL_RECURS_DAILY, interval=3,
+                  pattern_end=datetime(2026, 1, 11))
+    assert dates(item, datetime(2026, 1, 1), datetime(2026, 2, 1)) == [
+        date(2026, 1, 1), date(2026, 1, 4), date(2026, 1, 7), date(2026, 1, 10)]
+    assert Series.from_item(item).nth_date(3) == date(2026, 1, 7)
+    assert Series.from_item(item).nth_date(5) is None
+
+def test_the_window_bounds_are_inclusive():
+    item = master("Sync", datetime(2026, 1, 1, 8), recurrence_type=OL_RECURS_DAILY)
+    assert dates(item, datetime(2026, 1, 2, 8), datetime(2026, 1, 4, 8)) == [
+        date(2026, 1, 2), date(2026, 1, 3), date(2026, 1, 4)]
+
+def test_cache_rereads_a_series_only_when_it_changes():
+    cache = SeriesCache()
+    item = master("Standup", datetime(2026, 1, 5, 9), recurrence_type=OL_RECURS_DAILY)
+    first = cache.series(item)
+    assert cache.series(item) is first
+    assert cache.is_current(item.EntryID, item.LastModificationTime)
+
+    item.Subject = "Daily standup"
+    item.LastModificationTime += timedelta(minutes=1)
+    assert not cache.is_current(item.EntryID, item.LastModificationTime)
+    assert cache.series(item).subject == "Daily standup"
+    assert len(cache) == 1
+
+def test_cached_occurrences_follow_the_window():
+    cache = SeriesCache()
+    item = master("Standup", datetime(2026, 1, 5, 9), recurrence_type=OL_RECURS_DAILY)
+    week = [o.Start for o in cache.occurrences(item, datetime(2026, 1, 5), datetime(2026, 1, 11, 23))]
+    assert week == [datetime(2026, 1, d, 9) for d in range(5, 12)]
+    # Past the cached horizon: expanded again rather than cut short
+    later = [o.Start for o in cache.occurrences(item, datetime(2026, 2, 1), datetime(2026, 2, 3, 23))]
+    assert later == [datetime(2026, 2, d, 9) for d in range(1, 4)]
+    assert all(o.EntryID == item.EntryID for o in cache.occurrences(item, datetime(2026, 2, 1), datetime(2026, 2, 3)))
+
+def test_iter_window_merges_series_with_one_off_items():
+    lunch = FakeAppointment("Lunch", datetime(2026, 1, 6, 12), datetime(2026, 1, 6, 13))
+    outside = FakeAppointment("Offsite", datetime(2026, 2, 6, 12), datetime(2026, 2, 6, 13))
+    standup = master("Standup", datetime(2026, 1, 5, 9), recurrence_type=OL_RECURS_DAILY)
+    folder = FakeFolder("Calendar", items=[lunch, outside, standup])
+    meetings = [(m.Subject, m.Start) for m in iter_window(folder, datetime(2026, 1, 5), datetime(2026, 1, 7, 23),
+                                                          cache=SeriesCache())]
+    assert meetings == [
+        ("Standup", datetime(2026, 1, 5, 9)),
+        ("Standup", datetime(2026, 1, 6, 9)),
+        ("Lunch", datetime(2026, 1, 6, 12)),
+        ("Standup", datetime(2026, 1, 7, 9)),
+    ]
+
+def test_iter_window_skips_series_not_modified_since():
+    old = master("Old", datetime(2026, 1, 5, 9), recurrence_type=OL_RECURS_DAILY)
+    old.LastModificationTime = datetime(2025, 12, 1)
+    new = master("New", datetime(2026, 1, 5, 10), recurrence_type=OL_RECURS_DAILY)
+    new.LastModificationTime = datetime(2026, 1, 2)
+    folder = FakeFolder("Calendar", items=[old, new])
+    subjects = {m.Subject for m in iter_window(folder, datetime(2026, 1, 5), datetime(2026, 1, 6),
+                                               modified_since=datetime(2026, 1, 1), cache=SeriesCache())}
+    assert subjects == {"New"}
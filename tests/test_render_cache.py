@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import pytest
+from render_cache import RenderCache
+
+ACCOUNT = "a@example.com"
+
+
+def test_a_page_is_reused_until_the_version_or_its_deadline_moves():
+    cache = RenderCache()
+    page = cache.put("index", b"<html>", version=1, valid_until=100, now=10)
+    assert cache.get("index", 1, 50) is page
+    assert cache.get("index", 2, 50) is None
+    assert cache.get("index", 1, 100) is None
+    assert cache.get("other", 1, 50) is None
+
+def test_an_identical_render_keeps_its_etag_and_last_modified():
+    cache = RenderCache()
+    first = cache.put("index", b"same", 1, None, now=10)
+    again = cache.put("index", b"same", 2, None, now=20)
+    assert (again.etag, again.rendered_at) == (first.etag, 10)
+    changed = cache.put("index", b"different", 3, None, now=30)
+    assert changed.etag != first.etag and changed.rendered_at == 30
+
+def test_the_least_recently_used_page_is_dropped():
+    cache = RenderCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, key.encode(), 1, None, 0)
+    cache.get("a", 1, 0)
+    cache.put("c", b"c", 1, None, 0)
+    assert [key for key in "abc" if cache.get(key, 1, 0)] == ["a", "c"]
+
+
+@pytest.fixture
+def api(dev_app):
+    dev_app.writer.apply(lambda store: store._execute("DELETE FROM meetings"))
+    dev_app.pages.clear()
+    client = dev_app.app.test_client()
+
+    def get(**params):
+        return client.get("/api/meetings", query_string=params)
+    return get
+
+def book(dev_app, subject, minutes, account=ACCOUNT):
+    start = datetime.now(dev_app.local_tz).replace(microsecond=0) + timedelta(minutes=minutes)
+    meeting = {"subject": subject, "start_time": start, "account": account, "entry_id": subject, "alert_time": None}
+    return dev_app.writer.apply(lambda store: store.add(meeting))
+
+def walk(get, **params):
+    subjects, cursor = [], None
+    while True:
+        body = get(**params, **({"cursor": cursor} if cursor else {})).json
+        subjects += [m["subject"] for m in body["meetings"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return subjects
+
+
+def test_pages_follow_their_cursor(dev_app, api):
+    for i in range(5):
+        book(dev_app, f"M{i}", 10 * (i + 1), account="b@example.com" if i % 2 else ACCOUNT)
+    assert walk(api, limit=2) == ["M0", "M1", "M2", "M3", "M4"]
+    assert walk(api, limit=2, account="b@example.com") == ["M1", "M3"]
+
+    first = api(limit=2).json
+    book(dev_app, "Earlier", 1)  # Lands before the cursor: the next page is unaffected
+    second = api(limit=2, cursor=first["next_cursor"]).json
+    assert [m["subject"] for m in second["meetings"]] == ["M2", "M3"]
+    assert api(cursor="not a cursor").status_code == 400
+
+def test_answers_are_cached_until_the_store_changes(dev_app, api):
+    meeting_id = book(dev_app, "Standup", 30)
+    first = api()
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+    [page] = [page for key, page in dev_app.pages._entries.items() if key[0] == "api"]
+    assert page.valid_until == dev_app.store.get(meeting_id)["start_time"].timestamp()  # When it drops out
+    assert api().headers["ETag"] == etag
+    assert dev_app.app.test_client().get("/api/meetings", headers={"If-None-Match": etag}).status_code == 304
+
+    dev_app.writer.apply(dev_app.snooze_alert, meeting_id, 10)
+    changed = api()
+    assert changed.headers["ETag"] != etag
+    assert changed.json["meetings"][0]["alert_time"] is not None
+
+def test_a_fixed_window_ignores_the_clock(dev_app, api):
+    book(dev_app, "Standup", 30)
+    start = datetime.now(dev_app.local_tz).replace(microsecond=0)
+    params = {"from": start.isoformat(), "to": (start + timedelta(hours=1)).isoformat()}
+    assert [m["subject"] for m in api(**params).json["meetings"]] == ["Standup"]
+    [page] = dev_app.pages._entries.values()
+    assert page.valid_until is None
@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pytest
+from alarm.snapshot import ScheduleSnapshot
+from fake_outlook import FakeAppointment
+
+ACCOUNT = "a@example.com"
+
+
+def book(backend, subject, hours):
+    start = datetime.now().replace(second=0, microsecond=0) + timedelta(hours=hours)
+    backend.source.namespace.calendar(ACCOUNT).add(FakeAppointment(subject, start, start + timedelta(hours=1)))
+
+@pytest.fixture
+def client(backend, backend_app):
+    book(backend, "Standup", 1)
+    book(backend, "Review", 2)
+    backend.snapshot.refresh()
+    return backend_app.app.test_client()
+
+
+def test_concurrent_refreshes_share_one_fetch():
+    calls = []
+    gate = threading.Event()
+
+    def refresh_fn():
+        calls.append(1)
+        gate.wait()
+        return True
+
+    snapshot = ScheduleSnapshot(refresh_fn)
+    threads = [threading.Thread(target=snapshot.refresh) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and snapshot.version == 1 and snapshot.loaded
+
+def test_version_changes_only_with_the_schedule():
+    changed = iter([True, False])
+    snapshot = ScheduleSnapshot(lambda: next(changed))
+    snapshot.refresh()
+    modified = snapshot.last_modified
+    snapshot.refresh()
+    assert (snapshot.version, snapshot.last_modified) == (1, modified)
+
+def test_a_failed_refresh_keeps_serving_the_old_schedule():
+    def refresh_fn():
+        raise OSError("Outlook is not running")
+
+    snapshot = ScheduleSnapshot(refresh_fn)
+    snapshot.refresh()
+    assert not snapshot.loaded and snapshot.version == 0
+
+def test_etags_differ_across_restarts():
+    first, second = ScheduleSnapshot(lambda: True), ScheduleSnapshot(lambda: True)
+    assert first.etag(0) != second.etag(0)
+    assert first.etag(0) == first.etag(0) != first.etag(1)
+
+def test_wait_for_change_wakes_on_touch():
+    snapshot = ScheduleSnapshot(lambda: True)
+    assert snapshot.wait_for_change(0, timeout=0.05) == 0
+    threading.Timer(0.05, snapshot.touch).start()
+    assert snapshot.wait_for_change(0, timeout=5) == 1
+
+
+def test_conditional_get_answers_304_until_the_schedule_changes(client, backend):
+    response = client.get("/get_next_meeting")
+    assert response.status_code == 200 and response.json["meeting"]["subject"] == "Standup"
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert client.get("/get_next_meeting", headers={"If-None-Match": etag}).status_code == 304
+    modified = client.get("/get_next_meeting", headers={"If-Modified-Since": response.headers["Last-Modified"]})
+    assert modified.status_code == 304
+
+    backend.snapshot.refresh()  # Nothing changed in the calendar
+    assert client.get("/get_next_meeting", headers={"If-None-Match": etag}).status_code == 304
+
+    client.post(f"/snooze_meeting/{response.json['meeting']['id']}?minutes=90")
+    changed = client.get("/get_next_meeting", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.json["meeting"]["subject"] == "Review"
+    assert changed.headers["ETag"] != etag
+
+def test_an_etag_from_another_run_never_matches(client, backend):
+    stale = f'"0123456789ab-{backend.snapshot.version}"'
+    assert client.get("/get_next_meeting", headers={"If-None-Match": stale}).status_code == 200
+
+def test_long_poll_returns_when_the_schedule_changes(client, backend):
+    first = client.get("/get_next_meeting")
+    etag = first.headers["ETag"]
+    t0 = time.monotonic()
+    assert client.get("/get_next_meeting?wait=0.2", headers={"If-None-Match": etag}).status_code == 304
+    assert time.monotonic() - t0 >= 0.2
+
+    threading.Timer(0.1, backend.cancel_meeting, [first.json["meeting"]["id"]]).start()
+    t0 = time.monotonic()
+    response = client.get("/get_next_meeting?wait=30", headers={"If-None-Match": etag})
+    assert time.monotonic() - t0 < 5
+    assert response.status_code == 200 and response.json["meeting"]["subject"] == "Review"
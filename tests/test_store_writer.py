@@ -0,0 +1,111 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pytest
+from store_writer import StoreWriter
+
+
+@pytest.fixture
+def writer(store):
+    writer = StoreWriter(store)
+    yield writer
+    writer.stop()
+
+class FailingCommit:
+    """A store connection whose next `failures` commits fail, as when another process holds the database."""
+
+    def __init__(self, conn, failures=1):
+        self._conn = conn
+        self.failures = failures
+
+    def commit(self):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def meeting(store, subject, minutes, account="a@example.com"):
+    start = datetime.now(store.tz) + timedelta(minutes=minutes)
+    return {"subject": subject, "start_time": start, "account": account, "entry_id": f"{account}/{subject}",
+            "alert_time": start - timedelta(minutes=5)}
+
+def add(store, *meetings):
+    return [store.add(m) for m in meetings]
+
+def subjects(store):
+    return sorted(m["subject"] for m in store._select())
+
+
+def test_a_failing_command_is_undone_alone(store, writer):
+    gate = threading.Event()
+    blocker = writer.submit(lambda store: gate.wait())
+
+    def fail(store):
+        store.add(meeting(store, "B", 60))
+        raise ValueError("bad command")
+
+    # Queued behind the blocker, so they are applied as one batch under one commit
+    futures = [writer.submit(add, meeting(store, "A", 60)), writer.submit(fail),
+               writer.submit(add, meeting(store, "C", 60))]
+    gate.set()
+    blocker.result()
+    assert futures[0].result() and futures[2].result()
+    with pytest.raises(ValueError, match="bad command"):
+        futures[1].result()
+    assert subjects(store) == ["A", "C"]
+
+def test_a_failed_commit_is_rolled_back(store):
+    store._conn = FailingCommit(store._conn)
+    with pytest.raises(sqlite3.OperationalError):
+        with store.transaction():
+            store.add(meeting(store, "Lost", 60))
+    with store.transaction():
+        store.add(meeting(store, "Kept", 60))  # Commits only its own write
+    assert subjects(store) == ["Kept"]
+
+def test_a_batch_whose_commit_fails_is_reported_failed(store, writer):
+    started, gate = threading.Event(), threading.Event()
+    blocker = writer.submit(lambda store: started.set() or gate.wait())
+    started.wait()
+    # Queued behind the blocker: one batch, one commit
+    futures = [writer.submit(add, meeting(store, subject, 60)) for subject in ("A", "B")]
+    store._conn = FailingCommit(store._conn, failures=2)  # The blocker's commit, then theirs
+    gate.set()
+    for future in [blocker] + futures:
+        with pytest.raises(sqlite3.OperationalError, match="database is locked"):
+            future.result()
+    writer.apply(add, meeting(store, "C", 60))
+    assert subjects(store) == ["C"]
+
+def test_concurrent_commands_lose_no_updates(store, writer):
+    [meeting_id] = add(store, meeting(store, "", 60))
+
+    def append(store, letter):
+        store.update(meeting_id, subject=store.get(meeting_id)["subject"] + letter)
+
+    threads = [threading.Thread(target=writer.apply, args=(append, "x")) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.get(meeting_id)["subject"] == "x" * 20
+
+def test_apply_from_inside_a_command_runs_inline(store, writer):
+    def outer(store):
+        [meeting_id] = writer.apply(add, meeting(store, "Inner", 60))
+        return meeting_id
+
+    meeting_id = writer.apply(outer)
+    assert store.get(meeting_id)["subject"] == "Inner"
+
+def test_a_stopped_writer_refuses_commands(store):
+    writer = StoreWriter(store)
+    future = writer.submit(add, meeting(store, "Queued", 60))
+    writer.stop()
+    assert future.result() and subjects(store) == ["Queued"]
+    with pytest.raises(RuntimeError):
+        writer.submit(add, meeting(store, "Late", 60))
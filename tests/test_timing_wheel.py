@@ -0,0 +1,127 @@
+import random
+import pytest
+from timing_wheel import TimingWheel
+from alarm.tenants import TenantAlarms, shard_of
+
+
+def fired_ids(wheel, now):
+    return [alarm_id for alarm_id, _ in wheel.advance(now)]
+
+
+def test_alarms_fire_on_the_first_tick_at_or_after_their_deadline():
+    wheel = TimingWheel(tick=1.0)
+    wheel.schedule("a", 5, "item")
+    wheel.schedule("b", 3.5)
+    assert fired_ids(wheel, 3.9) == []
+    assert fired_ids(wheel, 4) == ["b"]
+    assert wheel.advance(5) == [("a", "item")]
+    assert len(wheel) == 0
+
+def test_deadlines_on_every_level_and_in_the_overflow():
+    wheel = TimingWheel(tick=1.0)
+    # First level, the three above it and beyond the top level's span (2**26 ticks)
+    deadlines = {"l0": 200, "l1": 300, "l2": 20_000, "l3": 1_500_000, "overflow": 70_000_000}
+    for alarm_id, when in deadlines.items():
+        wheel.schedule(alarm_id, when)
+    for alarm_id, when in sorted(deadlines.items(), key=lambda entry: entry[1]):
+        assert alarm_id in wheel and wheel.get(alarm_id)[0] == when
+        assert fired_ids(wheel, when - 1) == []
+        assert fired_ids(wheel, when) == [alarm_id]
+
+def test_cancel_reschedule_and_replace():
+    wheel = TimingWheel(tick=1.0)
+    wheel.schedule("a", 10, "first")
+    wheel.schedule("b", 10)
+    assert wheel.cancel("b") is None and "b" not in wheel
+    assert wheel.cancel("b") is None
+    assert wheel.reschedule("a", 400)
+    assert not wheel.reschedule("b", 400)
+    assert wheel.replace("a", "second")
+    assert fired_ids(wheel, 399) == []
+    assert wheel.advance(400) == [("a", "second")]
+
+def test_alarms_scheduled_in_the_past_fire_on_the_next_advance():
+    wheel = TimingWheel(tick=1.0, now=100)
+    wheel.schedule("late", 50)
+    assert wheel.get("late") == (50, None)
+    assert fired_ids(wheel, 100) == ["late"]
+
+def test_matches_a_sorted_list():
+    rng = random.Random(7)
+    wheel = TimingWheel(tick=1.0)
+    pending = {}
+    now = 0
+    for step in range(3000):
+        alarm_id = rng.randrange(500)
+        if rng.random() < 0.2:
+            wheel.cancel(alarm_id)
+            pending.pop(alarm_id, None)
+        else:
+            when = now + rng.choice((rng.randrange(1, 300), rng.randrange(1, 100_000)))
+            wheel.schedule(alarm_id, when)
+            pending[alarm_id] = when
+        if step % 10 == 0:
+            now += rng.randrange(1, 2000)
+            due = {alarm_id for alarm_id, when in pending.items() if when <= now}
+            fired = wheel.advance(now)
+            assert {alarm_id for alarm_id, _ in fired} == due
+            assert [pending[alarm_id] for alarm_id, _ in fired] == sorted(pending[alarm_id] for alarm_id in due)
+            for alarm_id in due:
+                del pending[alarm_id]
+    assert len(wheel) == len(pending)
+
+
+@pytest.fixture
+def alarms():
+    return TenantAlarms(tick=1.0, now=0)
+
+def test_a_rung_alarm_is_not_rearmed_by_the_next_sync(alarms):
+    alarms.sync_user("u", [("m1", 60, "standup"), ("m2", 120, "review")])
+    assert alarms.fire_due(60) == [("u", "m1", "standup")]
+    assert not alarms.sync_user("u", [("m1", 60, "standup"), ("m2", 120, "review")])
+    assert alarms.fire_due(120) == [("u", "m2", "review")]
+    assert alarms.next_alarm("u") is None
+
+def test_a_rescheduled_meeting_rings_again(alarms):
+    alarms.sync_user("u", [("m1", 60, "standup")])
+    alarms.fire_due(60)
+    assert alarms.sync_user("u", [("m1", 600, "standup (moved)")])
+    assert alarms.next_alarm("u") == (600, "m1", "standup (moved)")
+    assert alarms.fire_due(600) == [("u", "m1", "standup (moved)")]
+
+def test_fired_meetings_are_forgotten_once_they_leave_the_calendar(alarms):
+    alarms.sync_user("u", [("m1", 60, None)])
+    alarms.fire_due(60)
+    alarms.sync_user("u", [])
+    assert alarms.fired == {}
+    # Back in the calendar (same ring time): a new meeting as far as the alarms know
+    assert alarms.sync_user("u", [("m1", 60, None)])
+
+def test_a_snooze_survives_syncs_until_the_meeting_moves(alarms):
+    alarms.sync_user("u", [("m1", 600, "standup")])
+    assert alarms.snooze("u", "m1", minutes=5) == "standup"
+    assert not alarms.sync_user("u", [("m1", 600, "standup (renamed)")])
+    assert alarms.next_alarm("u") == (900, "m1", "standup (renamed)")
+    assert alarms.fire_due(899) == []
+    alarms.sync_user("u", [("m1", 1200, "standup")])
+    assert alarms.next_alarm("u") == (1200, "m1", "standup")
+    assert alarms.snooze("u", "missing") is None
+
+def test_a_cancelled_meeting_is_not_readded(alarms):
+    alarms.sync_user("u", [("m1", 60, "standup"), ("m2", 120, "review")])
+    assert alarms.cancel("u", "m1") == "standup"
+    alarms.sync_user("u", [("m1", 60, "standup"), ("m2", 120, "review")])
+    assert alarms.fire_due(1000) == [("u", "m2", "review")]
+    # Scheduling it explicitly brings it back
+    alarms.schedule("u", "m1", 2000, "standup")
+    assert alarms.fire_due(2000) == [("u", "m1", "standup")]
+
+def test_users_are_independent(alarms):
+    alarms.sync_users({"u": [("m", 60, "u's")], "v": [("m", 60, "v's")]})
+    alarms.remove_user("u")
+    assert alarms.fire_due(60) == [("v", "m", "v's")]
+    assert alarms.users == {} and len(alarms) == 0
+
+def test_shards_are_stable():
+    assert shard_of("alice", 8) == shard_of("alice", 8)
+    assert {shard_of(user, 4) for user in range(100)} == {0, 1, 2, 3}
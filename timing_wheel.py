@@ -0,0 +1,185 @@
+import math
+
+# Bits of the tick number handled by each level: 256 ticks on the first
+# level, then 64 slots per level above. With 0.1 s ticks that reaches
+# 25.6 s, 27 min, 29 h and 77 days; later alarms wait in an overflow bucket.
+LEVEL_BITS = (8, 6, 6, 6)
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel (hashed, Linux-timer style) of alarms keyed
+    by alarm id.
+
+    Time is cut into ticks of `tick` seconds. An alarm sits in a slot of the
+    lowest level whose span reaches its deadline and is moved down a level
+    when the wheel turns over that slot, so schedule / cancel / reschedule
+    are O(1) and advance() fires every alarm of a tick as one batch. Alarms
+    fire on the first tick at or after their deadline, never before it.
+
+    Memory is one dict entry per alarm in the id index and one in its slot;
+    the slots themselves are a fixed 448 dicts however many alarms there are.
+    """
+
+    def __init__(self, tick=0.1, now=0.0, levels=LEVEL_BITS):
+        self.tick = tick
+        self._current = math.floor(now / tick)  # Last tick processed
+        self._shifts = []
+        shift = 0
+        for bits in levels:
+            self._shifts.append(shift)
+            shift += bits
+        self._bits = tuple(levels)
+        self._top = shift
+        self._wheels = [[{} for _ in range(1 << bits)] for bits in levels]
+        self._overflow = {}  # Beyond the top level's span
+        self._due = {}       # Deadline already reached, fired by the next advance()
+        self._counts = [0] * (len(levels) + 1)  # Alarms per level, overflow last
+        self._index = {}     # alarm_id -> deadline tick
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, alarm_id):
+        return alarm_id in self._index
+
+    def __iter__(self):
+        """Alarm ids in no particular order."""
+        return iter(list(self._index))
+
+    def get(self, alarm_id):
+        """Return (deadline in seconds, item) for an alarm, or None."""
+        deadline = self._index.get(alarm_id)
+        if deadline is None:
+            return None
+        _, slot = self._locate(deadline)
+        return deadline * self.tick, slot[alarm_id]
+
+    def schedule(self, alarm_id, when, item=None):
+        """Add an alarm due at `when` (seconds, same clock as advance()), or move it if queued."""
+        if alarm_id in self._index:
+            self.cancel(alarm_id)
+        deadline = math.ceil(when / self.tick)
+        self._index[alarm_id] = deadline
+        self._place(alarm_id, deadline, item)
+
+    def reschedule(self, alarm_id, when):
+        """Move a queued alarm, keeping its item; returns False if it is not queued."""
+        entry = self.get(alarm_id)
+        if entry is None:
+            return False
+        self.schedule(alarm_id, when, entry[1])
+        return True
+
+    def replace(self, alarm_id, item):
+        """Swap a queued alarm's item without moving it; returns False if it is not queued."""
+        deadline = self._index.get(alarm_id)
+        if deadline is None:
+            return False
+        _, slot = self._locate(deadline)
+        slot[alarm_id] = item
+        return True
+
+    def cancel(self, alarm_id):
+        """Drop an alarm and return its item (None if it was not queued)."""
+        deadline = self._index.pop(alarm_id, None)
+        if deadline is None:
+            return None
+        level, slot = self._locate(deadline)
+        if level is not None:
+            self._counts[level] -= 1
+        return slot.pop(alarm_id)
+
+    def next_tick_at(self):
+        """When (in seconds) the next tick starts, for sleeping until advance() has work."""
+        return (self._current + 1) * self.tick
+
+    def advance(self, now):
+        """
+        Process every tick up to `now` and return [(alarm_id, item)] of the
+        alarms that came due, tick by tick in deadline order.
+        """
+        target = math.floor(now / self.tick)
+        fired = []
+        self._fire_due(fired)
+        while self._current < target:
+            if not self._index:
+                self._current = target
+                break
+            # Jump over ticks that can neither fire nor cascade anything: up
+            # to the next turn of the lowest level that holds alarms
+            level = next(level for level, count in enumerate(self._counts) if count)
+            if level:
+                span = 1 << (self._shifts[level] if level < len(self._shifts) else self._top)
+                self._current = min((self._current // span + 1) * span - 1, target)
+                if self._current == target:
+                    break
+            else:
+                # Within the first level only occupied slots (and its turn-over) matter
+                slots = self._wheels[0]
+                mask = len(slots) - 1
+                tick = self._current + 1
+                limit = min((self._current | mask) + 1, target)
+                while tick < limit and not slots[tick & mask]:
+                    tick += 1
+                self._current = tick - 1
+            self._turn(self._current + 1, fired)
+        return fired
+
+    # ----- Slot bookkeeping -----
+    def _locate(self, deadline):
+        # Where an alarm with this deadline sits at the current tick: a pure
+        # function of the two, so the index only needs to keep the deadline
+        if deadline <= self._current:
+            return None, self._due
+        diff = deadline ^ self._current
+        for level, (shift, bits) in enumerate(zip(self._shifts, self._bits)):
+            if diff >> (shift + bits) == 0:
+                return level, self._wheels[level][(deadline >> shift) & ((1 << bits) - 1)]
+        return len(self._bits), self._overflow
+
+    def _place(self, alarm_id, deadline, item):
+        level, slot = self._locate(deadline)
+        slot[alarm_id] = item
+        if level is not None:
+            self._counts[level] += 1
+
+    def _turn(self, tick, fired):
+        self._current = tick
+        # Higher levels first, so an alarm can drop more than one level in a turn
+        if tick & ((1 << self._top) - 1) == 0 and self._overflow:
+            overflow, self._overflow = self._overflow, {}
+            self._cascade(len(self._bits), overflow)
+        for level in range(len(self._bits) - 1, 0, -1):
+            shift = self._shifts[level]
+            if tick & ((1 << shift) - 1) == 0:
+                slots = self._wheels[level]
+                position = (tick >> shift) & ((1 << self._bits[level]) - 1)
+                if slots[position]:
+                    slot, slots[position] = slots[position], {}
+                    self._cascade(level, slot)
+        slots = self._wheels[0]
+        position = tick & ((1 << self._bits[0]) - 1)
+        if slots[position]:
+            batch = slots[position]
+            slots[position] = {}
+            self._counts[0] -= len(batch)
+            index = self._index
+            for alarm_id, item in batch.items():
+                del index[alarm_id]
+                fired.append((alarm_id, item))
+        self._fire_due(fired)
+
+    def _cascade(self, level, slot):
+        self._counts[level] -= len(slot)
+        index = self._index
+        for alarm_id, item in slot.items():
+            self._place(alarm_id, index[alarm_id], item)
+
+    def _fire_due(self, fired):
+        if self._due:
+            due = sorted(self._due.items(), key=lambda entry: self._index[entry[0]])
+            self._due = {}
+            for alarm_id, item in due:
+                del self._index[alarm_id]
+                fired.append((alarm_id, item))